@@ -13,6 +13,41 @@ def load_config(config_path: str) -> dict:
     config['parallel_processing'] = config.get('parallel_processing', True)
     config['log_level'] = config.get('log_level', 'INFO')
     config['num_workers'] = config.get('num_workers', 4)
-    config['batch_size'] = config.get('batch_size', 3)
+    config['telemetry'] = config.get('telemetry', False)
+    config['deduplicate_inputs'] = config.get('deduplicate_inputs', True)
+    config['hi_res_model_name'] = config.get('hi_res_model_name', 'yolox')
+    config['page_sharding'] = config.get('page_sharding', False)
+    config['pages_per_shard'] = config.get('pages_per_shard', 50)
+    config['page_sharding_min_pages'] = config.get('page_sharding_min_pages', 150)
+    config['supervise_workers'] = config.get('supervise_workers', True)
+    config['file_timeout_seconds'] = config.get('file_timeout_seconds')
+    config['worker_max_rss_mb'] = config.get('worker_max_rss_mb')
+    config['worker_max_tasks'] = config.get('worker_max_tasks')
+    config['checkpoints'] = config.get('checkpoints', False)
+    config['checkpoint_pages'] = config.get('checkpoint_pages', 50)
+    config['text_layer_fast_path'] = config.get('text_layer_fast_path', False)
+    config['ocr_engine'] = config.get('ocr_engine', 'tesseract')
+    config['ocr_pool_size'] = config.get('ocr_pool_size', 1)
+    config['tessdata_dir'] = config.get('tessdata_dir')
+    config['page_cache'] = config.get('page_cache', False)
+    config['page_cache_dir'] = config.get('page_cache_dir')
+    config['page_cache_max_mb'] = config.get('page_cache_max_mb', 2048)
+    config['streaming_output'] = config.get('streaming_output', False)
+    config['streaming_pages'] = config.get('streaming_pages', 10)
+    config['output_sinks'] = config.get('output_sinks', ['csv', 'metadata_json', 'html', 'tables', 'raw_json'])
+    config['compact_json'] = config.get('compact_json', False)
+    config['output_buffer_size'] = config.get('output_buffer_size', 1024 * 1024)
+    config['io_threads'] = config.get('io_threads', 2)
+    config['io_queue_depth'] = config.get('io_queue_depth', 32)
+    config['write_behind'] = config.get('write_behind', False)
+    config['write_behind_depth'] = config.get('write_behind_depth', 1)
+    config['pdf_copy_mode'] = config.get('pdf_copy_mode', 'auto')
+    config['partition_backend'] = config.get('partition_backend', 'local')
+    config['api_url'] = config.get('api_url', 'http://localhost:8000/general/v0/general')
+    config['api_max_concurrency'] = config.get('api_max_concurrency', 4)
+    config['api_connect_timeout'] = config.get('api_connect_timeout', 5.0)
+    config['api_read_timeout'] = config.get('api_read_timeout', 600.0)
+    config['api_retries'] = config.get('api_retries', 3)
+    config['api_split_pages'] = config.get('api_split_pages', 10)
 
     return config
\ No newline at end of file
@@ -0,0 +1,276 @@
+import hashlib
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import requests
+from PyPDF2 import PdfReader, PdfWriter
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger('pdf_processor')
+
+DEFAULT_API_URL = 'http://localhost:8000/general/v0/general'
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Form fields for the partition endpoint, matching the in-process partition_pdf call
+DEFAULT_PARTITION_PARAMS = {
+    'strategy': 'hi_res',
+    'languages': ['eng'],
+    'pdf_infer_table_structure': 'true',
+    'include_page_breaks': 'true',
+}
+
+
+class PartitionApiError(Exception):
+    """The partition API kept failing after every retry, or rejected the request outright."""
+
+
+class PartitionApiClient:
+    """Client for the unstructured partition API over one pooled, keep-alive Session.
+
+    At most max_concurrency requests are in flight at once across all threads using the
+    client. Connection errors, timeouts, 429 and 5xx responses are retried with full-jitter
+    exponential backoff, honouring a numeric Retry-After header.
+    """
+
+    def __init__(self, url: str = DEFAULT_API_URL, max_concurrency: int = 4, connect_timeout: float = 5.0,
+                 read_timeout: float = 600.0, retries: int = 3, backoff_base: float = 0.5,
+                 backoff_max: float = 30.0, split_pages: int = 0):
+        self.url = url
+        self.max_concurrency = max_concurrency
+        self.split_pages = split_pages
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._stats_lock = threading.Lock()
+        self.stats = {'api_requests': 0, 'api_retries': 0, 'api_seconds': 0.0}
+        self.batch_seconds: List[float] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'PartitionApiClient':
+        return cls(
+            url=config.get('api_url', DEFAULT_API_URL),
+            max_concurrency=config.get('api_max_concurrency', 4),
+            connect_timeout=config.get('api_connect_timeout', 5.0),
+            read_timeout=config.get('api_read_timeout', 600.0),
+            retries=config.get('api_retries', 3),
+            split_pages=config.get('api_split_pages', 10),
+        )
+
+    def partition_file(self, file_path: Path, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Partition a PDF, split into split_pages-page batches sent concurrently when that is set."""
+        if self.split_pages > 0:
+            return self.partition_pages(file_path, self.split_pages, params)
+        return self._partition_batch(file_path.name, file_path.read_bytes(), params)
+
+    def partition_pages(self, file_path: Path, pages_per_batch: int,
+                        params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Split the PDF into page batches, partition them concurrently and reassemble the document."""
+        reader = PdfReader(str(file_path))
+        page_count = len(reader.pages)
+        if page_count <= pages_per_batch:
+            return self._partition_batch(file_path.name, file_path.read_bytes(), params)
+        starts = list(range(1, page_count + 1, pages_per_batch))
+        # PdfReader is not thread-safe, so the batches are cut here and only the uploads run concurrently
+        futures = [
+            self._get_executor().submit(self._partition_batch, file_path.name,
+                                        _page_range_bytes(reader, start, min(start + pages_per_batch - 1, page_count)),
+                                        params)
+            for start in starts
+        ]
+        try:
+            batches = [future.result() for future in futures]
+        finally:
+            for future in futures:
+                future.cancel()
+        return merge_page_batches(batches, starts)
+
+    def partition_page_range(self, file_path: Path, start: int, end: int,
+                             params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Partition pages start..end (1-based, inclusive) in one request, numbered as in the whole PDF."""
+        content = _page_range_bytes(PdfReader(str(file_path)), start, end)
+        return number_page_range(self._partition_batch(file_path.name, content, params), start)
+
+    def _partition_batch(self, filename: str, content: bytes, params: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        started = time.perf_counter()
+        elements = self.partition_bytes(filename, content, params)
+        with self._stats_lock:
+            self.batch_seconds.append(time.perf_counter() - started)
+        return elements
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._stats_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='api')
+            return self._executor
+
+    def take_batch_seconds(self) -> List[float]:
+        """Latencies of the requests made since the last call, retries included."""
+        with self._stats_lock:
+            seconds, self.batch_seconds = self.batch_seconds, []
+        return seconds
+
+    def partition_bytes(self, filename: str, content: bytes,
+                        params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """POST one PDF and return the element dicts from the JSON response."""
+        data = {**DEFAULT_PARTITION_PARAMS, **(params or {})}
+        for attempt in range(self.retries + 1):
+            delay = None
+            try:
+                with self._slots:
+                    started = time.perf_counter()
+                    try:
+                        response = self.session.post(
+                            self.url, files={'files': (filename, content, 'application/pdf')}, data=data,
+                            timeout=self.timeout)
+                    finally:
+                        self._record('api_seconds', time.perf_counter() - started)
+                        self._record('api_requests', 1)
+                if response.status_code not in RETRY_STATUSES:
+                    if not response.ok:
+                        raise PartitionApiError(
+                            f"{filename}: HTTP {response.status_code} from partition API: {response.text[:200]}")
+                    return response.json()
+                error = f"HTTP {response.status_code}"
+                delay = _retry_after(response)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = str(e)
+            if attempt == self.retries:
+                raise PartitionApiError(f"{filename}: partition API failed after {attempt + 1} attempts: {error}")
+            if delay is None:
+                delay = self.backoff_delay(attempt)
+            logger.warning(f"Partition API error for {filename} ({error}), retrying in {delay:.1f}s")
+            self._record('api_retries', 1)
+            time.sleep(delay)
+
+    def backoff_delay(self, attempt: int) -> float:
+        # Full jitter keeps workers that failed together from retrying together
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _record(self, key: str, value: float):
+        with self._stats_lock:
+            self.stats[key] += value
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self) -> 'PartitionApiClient':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    try:
+        return max(0.0, float(response.headers['Retry-After']))
+    except (KeyError, ValueError):
+        return None
+
+
+def _page_range_bytes(reader: PdfReader, start: int, end: int) -> bytes:
+    writer = PdfWriter()
+    for page_index in range(start - 1, end):
+        writer.add_page(reader.pages[page_index])
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def _batch_element_id(element_id: str, start: int) -> str:
+    return hashlib.sha256(f"{element_id}:{start}".encode('utf-8')).hexdigest()[:32]
+
+
+def merge_page_batches(batches: List[List[Dict[str, Any]]], starts: List[int]) -> List[Dict[str, Any]]:
+    """Reassemble per-batch API responses into one page-ordered document.
+
+    Each batch was partitioned as a standalone PDF, so its page numbers are shifted by
+    the batch's first page, a PageBreak is added between batches as partitioning the
+    whole file would, and element ids that repeat an earlier batch's (identical text at
+    the same position of a batch-local page) are rehashed along with their children's
+    parent_id references.
+    """
+    merged = []
+    seen_ids = set()
+    for batch, start in zip(batches, starts):
+        if merged and batch and merged[-1].get('type') != 'PageBreak':
+            page_number = merged[-1].get('metadata', {}).get('page_number')
+            merged.append({
+                'type': 'PageBreak',
+                'element_id': _batch_element_id('PageBreak', start),
+                'text': '',
+                'metadata': {'page_number': page_number} if page_number is not None else {},
+            })
+        renamed = {element['element_id']: _batch_element_id(element['element_id'], start)
+                   for element in batch if element.get('element_id') in seen_ids}
+        for element in batch:
+            metadata = element.setdefault('metadata', {})
+            if metadata.get('page_number') is not None:
+                metadata['page_number'] += start - 1
+            if element.get('element_id') in renamed:
+                element['element_id'] = renamed[element['element_id']]
+            if metadata.get('parent_id') in renamed:
+                metadata['parent_id'] = renamed[metadata['parent_id']]
+            seen_ids.add(element.get('element_id'))
+            merged.append(element)
+    return merged
+
+
+def number_page_range(elements: List[Dict[str, Any]], start: int) -> List[Dict[str, Any]]:
+    """Number one page range's response as part of the whole PDF.
+
+    Page numbers are shifted by the range's first page. Unlike the batches of one request,
+    ranges are partitioned separately (as page shards, checkpoints or streamed windows),
+    so every id past the first page is rehashed with the range's first page, along with
+    the parent_id references to it; ranges then never share an id.
+    """
+    renamed = {}
+    if start > 1:
+        renamed = {element['element_id']: _batch_element_id(element['element_id'], start)
+                   for element in elements if element.get('element_id') is not None}
+    for element in elements:
+        metadata = element.setdefault('metadata', {})
+        if metadata.get('page_number') is not None:
+            metadata['page_number'] += start - 1
+        if element.get('element_id') in renamed:
+            element['element_id'] = renamed[element['element_id']]
+        if metadata.get('parent_id') in renamed:
+            metadata['parent_id'] = renamed[metadata['parent_id']]
+    return elements
+
+
+def latency_percentiles(seconds: List[float]) -> Dict[str, float]:
+    if not seconds:
+        return {}
+    p50, p90, p99 = np.percentile(seconds, [50, 90, 99])
+    return {'p50': round(float(p50), 3), 'p90': round(float(p90), 3), 'p99': round(float(p99), 3),
+            'max': round(max(seconds), 3)}
+
+
+_client: Optional[PartitionApiClient] = None
+_client_pid: Optional[int] = None
+
+
+def get_api_client(config: Dict[str, Any]) -> PartitionApiClient:
+    """The process's shared client, so each pool worker keeps its connections alive across files."""
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        _client = PartitionApiClient.from_config(config)
+        _client_pid = os.getpid()
+    return _client
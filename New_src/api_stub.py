@@ -0,0 +1,142 @@
+"""A local stand-in for the unstructured partition API, for tests and benchmarks."""
+import hashlib
+import json
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from PyPDF2 import PdfReader
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Like uvicorn; otherwise keep-alive responses stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        stub = self.server.stub
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        status, payload = stub.handle(self.headers.get('Content-Type', ''), body)
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        if status == 429:
+            self.send_header('Retry-After', '0')
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up waiting (a timeout test)
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def uploaded_file(content_type: str, body: bytes) -> bytes:
+    """The 'files' part of a multipart/form-data request body."""
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode('latin-1') + body)
+    for part in message.iter_parts():
+        if part.get_param('name', header='content-disposition') == 'files':
+            return part.get_payload(decode=True)
+    raise ValueError("No 'files' part in the request")
+
+
+def page_elements(pdf_bytes: bytes, elements_per_page: int = 3, filename: str = 'upload.pdf') -> List[Dict[str, Any]]:
+    """Elements for each page of an uploaded PDF, numbered from 1 like the real API.
+
+    Ids hash the text, page number and position, so the same page content partitioned
+    in different batches gets the same id, as it does from unstructured. Every page ends
+    with a PageBreak, the last one included, as partition_pdf's pages do.
+    """
+    elements = []
+    page_count = len(PdfReader(BytesIO(pdf_bytes)).pages)
+    for page_number in range(1, page_count + 1):
+        title_id = None
+        for index in range(elements_per_page):
+            text = "Item heading" if index == 0 else f"Paragraph {index}"
+            element_id = hashlib.sha256(f"{text}:{page_number}:{index}".encode('utf-8')).hexdigest()[:32]
+            metadata = {'page_number': page_number, 'filename': filename}
+            if title_id is not None:
+                metadata['parent_id'] = title_id
+            elements.append({'type': 'Title' if index == 0 else 'NarrativeText', 'element_id': element_id,
+                             'text': text, 'metadata': metadata})
+            if index == 0:
+                title_id = element_id
+        elements.append({'type': 'PageBreak', 'element_id': f"break{page_number}", 'text': '',
+                         'metadata': {'page_number': page_number}})
+    return elements
+
+
+class StubPartitionServer:
+    """Serve canned partition responses on 127.0.0.1 from a background thread.
+
+    Each request sleeps for `latency` seconds and returns `elements`, or the result of
+    calling it with the uploaded file when it is a function, except that the first
+    requests answer with the statuses in `failures`. The server counts requests,
+    connections and the most requests it had in flight at once.
+    """
+
+    def __init__(self, elements: Union[List[Dict[str, Any]], Callable[[bytes], List[Dict[str, Any]]], None] = None,
+                 latency: float = 0.0, failures: List[int] = ()):
+        self.elements = elements if elements is not None else []
+        self.latency = latency
+        self.failures = list(failures)
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.connections = 0
+        self.bodies: List[bytes] = []
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+        self.server.daemon_threads = True
+        self.server.stub = self
+        self.server.verify_request = self._count_connection
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/general/v0/general"
+
+    def _count_connection(self, request, client_address) -> bool:
+        with self._lock:
+            self.connections += 1
+        return True
+
+    def handle(self, content_type: str, body: bytes):
+        with self._lock:
+            self.requests += 1
+            self.bodies.append(body)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            status = self.failures.pop(0) if self.failures else 200
+        try:
+            time.sleep(self.latency)
+            if status != 200:
+                return status, {'detail': 'stub failure'}
+            if callable(self.elements):
+                return status, self.elements(uploaded_file(content_type, body))
+            return status, self.elements
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def start(self) -> 'StubPartitionServer':
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> 'StubPartitionServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
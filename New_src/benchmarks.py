@@ -0,0 +1,312 @@
+"""Micro-benchmarks for the hot paths of the PDF pipeline.
+
+Run from New_src, e.g. ``python benchmarks.py coordinates --elements 50000``.
+"""
+import argparse
+import itertools
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from io import StringIO
+from typing import Any, Callable, Dict, List
+
+import pandas as pd
+import requests
+from PIL import Image, ImageDraw, ImageFont
+from PyPDF2 import PdfWriter
+
+from unstructured.documents.coordinates import PixelSpace, RelativeCoordinateSystem
+from unstructured.documents.elements import ElementMetadata, NarrativeText
+from unstructured.partition.utils.ocr_models.tesseract_ocr import OCRAgentTesseract
+from unstructured.staging.base import elements_to_dicts
+
+from api_client import DEFAULT_PARTITION_PARAMS, PartitionApiClient
+from api_stub import StubPartitionServer, page_elements
+from Config import load_config
+from element_processor import ElementColumns, convert_to_relative
+from file_handler import ElementWriter
+from html_tables import fast_read_html_table
+from ocr_engine import OCRAgentTesserocr, install_ocr_engine
+from page_sharding import get_page_count
+from pdf_processor import PDFProcessor
+
+
+def best_of(fn: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def synthetic_elements(count: int, elements_per_page: int = 40, seed: int = 0) -> List[Any]:
+    """Elements with hi_res-like pixel coordinates, spread over pages of a 200 dpi letter-size PDF."""
+    rng = random.Random(seed)
+    system = PixelSpace(1700, 2200)
+    elements = []
+    for index in range(count):
+        x0, y0 = rng.uniform(0, 1500), rng.uniform(0, 2000)
+        x1, y1 = x0 + rng.uniform(10, 200), y0 + rng.uniform(10, 200)
+        elements.append(NarrativeText(
+            text=f"Element {index}",
+            coordinates=((x0, y0), (x0, y1), (x1, y1), (x1, y0)),
+            coordinate_system=system,
+            metadata=ElementMetadata(page_number=index // elements_per_page + 1),
+        ))
+    return elements
+
+
+def bench_coordinates(args: argparse.Namespace):
+    elements = synthetic_elements(args.elements)
+    relative = RelativeCoordinateSystem()
+
+    def per_element():
+        return [element.convert_coordinates_to_new_system(relative, in_place=False) for element in elements]
+
+    assert per_element() == convert_to_relative(elements), "batched conversion differs from per-element conversion"
+    per_element_seconds = best_of(per_element, args.repeat)
+    batched_seconds = best_of(lambda: convert_to_relative(elements), args.repeat)
+    print(f"{args.elements} elements, best of {args.repeat}")
+    print(f"  per-element: {per_element_seconds * 1000:.1f} ms")
+    print(f"  batched:     {batched_seconds * 1000:.1f} ms ({per_element_seconds / batched_seconds:.1f}x)")
+
+
+def bench_api_elements(args: argparse.Namespace):
+    print(f"ElementColumns.from_dicts + DataFrame on API element dicts, best of {args.repeat}")
+    for count in (args.elements // 4, args.elements // 2, args.elements, args.elements * 2):
+        dicts = elements_to_dicts(synthetic_elements(count))
+
+        def build():
+            columns = ElementColumns.from_dicts(dicts)
+            return columns.to_dataframe(), columns.to_metadata()
+
+        seconds = best_of(build, args.repeat)
+        print(f"  {count:>7} elements: {seconds * 1000:8.1f} ms ({seconds / count * 1e6:.2f} us/element)")
+
+
+def synthetic_element_dicts(count: int, elements_per_page: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Element dicts as the partition API returns them, with a PageBreak closing each page."""
+    rng = random.Random(seed)
+    categories = ['Title', 'NarrativeText', 'NarrativeText', 'ListItem', 'Table']
+    elements = []
+    for index in range(count):
+        category = rng.choice(categories)
+        metadata = {'page_number': index // elements_per_page + 1}
+        if category == 'Table':
+            metadata['text_as_html'] = '<table><tr><td>1</td><td>2</td></tr></table>'
+        elements.append({'type': category, 'element_id': f"id{index}", 'text': f"Item {index} & <more> text " * 5,
+                         'metadata': metadata})
+        if (index + 1) % elements_per_page == 0:
+            elements.append({'type': 'PageBreak', 'element_id': f"break{index}", 'text': '', 'metadata': {}})
+    return elements
+
+
+def write_html(elements: List[Dict[str, Any]], output_folder: Path):
+    writer = ElementWriter(output_folder, sinks=['html'])
+    writer.write(elements)
+    writer.close()
+
+
+def bench_html(args: argparse.Namespace):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_folder = Path(tmp_dir)
+        print(f"html output sink, {args.elements_per_page} elements per page, best of {args.repeat}")
+        for count in (args.elements // 4, args.elements // 2, args.elements, args.elements * 2):
+            elements = synthetic_element_dicts(count, args.elements_per_page)
+            seconds = best_of(lambda: write_html(elements, output_folder), args.repeat)
+            print(f"  {count:>7} elements: {seconds * 1000:8.1f} ms ({seconds / count * 1e6:.2f} us/element)")
+
+
+def synthetic_table_html(rows: int, seed: int = 0) -> str:
+    """An Item 20-style outlet table in the <thead><th>...</thead> shape unstructured emits."""
+    rng = random.Random(seed)
+    header = ['State', 'Year', 'Outlets at Start', 'Openings', 'Terminations', 'Outlets at End']
+    parts = ['<table><thead>'] + [f'<th>{name}</th>' for name in header] + ['</thead>']
+    for _ in range(rows):
+        cells = [rng.choice(['Virginia', 'Wisconsin', 'Texas']), str(rng.choice([2021, 2022, 2023]))]
+        cells += [f"{rng.randint(0, 5000):,}" for _ in range(4)]
+        parts.append('<tr>' + ''.join(f'<td>{cell}</td>' for cell in cells) + '</tr>')
+    parts.append('</table>')
+    return ''.join(parts)
+
+
+def bench_tables(args: argparse.Namespace):
+    print(f"HTML table to DataFrame, best of {args.repeat}")
+    for rows in (5, 50, 500):
+        tables = [synthetic_table_html(rows, seed) for seed in range(args.tables)]
+        for table_html in tables:
+            fast = fast_read_html_table(table_html)
+            reference = pd.read_html(StringIO(table_html))[0]
+            assert fast.equals(reference) and list(fast.columns) == list(reference.columns), \
+                "fast table parser differs from read_html"
+        read_html_seconds = best_of(lambda: [pd.read_html(StringIO(t)) for t in tables], args.repeat)
+        fast_seconds = best_of(lambda: [fast_read_html_table(t) for t in tables], args.repeat)
+        print(f"  {args.tables} tables x {rows:>3} rows: read_html {read_html_seconds * 1000:8.1f} ms, "
+              f"fast {fast_seconds * 1000:8.1f} ms ({read_html_seconds / fast_seconds:.1f}x)")
+
+
+def bench_api(args: argparse.Namespace):
+    elements = [{'type': 'NarrativeText', 'element_id': f"id{i}", 'text': f"Element {i}",
+                 'metadata': {'page_number': i // 40 + 1}} for i in range(args.elements)]
+    pdf_bytes = b'%PDF-1.4 ' + bytes(args.pdf_kb * 1024)
+    with StubPartitionServer(elements, latency=args.latency_ms / 1000) as server:
+        def bare():
+            response = requests.post(server.url, files={'files': ('a.pdf', pdf_bytes, 'application/pdf')},
+                                     data=DEFAULT_PARTITION_PARAMS)
+            response.raise_for_status()
+            return response.json()
+
+        with PartitionApiClient(server.url, max_concurrency=args.concurrency) as client:
+            runs = [
+                ("bare requests.post", bare),
+                ("pooled client", lambda: client.partition_bytes('a.pdf', pdf_bytes)),
+            ]
+            print(f"{args.requests} requests, {args.concurrency} concurrent, {args.latency_ms} ms server latency, "
+                  f"best of {args.repeat}")
+            for label, call in runs:
+                def run():
+                    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+                        list(executor.map(lambda _: call(), range(args.requests)))
+                connections = server.connections
+                seconds = best_of(run, args.repeat)
+                print(f"  {label:<20} {args.requests / seconds:8.1f} requests/s, "
+                      f"{(server.connections - connections) / args.repeat:.0f} connections per run")
+
+
+def synthetic_page_image(seed: int, lines: int = 40) -> Image.Image:
+    """A 200 dpi letter page of printed text, like the scans that go through OCR."""
+    rng = random.Random(seed)
+    words = ["franchise", "fee", "territory", "royalty", "agreement", "renewal", "Item", "disclosure",
+             "initial", "payment", "advertising", "fund", "term", "transfer", "obligations", "2023"]
+    image = Image.new('RGB', (1700, 2200), 'white')
+    draw = ImageDraw.Draw(image)
+    font = None
+    for name in ("DejaVuSans.ttf", "arial.ttf"):
+        try:
+            font = ImageFont.truetype(name, 32)
+            break
+        except OSError:
+            pass
+    for line in range(lines):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(6, 10)))
+        draw.text((120, 120 + line * 48), text, fill='black', font=font or ImageFont.load_default())
+    return image
+
+
+def bench_ocr(args: argparse.Namespace):
+    install_ocr_engine('tesserocr', pool_size=args.threads)
+    images = [synthetic_page_image(seed) for seed in range(args.pages)]
+    agents = [("temp-file tesseract", OCRAgentTesseract('eng')), ("in-memory tesserocr", OCRAgentTesserocr('eng'))]
+    print(f"{args.pages} pages, {args.threads} thread(s), best of {args.repeat}")
+    texts = {}
+    for label, agent in agents:
+        def run():
+            # Full-page OCR as partition_pdf does it: character-level hOCR plus plain text
+            with ThreadPoolExecutor(max_workers=args.threads) as executor:
+                return list(executor.map(agent.get_layout_elements_from_image, images))
+        texts[label] = [" ".join(page.texts) for page in run()]
+        seconds = best_of(run, args.repeat)
+        print(f"  {label:<20} {args.pages / seconds:6.2f} pages/s ({seconds / args.pages * 1000:.0f} ms per page)")
+    matching = sum(a == b for a, b in zip(*texts.values()))
+    print(f"  identical text on {matching} of {args.pages} pages")
+
+
+def synthetic_corpus(folder: Path, documents: int, pages: int):
+    for i in range(documents):
+        writer = PdfWriter()
+        for _ in range(pages):
+            writer.add_blank_page(612, 792)
+        # Distinct bytes, so input deduplication keeps every document
+        writer.add_metadata({'/Title': f"Document {i}"})
+        with open(folder / f"Entity{i}_2023_Virginia.pdf", 'wb') as f:
+            writer.write(f)
+
+
+def bench_backends(args: argparse.Namespace):
+    config = load_config(args.config)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+        if args.input:
+            input_dir = Path(args.input)
+        else:
+            input_dir = root / 'input'
+            input_dir.mkdir()
+            synthetic_corpus(input_dir, args.documents, args.pages)
+        pdf_files = list(input_dir.glob('**/*.pdf'))
+        pages = sum(get_page_count(file_path) for file_path in pdf_files)
+        # Without --api-url the api backend talks to a stub server with per-request latency
+        with StubPartitionServer(page_elements, latency=args.latency_ms / 1000) as server:
+            print(f"{len(pdf_files)} PDFs, {pages} pages, "
+                  f"{args.workers or 'no'} worker processes, best of {args.repeat}")
+            for name in args.backends:
+                runs = itertools.count()
+
+                def run():
+                    # A fresh output folder per run, or the second run would skip every file
+                    output_dir = root / f"output-{name}-{next(runs)}"
+                    output_dir.mkdir()
+                    PDFProcessor({**config, 'input_dir': input_dir, 'output_dir': output_dir,
+                                  'partition_backend': name, 'api_url': args.api_url or server.url,
+                                  'parallel_processing': args.workers > 0,
+                                  'num_workers': max(args.workers, 1)}).process_pdfs()
+
+                seconds = best_of(run, args.repeat)
+                print(f"  {name:<6} {len(pdf_files) / seconds:8.2f} documents/s, {pages / seconds:8.1f} pages/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    coordinates = subparsers.add_parser('coordinates', help="Relative coordinate conversion")
+    coordinates.add_argument('--elements', type=int, default=50000)
+    coordinates.set_defaults(run=bench_coordinates)
+
+    api_elements = subparsers.add_parser('api-elements', help="Columnar build from partition API element dicts")
+    api_elements.add_argument('--elements', type=int, default=20000)
+    api_elements.set_defaults(run=bench_api_elements)
+
+    html = subparsers.add_parser('html', help="Metadata HTML rendering")
+    html.add_argument('--elements', type=int, default=50000)
+    html.add_argument('--elements-per-page', type=int, default=1)
+    html.set_defaults(run=bench_html)
+
+    tables = subparsers.add_parser('tables', help="HTML table parsing")
+    tables.add_argument('--tables', type=int, default=100)
+    tables.set_defaults(run=bench_tables)
+
+    api = subparsers.add_parser('api', help="Partition API client against a local stub server")
+    api.add_argument('--requests', type=int, default=200)
+    api.add_argument('--concurrency', type=int, default=4)
+    api.add_argument('--latency-ms', type=float, default=5.0)
+    api.add_argument('--elements', type=int, default=200)
+    api.add_argument('--pdf-kb', type=int, default=256)
+    api.set_defaults(run=bench_api)
+
+    ocr = subparsers.add_parser('ocr', help="Tesseract through temp files vs in-memory tesserocr")
+    ocr.add_argument('--pages', type=int, default=8)
+    ocr.add_argument('--threads', type=int, default=1)
+    ocr.set_defaults(run=bench_ocr)
+
+    backends = subparsers.add_parser('backends', help="Whole pipeline throughput per partition backend")
+    backends.add_argument('--backends', nargs='+', default=['stub', 'api'],
+                          help="Any of local, api, stub (local needs the layout model)")
+    backends.add_argument('--input', help="Folder of PDFs (default: a synthetic corpus of blank pages)")
+    backends.add_argument('--documents', type=int, default=20)
+    backends.add_argument('--pages', type=int, default=10)
+    backends.add_argument('--workers', type=int, default=0, help="Worker processes (0 runs sequentially)")
+    backends.add_argument('--api-url', help="Partition API for the api backend (default: a local stub server)")
+    backends.add_argument('--latency-ms', type=float, default=20.0, help="Stub server latency per request")
+    backends.add_argument('--config', default=str(Path(__file__).resolve().parent / 'config.yaml'))
+    backends.set_defaults(run=bench_backends)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+import gzip
+import json
+import logging
+import os
+import shutil
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from unstructured.staging.base import elements_from_dicts, elements_to_dicts
+
+CHECKPOINT_DIR = '.checkpoints'
+
+logger = logging.getLogger('pdf_processor')
+
+_checkpoint_stats = Counter()
+
+
+class DocumentCheckpoint:
+    """Completed page ranges of one PDF, kept in a scratch folder until its outputs are written.
+
+    Each range is saved as it finishes, before shards are merged, so a retry or a restarted
+    run partitions only the ranges that are missing. Every file carries the source PDF's
+    size and mtime and the partition settings; a range saved for another version of the
+    PDF or other settings is ignored.
+    """
+
+    def __init__(self, output_folder: Path, file_path: Path, settings: Dict[str, Any]):
+        self.directory = Path(output_folder) / CHECKPOINT_DIR / file_path.stem
+        stat = file_path.stat()
+        self.fingerprint = {'source': file_path.name, 'size': stat.st_size, 'mtime': stat.st_mtime,
+                            'settings': settings}
+
+    def _range_path(self, start: int, end: int) -> Path:
+        return self.directory / f"pages_{start:05d}_{end:05d}.json.gz"
+
+    def load(self, start: int, end: int) -> Optional[List[Any]]:
+        path = self._range_path(start, end)
+        if not path.exists():
+            return None
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            # A worker killed mid-write leaves nothing behind (the write is atomic), but be safe
+            logger.warning(f"Ignoring unreadable checkpoint {path}: {e}")
+            return None
+        if saved.get('fingerprint') != self.fingerprint:
+            return None
+        _checkpoint_stats['checkpoint_ranges_resumed'] += 1
+        return elements_from_dicts(saved['elements'])
+
+    def save(self, start: int, end: int, elements: List[Any]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._range_path(start, end)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=1) as f:
+            json.dump({'fingerprint': self.fingerprint, 'elements': elements_to_dicts(elements)}, f)
+        os.replace(tmp_path, path)
+        _checkpoint_stats['checkpoint_ranges_saved'] += 1
+
+    def discard(self):
+        if not self.directory.exists():
+            return
+        shutil.rmtree(self.directory, ignore_errors=True)
+        try:
+            # Other PDFs of the same entity and year may still have checkpoints here
+            self.directory.parent.rmdir()
+        except OSError:
+            pass
+
+
+def reset_checkpoint_stats():
+    """Forked workers start from the parent's counts; the parent reports its own resumed ranges."""
+    _checkpoint_stats.clear()
+
+
+def get_checkpoint_stats() -> Dict[str, int]:
+    return {'pid': os.getpid(), 'checkpoint_ranges_saved': _checkpoint_stats['checkpoint_ranges_saved'],
+            'checkpoint_ranges_resumed': _checkpoint_stats['checkpoint_ranges_resumed']}
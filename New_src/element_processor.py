@@ -1,6 +1,282 @@
-from typing import Any, Dict, List, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
 import pandas as pd
-from unstructured.documents.coordinates import RelativeCoordinateSystem
+from unstructured.documents.coordinates import TYPE_TO_COORDINATE_SYSTEM_MAP, RelativeCoordinateSystem
+from unstructured.documents.elements import CoordinatesMetadata
+
+Points = Tuple[Tuple[float, float], ...]
+
+def _system_dict(system: Any) -> Dict[str, Any]:
+    return {
+        "name": type(system).__name__,
+        "orientation": system.orientation.name,
+        "width": system.width,
+        "height": system.height,
+    }
+
+def _convert_axis(values: np.ndarray, old_max: float, new_max: float, orientation: int) -> np.ndarray:
+    # Same operation order as unstructured's convert_coordinate, so float results match exactly
+    return ((1 - values / old_max) * (1 - orientation) / 2 + values / old_max * (1 + orientation) / 2) * new_max
+
+def _points_to_relative(points: np.ndarray, system: Any) -> np.ndarray:
+    """Convert an (n, 2) array of points in one coordinate system to relative coordinates."""
+    relative = RelativeCoordinateSystem()
+    x_orientation, y_orientation = system.orientation.value
+    rel_x_orientation, rel_y_orientation = relative.orientation.value
+    rel_x = _convert_axis(points[:, 0], system.width, 1, x_orientation)
+    rel_y = _convert_axis(points[:, 1], system.height, 1, y_orientation)
+    return np.column_stack([
+        _convert_axis(rel_x, 1, relative.width, rel_x_orientation),
+        _convert_axis(rel_y, 1, relative.height, rel_y_orientation),
+    ])
+
+def convert_to_relative(elements: List[Any]) -> List[Optional[Points]]:
+    """Relative coordinates for every element, batched per coordinate system.
+
+    Equivalent to element.convert_coordinates_to_new_system(RelativeCoordinateSystem(), in_place=False)
+    for each element, but all points sharing a coordinate system (in practice, a page) are
+    converted with one vectorized transform. Elements without coordinates map to None.
+    """
+    columns = ElementColumns(elements)
+    return [columns.relative_points_of(index) for index in range(len(columns))]
+
+# has_metadata, id, parent_id, page_number, detection_class_prob, text, category, text_as_html, filename,
+# and (coordinate system, points) or None
+ElementFields = Tuple[bool, Optional[str], Optional[str], Optional[int], Optional[float], str, str, Optional[str],
+                      Optional[str], Optional[Tuple[Any, Any]]]
+
+def _element_fields(element: Any) -> ElementFields:
+    metadata = element.metadata
+    coordinates = getattr(metadata, 'coordinates', None)
+    return (
+        bool(metadata),
+        getattr(element, 'id', None),
+        getattr(metadata, 'parent_id', None),
+        getattr(metadata, 'page_number', None),
+        getattr(metadata, 'detection_class_prob', None),
+        getattr(element, 'text', ''),
+        getattr(element, 'category', 'Unknown'),
+        getattr(metadata, 'text_as_html', None),
+        getattr(metadata, 'filename', None),
+        (coordinates.system, coordinates.points) if coordinates else None,
+    )
+
+def _system_from_dict(name: Optional[str], width: Any, height: Any) -> Any:
+    # As CoordinatesMetadata.from_dict parses the "system", "layout_width" and "layout_height" keys
+    if name == 'RelativeCoordinateSystem':
+        return RelativeCoordinateSystem()
+    if name in TYPE_TO_COORDINATE_SYSTEM_MAP and width is not None and height is not None:
+        return TYPE_TO_COORDINATE_SYSTEM_MAP[name](width, height)
+    return None
+
+def _dict_fields_reader() -> Callable[[Dict[str, Any]], ElementFields]:
+    """Field extractor for elements_to_dicts()-style dicts, as the partition API returns them."""
+    # One coordinate system object per (name, width, height)
+    systems: Dict[Tuple[Any, Any, Any], Any] = {}
+
+    def fields_of(element: Dict[str, Any]) -> ElementFields:
+        metadata = element.get('metadata') or {}
+        coordinates = metadata.get('coordinates')
+        if coordinates:
+            system_key = (coordinates.get('system'), coordinates.get('layout_width'), coordinates.get('layout_height'))
+            if system_key not in systems:
+                systems[system_key] = _system_from_dict(*system_key)
+            coordinates = (systems[system_key], coordinates.get('points'))
+        return (
+            True,
+            element.get('element_id'),
+            metadata.get('parent_id'),
+            metadata.get('page_number'),
+            metadata.get('detection_class_prob'),
+            element.get('text', ''),
+            element.get('type', 'Unknown'),
+            metadata.get('text_as_html'),
+            metadata.get('filename'),
+            coordinates or None,
+        )
+
+    return fields_of
+
+class ElementColumns:
+    """Struct-of-arrays record of a batch of elements, built in a single pass.
+
+    Every field is held once: categories, filenames and coordinate systems as small codes,
+    numbers in NumPy arrays, and all text in one string with offsets. The DataFrame and the
+    metadata dicts behind the JSON and HTML outputs are derived on demand instead of being
+    built eagerly side by side. Coordinates are kept as float64.
+    """
+
+    __slots__ = (
+        'ids', 'parent_ids', 'has_metadata', 'categories', 'category_codes', 'filenames', 'filename_codes',
+        'page_numbers', 'probabilities', 'systems', 'system_codes', 'point_offsets', 'points',
+        'relative_points', 'text', 'text_offsets', 'table_html',
+    )
+
+    # system_codes for elements without coordinates, and for coordinates that cannot be converted
+    NO_COORDINATES = -1
+    INVALID_COORDINATES = -2
+
+    def __init__(self, elements: List[Any]):
+        self._build(elements, _element_fields)
+
+    @classmethod
+    def from_dicts(cls, element_dicts: List[Dict[str, Any]]) -> 'ElementColumns':
+        """Build from element dicts as the partition API returns them, without creating Elements."""
+        columns = cls.__new__(cls)
+        columns._build(element_dicts, _dict_fields_reader())
+        return columns
+
+    def _build(self, elements: List[Any], fields_of: Callable[[Any], ElementFields]):
+        count = len(elements)
+        self.ids: List[Optional[str]] = []
+        self.parent_ids: List[Optional[str]] = []
+        self.has_metadata = np.zeros(count, dtype=bool)
+        self.categories: List[str] = []
+        self.category_codes = np.zeros(count, dtype=np.int16)
+        self.filenames: List[Optional[str]] = []
+        self.filename_codes = np.zeros(count, dtype=np.int32)
+        self.page_numbers: List[Optional[int]] = []
+        self.probabilities: List[Optional[float]] = []
+        self.systems: List[Any] = []
+        self.system_codes = np.full(count, self.NO_COORDINATES, dtype=np.int32)
+        self.point_offsets = np.zeros(count + 1, dtype=np.int64)
+        self.table_html: Dict[int, Optional[str]] = {}
+
+        category_lookup: Dict[str, int] = {}
+        filename_lookup: Dict[Optional[str], int] = {}
+        system_lookup: Dict[Tuple[Any, Any, Any], int] = {}
+        texts = []
+        flat_points = []
+        for index, element in enumerate(elements):
+            (has_metadata, element_id, parent_id, page_number, probability, text, category, table_html, filename,
+             coordinates) = fields_of(element)
+            self.has_metadata[index] = has_metadata
+            self.ids.append(element_id)
+            self.parent_ids.append(parent_id)
+            self.page_numbers.append(page_number)
+            self.probabilities.append(probability)
+            texts.append(text)
+
+            if category not in category_lookup:
+                category_lookup[category] = len(self.categories)
+                self.categories.append(category)
+            self.category_codes[index] = category_lookup[category]
+            if category.lower() == 'table':
+                self.table_html[index] = table_html
+
+            if filename not in filename_lookup:
+                filename_lookup[filename] = len(self.filenames)
+                self.filenames.append(filename)
+            self.filename_codes[index] = filename_lookup[filename]
+
+            if coordinates is not None:
+                system, points = coordinates
+                if getattr(system, 'orientation', None) is None or points is None:
+                    # extract_element_metadata records these elements without coordinates
+                    self.system_codes[index] = self.INVALID_COORDINATES
+                else:
+                    system_key = (type(system), system.width, system.height)
+                    if system_key not in system_lookup:
+                        system_lookup[system_key] = len(self.systems)
+                        self.systems.append(system)
+                    self.system_codes[index] = system_lookup[system_key]
+                    flat_points.extend(points)
+            self.point_offsets[index + 1] = len(flat_points)
+
+        self.text = ''.join(texts)
+        self.text_offsets = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum([len(text) for text in texts], out=self.text_offsets[1:])
+
+        self.points = np.array(flat_points, dtype=np.float64).reshape(-1, 2)
+        self.relative_points = np.empty_like(self.points)
+        if len(self.points):
+            point_system_codes = np.repeat(self.system_codes, np.diff(self.point_offsets))
+            order = np.argsort(point_system_codes, kind='stable')
+            bounds = np.searchsorted(point_system_codes[order], np.arange(len(self.systems) + 1))
+            for code, system in enumerate(self.systems):
+                selected = order[bounds[code]:bounds[code + 1]]
+                self.relative_points[selected] = _points_to_relative(self.points[selected], system)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def text_of(self, index: int) -> str:
+        return self.text[self.text_offsets[index]:self.text_offsets[index + 1]]
+
+    def category_of(self, index: int) -> str:
+        return self.categories[self.category_codes[index]]
+
+    def points_of(self, index: int) -> Optional[Points]:
+        if self.system_codes[index] < 0:
+            return None
+        start, end = self.point_offsets[index], self.point_offsets[index + 1]
+        return tuple(map(tuple, self.points[start:end].tolist()))
+
+    def relative_points_of(self, index: int) -> Optional[Points]:
+        if self.system_codes[index] < 0:
+            return None
+        start, end = self.point_offsets[index], self.point_offsets[index + 1]
+        return tuple(map(tuple, self.relative_points[start:end].tolist()))
+
+    def coordinates_of(self, index: int) -> Optional[CoordinatesMetadata]:
+        if self.system_codes[index] < 0:
+            return None
+        return CoordinatesMetadata(points=self.points_of(index), system=self.systems[self.system_codes[index]])
+
+    def metadata_of(self, index: int, system_dicts: List[Dict[str, Any]] = None,
+                    relative_system_dict: Dict[str, Any] = None) -> Dict[str, Any]:
+        """The extract_element_metadata dict of one element, with the same keys in the same order."""
+        system_code = self.system_codes[index]
+        metadata = {
+            "id": self.ids[index],
+            "text": self.text_of(index),
+            "category": self.category_of(index),
+            "filename": self.filenames[self.filename_codes[index]],
+            "parent_id": self.parent_ids[index],
+            "coordinates": None,
+            "detection_class_prob": self.probabilities[index],
+            "page_number": self.page_numbers[index],
+        }
+        if system_code >= 0:
+            metadata["coordinates"] = {
+                "points": self.points_of(index),
+                "system": system_dicts[system_code] if system_dicts else _system_dict(self.systems[system_code]),
+            }
+            metadata["relative_coordinates"] = {
+                "points": self.relative_points_of(index),
+                "system": relative_system_dict or _system_dict(RelativeCoordinateSystem()),
+            }
+        elif system_code == self.INVALID_COORDINATES:
+            metadata["relative_coordinates"] = None
+        if index in self.table_html:
+            metadata["text_as_html"] = self.table_html[index]
+        return metadata
+
+    def iter_metadata(self) -> Iterator[Dict[str, Any]]:
+        # The system dicts are shared between elements; they are only ever serialized
+        system_dicts = [_system_dict(system) for system in self.systems]
+        relative_system_dict = _system_dict(RelativeCoordinateSystem())
+        for index in range(len(self)):
+            yield self.metadata_of(index, system_dicts, relative_system_dict)
+
+    def to_metadata(self) -> List[Dict[str, Any]]:
+        return list(self.iter_metadata())
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """The elements_data.csv rows: one per element with metadata."""
+        rows = np.flatnonzero(self.has_metadata).tolist()
+        if not rows:
+            return pd.DataFrame([])
+        return pd.DataFrame({
+            "Page Number": [self.page_numbers[i] for i in rows],
+            "Element ID": [self.ids[i] for i in rows],
+            "Parent Element": [self.parent_ids[i] for i in rows],
+            "Coordinates": [self.coordinates_of(i) for i in rows],
+            "Detection Class Probability": [self.probabilities[i] for i in rows],
+            "Category": [self.category_of(i) for i in rows],
+            "Text": [self.text_of(i) for i in rows],
+            "Table as HTML": [self.table_html.get(i) for i in rows],
+        })
 
 def extract_element_metadata(element: Any) -> Dict[str, Any]:
     metadata = {
@@ -19,23 +295,14 @@ def extract_element_metadata(element: Any) -> Dict[str, Any]:
             pixel_coords = element.metadata.coordinates
             metadata["coordinates"] = {
                 "points": pixel_coords.points,
-                "system": {
-                    "name": pixel_coords.system.name,
-                    "orientation": pixel_coords.system.orientation,
-                    "width": pixel_coords.system.width,
-                    "height": pixel_coords.system.height,
-                }
+                "system": _system_dict(pixel_coords.system),
             }
 
-            relative_coords = element.convert_coordinates_to_new_system(RelativeCoordinateSystem())
+            # in_place=False: the element's own coordinates are still written to the other outputs
+            relative_points = element.convert_coordinates_to_new_system(RelativeCoordinateSystem(), in_place=False)
             metadata["relative_coordinates"] = {
-                "points": relative_coords.points,
-                "system": {
-                    "name": relative_coords.system.name,
-                    "orientation": relative_coords.system.orientation,
-                    "width": relative_coords.system.width,
-                    "height": relative_coords.system.height,
-                }
+                "points": relative_points,
+                "system": _system_dict(RelativeCoordinateSystem()),
             }
     except AttributeError:
         metadata["coordinates"] = None
@@ -49,29 +316,26 @@ def extract_element_metadata(element: Any) -> Dict[str, Any]:
     return metadata
 
 def process_elements(elements: List[Any]) -> Tuple[pd.DataFrame, List[Any], List[Dict[str, Any]]]:
-    all_elements_data = []
-    tables = []
-    all_elements_metadata = []
+    columns = ElementColumns(elements)
+    tables = [element for element in elements if element.category == "Table"]
+    return columns.to_dataframe(), tables, columns.to_metadata()
 
-    for element in elements:
-        element_metadata = extract_element_metadata(element)
-        all_elements_metadata.append(element_metadata)
-
-        if element.metadata:
-            new_row = {
-                "Page Number": getattr(element.metadata, 'page_number', None),
-                "Element ID": getattr(element, 'id', None),
-                "Parent Element": getattr(element.metadata, 'parent_id', None),
-                "Coordinates": getattr(element.metadata, 'coordinates', None),
-                "Detection Class Probability": getattr(element.metadata, 'detection_class_prob', None),
-                "Category": getattr(element, 'category', 'Unknown'),
-                "Text": getattr(element, 'text', ''),
-                "Table as HTML": getattr(element.metadata, 'text_as_html', None) if getattr(element, 'category', '').lower() == 'table' else None
-            }
-            all_elements_data.append(new_row)
+def iter_pages(elements: Iterable[Any]) -> Iterator[List[Any]]:
+    """Group page-ordered elements into one list per page.
 
-        if element.category == "Table":
-            tables.append(element)
-
-    all_elements_df = pd.DataFrame(all_elements_data)
-    return all_elements_df, tables, all_elements_metadata
+    Elements without a page number (the PageBreak closing each page) stay with the page
+    before them. Each batch then mixes numbered and unnumbered rows like the whole document
+    does, so pandas formats elements_data.csv's page numbers the same way for both.
+    """
+    page: List[Any] = []
+    page_number = None
+    for element in elements:
+        number = getattr(element.metadata, 'page_number', None)
+        if number is not None:
+            if page and number != page_number:
+                yield page
+                page = []
+            page_number = number
+        page.append(element)
+    if page:
+        yield page
@@ -1,77 +1,46 @@
 import json
-from typing import List, Dict, Any, Tuple
-from typing import List, Any
+import os
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 from pathlib import Path
+import numpy as np
 import pandas as pd
 import logging
-from collections import defaultdict
+from collections import Counter, defaultdict
+from concurrent.futures import wait
 import html
-import concurrent.futures
+import shutil
 from io import StringIO
 
-logging.basicConfig(level=logging.WARNING)
-logger = logging.getLogger(__name__)
+from unstructured.staging.base import _fix_metadata_field_precision, elements_to_dicts
 
-def save_elements_data(df: pd.DataFrame, output_folder: Path):
-    csv_path = output_folder / "elements_data.csv"
-    df.to_csv(csv_path, index=False)
+from element_processor import ElementColumns
+from html_tables import read_html_tables
+from io_executor import OrderedWriter, submit_io, wait_io
+from telemetry import stage
 
-def save_metadata_json(metadata: List[Dict[str, Any]], output_folder: Path):
-    json_path = output_folder / "all_elements_metadata.json"
-    with open(json_path, 'w') as f:
-        json.dump(metadata, f, indent=2)
+from utils import extract_entity_name, extract_year_from_filename
 
-def save_metadata_html(metadata: List[Dict[str, Any]], output_folder: Path):
-    try:
-        html_path = output_folder / "all_elements_metadata.html"
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-        # Group elements by page number
-        pages = defaultdict(list)
-        for elem in metadata:
-            if elem['category'] == 'PageBreak':
-                # Add page break to the previous page
-                if pages:
-                    pages[max(pages.keys())].append(elem)
-            else:
-                page_num = elem.get('page_number')
-                if page_num is not None:
-                    pages[page_num].append(elem)
-                else:
-                    logger.warning(f"Element with id {elem.get('id')} has no page number. Skipping.")
-
-        # Helper function to get element by category for a specific page
-        def get_element_by_category(elements: List[Dict[str, Any]], category: str) -> Dict[str, Any]:
-            return next((elem for elem in elements if elem['category'] == category), None)
-
-        # Helper function to get all elements by category for a specific page
-        def get_elements_by_category(elements: List[Dict[str, Any]], category: str) -> List[Dict[str, Any]]:
-            return [elem for elem in elements if elem['category'] == category]
-
-        # Helper function to render an element based on its category
-        def render_element(elem: Dict[str, Any]) -> str:
-            category = elem['category']
-            if category in ['Header', 'Title']:
-                return f'<div class="{category.lower()}">{html.escape(elem["text"])}</div>'
-            elif category == 'NarrativeText':
-                return f'<div class="narrative-text">{html.escape(elem["text"])}</div>'
-            elif category == 'Table':
-                table_html = f'<div class="table-container">'
-                if elem.get('parent_id'):
-                    table_html += f'<div class="table-title">{html.escape(elem["parent_id"])}</div>'
-                if elem.get('text_as_html'):
-                    table_html += elem['text_as_html']
-                else:
-                    logger.warning(f"Table with id {elem.get('id')} has no HTML content. Skipping.")
-                table_html += '</div>'
-                return table_html
-            elif category == 'Image':
-                # Assuming 'text' field contains image description or alt text
-                return f'<div class="image-container"><img src="{html.escape(elem.get("src", ""))}" alt="{html.escape(elem["text"])}" /></div>'
-            else:
-                # For any other categories, render as a generic div with the category as the class
-                return f'<div class="{category.lower()}">{html.escape(elem["text"])}</div>'
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
 
-        html_content = """
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+ELEMENTS_DATASET_DIR = 'elements_dataset'
+
+# Per-process output time by sink, reported back to the main process with the worker stats
+_sink_seconds = Counter()
+
+HTML_HEADER = """
         <!DOCTYPE html>
         <html lang="en">
         <head>
@@ -127,95 +96,561 @@ def save_metadata_html(metadata: List[Dict[str, Any]], output_folder: Path):
         <body>
         """
 
-        for page_num, elements in sorted(pages.items()):
-            if page_num > 1:
-                html_content += '<div class="page-break"></div>'
+HTML_FOOTER = """
+        </body>
+        </html>
+        """
 
-            html_content += f'<h1>Page {page_num}</h1>'
+PAGE_BREAK_HTML = '<div class="page-break"></div>'
+
+# (prefix, suffix) around the escaped text; other text categories use their lowercased name as the class
+TEXT_ELEMENT_TEMPLATES = {
+    'Header': ('<div class="header">', '</div>'),
+    'Title': ('<div class="title">', '</div>'),
+    'NarrativeText': ('<div class="narrative-text">', '</div>'),
+}
+
+def render_metadata_element(elem: Dict[str, Any]) -> str:
+    category = elem['category']
+    template = TEXT_ELEMENT_TEMPLATES.get(category)
+    if template is not None:
+        return template[0] + html.escape(elem["text"]) + template[1]
+    elif category == 'Table':
+        parts = ['<div class="table-container">']
+        if elem.get('parent_id'):
+            parts.append(f'<div class="table-title">{html.escape(elem["parent_id"])}</div>')
+        if elem.get('text_as_html'):
+            parts.append(elem['text_as_html'])
+        else:
+            logger.warning(f"Table with id {elem.get('id')} has no HTML content. Skipping.")
+        parts.append('</div>')
+        return ''.join(parts)
+    elif category == 'Image':
+        # Assuming 'text' field contains image description or alt text
+        return f'<div class="image-container"><img src="{html.escape(elem.get("src", ""))}" alt="{html.escape(elem["text"])}" /></div>'
+    else:
+        # For any other categories, render as a generic div with the category as the class
+        return f'<div class="{category.lower()}">{html.escape(elem["text"])}</div>'
+
+def write_html_page(f, page_num: int, fragments: List[str], has_page_break: bool):
+    if page_num > 1:
+        f.write(PAGE_BREAK_HTML)
+    f.write(f'<h1>Page {page_num}</h1>')
+    f.writelines(fragments)
+    if has_page_break:
+        f.write(PAGE_BREAK_HTML)
+
+def temp_output_path(path: Path) -> Path:
+    return path.with_name(path.name + '.tmp')
+
+def open_output(path: Path, buffer_size: int = -1, newline: Optional[str] = None):
+    """Open an output under a temporary name; commit_output() renames it into place.
+
+    A document that fails partway leaves its previous outputs as they were instead of a
+    truncated file, and the file the last run wrote is replaced rather than written through.
+    """
+    return open(temp_output_path(path), 'w', encoding='utf-8', newline=newline, buffering=buffer_size)
 
-            # Render all elements on the page
-            for elem in elements:
-                if elem['category'] != 'PageBreak':
-                    html_content += render_element(elem)
+def commit_output(path: Path):
+    os.replace(temp_output_path(path), path)
 
-            # Check for page break
-            if get_element_by_category(elements, 'PageBreak'):
-                html_content += '<div class="page-break"></div>'
+def discard_output(path: Path):
+    temp_output_path(path).unlink(missing_ok=True)
 
-        html_content += """
-        </body>
-        </html>
-        """
+def save_table_part(parent_id: str, i: int, table_html: Optional[str], page_number: Any,
+                    output_folder: Path) -> Optional[str]:
+    if table_html is None:
+        logger.warning(f"No HTML data for table in group {parent_id} on page {page_number}. Skipping.")
+        return None
 
-        with open(html_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+    try:
+        tables_df = read_html_tables(table_html)
+        if tables_df:
+            current_df = tables_df[0]
+            logger.info(f"Table {i} in group {parent_id} has shape: {current_df.shape}")
+            current_df["Parent ID"] = str(parent_id) if parent_id is not None else "unknown"
+            current_df["Page Number"] = page_number
+            csv_filename = f"table_{parent_id or 'unknown'}_page{page_number}_part{i + 1}.csv"
+            csv_path = output_folder / csv_filename
+            try:
+                current_df.to_csv(temp_output_path(csv_path), index=False)
+                commit_output(csv_path)
+            except BaseException:
+                discard_output(csv_path)
+                raise
+            logger.info(f"Saved individual CSV table to {csv_path}")
+            return csv_filename
+        logger.warning(f"No tables found in HTML for table in group {parent_id} on page {page_number}")
+    except ValueError as e:
+        logger.warning(f"Error parsing HTML table: {str(e)}")
+        logger.debug(f"Problematic HTML content: {table_html}")
+        # Continue processing other tables instead of raising an exception
+    return None
+
+class ElementBatch(NamedTuple):
+    # Element objects, or element dicts when the backend returned those
+    elements: List[Any]
+    columns: ElementColumns
+
+def dumps_json(obj: Any, indent: Optional[int] = None, sort_keys: bool = False) -> str:
+    """Serialize to JSON, using orjson for compact output when it is installed."""
+    if indent is not None:
+        return json.dumps(obj, indent=indent, sort_keys=sort_keys)
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else 0).decode('utf-8')
+        except TypeError:
+            # orjson rejects some types json accepts (e.g. numpy scalars); fall back to json
+            pass
+    return json.dumps(obj, separators=(',', ':'), sort_keys=sort_keys, ensure_ascii=False)
+
+class SinkOptions(NamedTuple):
+    compact_json: bool = False
+    buffer_size: int = -1
+    source_path: Optional[Path] = None
+    dataset_dir: Optional[Path] = None
+
+class JsonArraySink:
+    """Write a JSON array batch by batch, byte-identical to dumping the whole list at once.
+
+    Each batch is serialized as a list with the same settings; its brackets are stripped
+    and the items are joined onto the array already on disk.
+    """
 
-        logger.info(f"HTML file created: {html_path}")
+    def __init__(self, path: Path, indent: Optional[int], sort_keys: bool = False, buffer_size: int = -1):
+        self.path = path
+        # Serialized here, written out on the shared I/O threads
+        self.file = OrderedWriter(open_output(path, buffer_size))
+        self.indent = indent
+        self.sort_keys = sort_keys
+        # "[\n" ... "\n]" when indented, "[" ... "]" when compact
+        self.bracket = 2 if indent is not None else 1
+        self.items_written = False
+
+    def write_items(self, items: List[Any]):
+        if not items:
+            return
+        chunk = dumps_json(items, self.indent, self.sort_keys)
+        self.file.write(',' + chunk[1:self.bracket] if self.items_written else chunk[:self.bracket])
+        self.file.write(chunk[self.bracket:-self.bracket])
+        self.items_written = True
+
+    def close(self):
+        self.file.write(('\n]' if self.indent is not None else ']') if self.items_written else '[]')
+        self.file.close()
+        commit_output(self.path)
+
+    def abort(self):
+        try:
+            self.file.abort()
+        finally:
+            discard_output(self.path)
+
+class ElementsCsvSink:
+    name = 'csv'
+    filename = "elements_data.csv"
+
+    def __init__(self, output_folder: Path, options: SinkOptions):
+        self.path = output_folder / self.filename
+        self.file = open_output(self.path, options.buffer_size, newline='')
+        self.header_written = False
+
+    def write(self, batch: ElementBatch):
+        df = batch.columns.to_dataframe()
+        if df.empty:
+            return
+        df.to_csv(self.file, index=False, header=not self.header_written)
+        self.header_written = True
+
+    def close(self) -> List[str]:
+        if not self.header_written:
+            pd.DataFrame().to_csv(self.file, index=False)
+        self.file.close()
+        commit_output(self.path)
+        return [self.filename]
+
+    def abort(self):
+        try:
+            self.file.close()
+        finally:
+            discard_output(self.path)
 
-    except Exception as e:
-        logger.error(f"An error occurred while creating the HTML file: {str(e)}")
-        raise
+class MetadataJsonSink:
+    name = 'metadata_json'
+    filename = "all_elements_metadata.json"
 
-def save_tables(tables: List[Any], output_folder: Path):
-    # Group tables by parent ID
-    grouped_tables = defaultdict(list)
-    for table in tables:
-        parent_id = getattr(table.metadata, 'parent_id', 'unknown_parent')
-        grouped_tables[parent_id].append(table)
+    def __init__(self, output_folder: Path, options: SinkOptions):
+        self.array = JsonArraySink(output_folder / self.filename, None if options.compact_json else 2,
+                                   buffer_size=options.buffer_size)
 
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        futures = []
-        for parent_id, table_group in grouped_tables.items():
-            futures.append(executor.submit(process_table_group, parent_id, table_group, output_folder))
+    def write(self, batch: ElementBatch):
+        self.array.write_items(batch.columns.to_metadata())
 
-        for future in concurrent.futures.as_completed(futures):
-            try:
-                future.result()
-            except Exception as e:
-                logger.error(f"Error processing table group: {str(e)}", exc_info=True)
+    def close(self) -> List[str]:
+        self.array.close()
+        return [self.filename]
 
-def process_table_group(parent_id: str, table_group: List[Any], output_folder: Path):
-    try:
-        combined_html_content = ""
-        page_numbers = set()
+    def abort(self):
+        self.array.abort()
+
+class MetadataJsonlSink:
+    name = 'metadata_jsonl'
+    filename = "all_elements_metadata.jsonl"
+
+    def __init__(self, output_folder: Path, options: SinkOptions):
+        self.path = output_folder / self.filename
+        self.file = OrderedWriter(open_output(self.path, options.buffer_size))
 
-        for i, table in enumerate(table_group):
-            table_html = getattr(table.metadata, 'text_as_html', None)
-            page_number = getattr(table.metadata, 'page_number', f'unknown_page_{i}')
-            page_numbers.add(str(page_number))
+    def write(self, batch: ElementBatch):
+        self.file.write(''.join(dumps_json(elem) + '\n' for elem in batch.columns.iter_metadata()))
 
-            if table_html is None:
-                logger.warning(f"No HTML data for table in group {parent_id} on page {page_number}. Skipping.")
+    def close(self) -> List[str]:
+        self.file.close()
+        commit_output(self.path)
+        return [self.filename]
+
+    def abort(self):
+        try:
+            self.file.abort()
+        finally:
+            discard_output(self.path)
+
+class MetadataHtmlSink:
+    """Render the metadata HTML as elements arrive, grouped by page in one pass.
+
+    Each element is rendered to its HTML fragment straight away, and a page is written out
+    once an element of a later page arrives. Pages arrive in order, so the sink holds the
+    fragments of the latest page only (all of a batch's pages while it is written). An
+    element that arrives after its page was written is held and inserted at its page's
+    place when the sink is closed, so the file is the same as grouping every page at the end.
+    """
+
+    name = 'html'
+    filename = "all_elements_metadata.html"
+
+    def __init__(self, output_folder: Path, options: SinkOptions):
+        self.html_path = output_folder / self.filename
+        self.file = open_output(self.html_path, options.buffer_size)
+        self.file.write(HTML_HEADER)
+        self.pages = defaultdict(list)
+        self.pages_with_break = set()
+        self.last_page = None
+        # (start, end of fragments) in the file of each page written so far
+        self.page_offsets = {}
+        self.written_through = None
+        self.late_pages = defaultdict(list)
+
+    def write(self, batch: ElementBatch):
+        for elem in batch.columns.iter_metadata():
+            if elem['category'] == 'PageBreak':
+                # Add page break to the highest page seen so far
+                if self.last_page is not None:
+                    self.pages_with_break.add(self.last_page)
+                continue
+            page_num = elem.get('page_number')
+            if page_num is None:
+                logger.warning(f"Element with id {elem.get('id')} has no page number. Skipping.")
                 continue
+            if self.written_through is not None and page_num <= self.written_through:
+                self.late_pages[page_num].append(render_metadata_element(elem))
+                continue
+            self.pages[page_num].append(render_metadata_element(elem))
+            if self.last_page is None or page_num > self.last_page:
+                self.last_page = page_num
+        # The latest page may continue in the next batch, and only it can still get a page break
+        self._write_pages(below=self.last_page)
+
+    def _write_pages(self, below: Any = None):
+        for page_num in sorted(page for page in self.pages if below is None or page < below):
+            has_page_break = page_num in self.pages_with_break
+            start = self.file.tell()
+            write_html_page(self.file, page_num, self.pages.pop(page_num), has_page_break)
+            self.page_offsets[page_num] = (start, self.file.tell() - (len(PAGE_BREAK_HTML) if has_page_break else 0))
+            self.written_through = page_num
+
+    def _insert_late_pages(self):
+        """Rewrite the file with each late element at the end of its page, as if it had arrived in order."""
+        insertions = []
+        for page_num, fragments in self.late_pages.items():
+            if page_num in self.page_offsets:
+                insertions.append((self.page_offsets[page_num][1], page_num, ''.join(fragments)))
+            else:
+                # A page seen only after later pages were written goes in front of the next one
+                rendered = StringIO()
+                write_html_page(rendered, page_num, fragments, False)
+                offset = min(start for page, (start, _) in self.page_offsets.items() if page > page_num)
+                insertions.append((offset, page_num, rendered.getvalue()))
+        temp_path = temp_output_path(self.html_path)
+        rewritten_path = temp_output_path(temp_path)
+        try:
+            with open(temp_path, 'rb') as source, open(rewritten_path, 'wb') as destination:
+                position = 0
+                for offset, _, text in sorted(insertions):
+                    while position < offset:
+                        chunk = source.read(min(offset - position, 1024 * 1024))
+                        destination.write(chunk)
+                        position += len(chunk)
+                    destination.write(text.encode('utf-8'))
+                shutil.copyfileobj(source, destination)
+            os.replace(rewritten_path, temp_path)
+        finally:
+            rewritten_path.unlink(missing_ok=True)
+
+    def close(self) -> List[str]:
+        self._write_pages()
+        self.file.write(HTML_FOOTER)
+        self.file.close()
+        if self.late_pages:
+            self._insert_late_pages()
+        commit_output(self.html_path)
+        logger.info(f"HTML file created: {self.html_path}")
+        return [self.filename]
+
+    def abort(self):
+        try:
+            self.file.close()
+        finally:
+            discard_output(self.html_path)
+
+class RawElementsJsonSink:
+    name = 'raw_json'
+    filename = "raw_elements.json"
+
+    def __init__(self, output_folder: Path, options: SinkOptions):
+        # Same layout as elements_to_json(), which indents by 4 and sorts keys
+        self.array = JsonArraySink(output_folder / self.filename, None if options.compact_json else 4,
+                                   sort_keys=True, buffer_size=options.buffer_size)
+
+    def write(self, batch: ElementBatch):
+        if batch.elements and isinstance(batch.elements[0], dict):
+            # The API's dicts are already elements_to_json() output
+            self.array.write_items(batch.elements)
+        else:
+            self.array.write_items(elements_to_dicts(_fix_metadata_field_precision(batch.elements)))
+
+    def close(self) -> List[str]:
+        self.array.close()
+        return [self.filename]
+
+    def abort(self):
+        self.array.abort()
+
+class TableSink:
+    """Parse and write each table's CSV on the shared I/O threads."""
+
+    name = 'tables'
+
+    def __init__(self, output_folder: Path, options: SinkOptions):
+        self.output_folder = output_folder
+        self.parts = defaultdict(int)
+        self.futures = []
+
+    def write(self, batch: ElementBatch):
+        columns = batch.columns
+        for index, table_html in columns.table_html.items():
+            parent_id = columns.parent_ids[index]
+            self.futures.append(submit_io(save_table_part, parent_id, self.parts[parent_id], table_html,
+                                          columns.page_numbers[index], self.output_folder))
+            self.parts[parent_id] += 1
+
+    def close(self) -> List[str]:
+        return [csv_filename for csv_filename in wait_io(self.futures) if csv_filename]
+
+    def abort(self):
+        # Tables already being written finish; the rest are dropped
+        for future in self.futures:
+            future.cancel()
+        wait(self.futures)
+
+def elements_arrow_schema() -> 'pa.Schema':
+    return pa.schema([
+        ('source_file', pa.string()),
+        ('element_id', pa.string()),
+        ('parent_id', pa.string()),
+        ('category', pa.dictionary(pa.int32(), pa.string())),
+        ('page_number', pa.int32()),
+        ('text', pa.string()),
+        # x0, y0, ... x3, y3 of the element's four corner points
+        ('coordinates', pa.list_(pa.float64(), 8)),
+        ('layout_width', pa.float64()),
+        ('layout_height', pa.float64()),
+        ('detection_class_prob', pa.float64()),
+        ('text_as_html', pa.string()),
+    ])
+
+def elements_arrow_table(columns: ElementColumns, source_file: str) -> 'pa.Table':
+    """Convert the elements with metadata (the elements_data.csv rows) to the dataset schema."""
+    rows = np.flatnonzero(columns.has_metadata)
+    system_codes = columns.system_codes[rows].tolist()
+    point_counts = np.diff(columns.point_offsets)[rows].tolist()
+    systems = [columns.systems[code] if code >= 0 else None for code in system_codes]
+    return pa.Table.from_arrays([
+        pa.array([source_file] * len(rows), type=pa.string()),
+        pa.array([columns.ids[i] for i in rows], type=pa.string()),
+        pa.array([columns.parent_ids[i] for i in rows], type=pa.string()),
+        pa.DictionaryArray.from_arrays(columns.category_codes[rows].astype(np.int32), columns.categories),
+        pa.array([columns.page_numbers[i] for i in rows], type=pa.int32()),
+        pa.array([columns.text_of(i) for i in rows], type=pa.string()),
+        pa.array([
+            columns.points[columns.point_offsets[i]:columns.point_offsets[i] + 4].ravel()
+            if code >= 0 and count == 4 else None
+            for i, code, count in zip(rows, system_codes, point_counts)
+        ], type=pa.list_(pa.float64(), 8)),
+        pa.array([system.width if system else None for system in systems], type=pa.float64()),
+        pa.array([system.height if system else None for system in systems], type=pa.float64()),
+        pa.array([columns.probabilities[i] for i in rows], type=pa.float64()),
+        pa.array([columns.table_html.get(i) for i in rows], type=pa.string()),
+    ], schema=elements_arrow_schema())
+
+class ParquetSink:
+    """Append the document's elements to the corpus-wide Parquet dataset under output_dir.
+
+    The dataset is hive-partitioned as entity=<entity>/year=<year>/ with one file per
+    source PDF, so reprocessing a PDF replaces its rows instead of duplicating them. The
+    file is written under a temporary name and renamed into place when complete; an
+    aborted document deletes it and leaves the dataset as it was.
+    """
 
-            combined_html_content += f"<h2>Table Part {i + 1} (Page {page_number})</h2>\n{table_html}\n"
+    name = 'parquet'
+
+    def __init__(self, output_folder: Path, options: SinkOptions):
+        if pa is None:
+            raise ImportError("The parquet output sink requires pyarrow")
+        if options.source_path is None:
+            raise ValueError("The parquet output sink needs the source PDF path")
+        source_path = options.source_path
+        dataset_dir = options.dataset_dir or output_folder.parent / ELEMENTS_DATASET_DIR
+        partition_dir = (dataset_dir / f"entity={extract_entity_name(source_path)}"
+                         / f"year={extract_year_from_filename(source_path.name)}")
+        partition_dir.mkdir(parents=True, exist_ok=True)
+        self.path = partition_dir / f"{source_path.stem}.parquet"
+        self.tmp_path = partition_dir / f"{source_path.stem}.parquet.tmp"
+        self.source_file = source_path.name
+        self.writer = None
+
+    def write(self, batch: ElementBatch):
+        if not batch.columns.has_metadata.any():
+            return
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(str(self.tmp_path), elements_arrow_schema())
+        self.writer.write_table(elements_arrow_table(batch.columns, self.source_file))
+
+    def close(self) -> List[str]:
+        if self.writer is None:
+            # No elements: drop rows left over from an earlier run of this PDF
+            self.path.unlink(missing_ok=True)
+        else:
+            self.writer.close()
+            self.writer = None
+            os.replace(self.tmp_path, self.path)
+        # The dataset lives outside the document's output folder
+        return []
+
+    def abort(self):
+        if self.writer is not None:
+            try:
+                self.writer.close()
+            finally:
+                self.writer = None
+                self.tmp_path.unlink(missing_ok=True)
+
+OUTPUT_SINKS = {sink.name: sink for sink in (
+    ElementsCsvSink, MetadataJsonSink, MetadataJsonlSink, MetadataHtmlSink, RawElementsJsonSink, TableSink,
+    ParquetSink,
+)}
+DEFAULT_OUTPUT_SINKS = ['csv', 'metadata_json', 'html', 'tables', 'raw_json']
+
+class ElementWriter:
+    """Fan a single pass over the elements out to every configured output sink.
+
+    The elements are collected into ElementColumns once per batch and each sink derives
+    the view it needs (DataFrame, metadata dicts, Arrow table) from that shared record.
+    Batches of element dicts, as the partition API returns them, are read straight into
+    ElementColumns without building Element objects.
+    Batches may be a whole document or one page at a time; the files come out the same.
+    Time spent in each sink is accumulated so slow outputs show up in the run summary.
+    Call close() once every batch is written, or abort() if writing failed.
+    """
 
+    def __init__(self, output_folder: Path, sinks: List[str] = None, options: SinkOptions = SinkOptions()):
+        unknown = set(sinks or []) - set(OUTPUT_SINKS)
+        if unknown:
+            raise ValueError(f"Unknown output sinks: {', '.join(sorted(unknown))}")
+        self.sinks = [OUTPUT_SINKS[name](output_folder, options)
+                      for name in sinks or DEFAULT_OUTPUT_SINKS]
+        self.sink_seconds = Counter()
+        self.closed = False
+
+    def write(self, elements: List[Any]):
+        started = time.perf_counter()
+        with stage('post_processing'):
+            if elements and isinstance(elements[0], dict):
+                columns = ElementColumns.from_dicts(elements)
+            else:
+                columns = ElementColumns(elements)
+            batch = ElementBatch(elements, columns)
+        self.sink_seconds['element_columns'] += time.perf_counter() - started
+        for sink in self.sinks:
+            started = time.perf_counter()
+            with stage(f'sink:{sink.name}'):
+                sink.write(batch)
+            self.sink_seconds[sink.name] += time.perf_counter() - started
+
+    def close(self) -> List[str]:
+        """Close every sink, aborting any that fails, then re-raise the first failure."""
+        self.closed = True
+        artifacts = []
+        error = None
+        for sink in self.sinks:
+            started = time.perf_counter()
             try:
-                tables_df = pd.read_html(StringIO(table_html))
-                if tables_df:
-                    current_df = tables_df[0]
-                    logger.info(f"Table {i} in group {parent_id} has shape: {current_df.shape}")
-                    current_df["Parent ID"] = str(parent_id) if parent_id is not None else "unknown"
-                    current_df["Page Number"] = page_number
-                    csv_filename = f"table_{parent_id or 'unknown'}_page{page_number}_part{i + 1}.csv"
-                    csv_path = output_folder / csv_filename
-                    current_df.to_csv(csv_path, index=False)
-                    logger.info(f"Saved individual CSV table to {csv_path}")
-                else:
-                    logger.warning(f"No tables found in HTML for table in group {parent_id} on page {page_number}")
-            except ValueError as e:
-                logger.warning(f"Error parsing HTML table: {str(e)}")
-                logger.debug(f"Problematic HTML content: {table_html}")
-                # Continue processing other tables instead of raising an exception
-
-        # Rest of the function remains the same
-        # ...
-
-    except Exception as e:
-        logger.error(f"Error processing table group {parent_id}: {str(e)}", exc_info=True)
-        # Don't raise the exception, allow processing to continue for other table groups
-
-def load_error_files(error_log_file: Path) -> List[str]:
+                with stage(f'sink:{sink.name}'):
+                    artifacts.extend(sink.close())
+            except Exception as e:
+                if error is not None:
+                    logger.error(f"Error closing the {sink.name} output: {str(e)}")
+                error = error or e
+                self._abort_sink(sink)
+            self.sink_seconds[sink.name] += time.perf_counter() - started
+        _sink_seconds.update(self.sink_seconds)
+        logger.debug("Output time per sink: " + ", ".join(
+            f"{name} {seconds:.3f}s" for name, seconds in self.sink_seconds.items()))
+        if error is not None:
+            raise error
+        return artifacts
+
+    def abort(self):
+        """Release every sink without completing its output, e.g. a partial Parquet file."""
+        if self.closed:
+            return
+        self.closed = True
+        for sink in self.sinks:
+            self._abort_sink(sink)
+
+    @staticmethod
+    def _abort_sink(sink: Any):
+        try:
+            sink.abort()
+        except Exception as e:
+            # The error that caused the abort is the one worth raising
+            logger.warning(f"Error aborting the {sink.name} output: {str(e)}")
+
+def fsync_outputs(output_folder: Path, filenames: List[str]):
+    """Force written artifacts to disk before they are recorded as complete."""
+    # Windows only flushes handles opened for writing; elsewhere read-only also covers
+    # hardlinked inputs the process may not be allowed to write
+    flags = os.O_RDWR if os.name == 'nt' else os.O_RDONLY
+    for filename in filenames:
+        fd = os.open(output_folder / filename, flags)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+def get_sink_stats() -> Dict[str, Any]:
+    return {'pid': os.getpid(), 'sink_seconds': dict(_sink_seconds)}
+
+def load_error_files(error_log_file: Path) -> List[Any]:
     if error_log_file.exists():
         try:
             with open(error_log_file, 'r') as f:
@@ -224,11 +659,16 @@ def load_error_files(error_log_file: Path) -> List[str]:
             return []
     return []
 
-def update_error_log(error_files: List[str], error_log_file: Path):
+def update_error_log(error_files: List[Any], error_log_file: Path):
     with open(error_log_file, 'w') as f:
         json.dump(error_files, f, indent=2)
 
-def generate_summary_report(successful_files: List[str], failed_files: List[str], output_dir: Path):
+def save_cost_log(cost_log: List[Dict[str, Any]], output_dir: Path):
+    csv_path = output_dir / 'cost_estimates.csv'
+    pd.DataFrame(cost_log).to_csv(csv_path, index=False)
+
+def generate_summary_report(successful_files: List[str], failed_files: List[str], output_dir: Path,
+                            run_stats: Dict[str, Any] = None):
     report = f"""
     PDF Processing Summary Report
     ============================
@@ -240,6 +680,11 @@ def generate_summary_report(successful_files: List[str], failed_files: List[str]
     {', '.join(failed_files)}
     """
 
+    if run_stats:
+        report += "\n    Run statistics:\n"
+        for key, value in run_stats.items():
+            report += f"    {key}: {value}\n"
+
     report_path = output_dir / 'summary_report.txt'
     with open(report_path, 'w') as f:
         f.write(report)
@@ -0,0 +1,230 @@
+import logging
+import re
+from html import unescape
+from io import StringIO
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from pandas.errors import EmptyDataError
+from pandas.io.parsers import TextParser
+
+logger = logging.getLogger('pdf_processor')
+
+# The table HTML unstructured emits only uses these tags, with every tag closed
+SECTION_TAGS = ('thead', 'tbody', 'tfoot')
+CELL_TAGS = ('th', 'td')
+
+_TOKEN_RE = re.compile(r'<(/?)([a-zA-Z][a-zA-Z0-9]*)((?:\s+[^<>]*?)?)\s*>|([^<]+)|(<)')
+_ATTR_RE = re.compile(r'''([a-zA-Z_:][-a-zA-Z0-9_:.]*)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+)))?''')
+# Entities html.unescape and lxml are guaranteed to decode the same way
+_SAFE_ENTITY_RE = re.compile(r'&(?:amp|lt|gt|quot|apos|nbsp|#[0-9]+|#[xX][0-9a-fA-F]+);')
+# pandas.io.html._RE_WHITESPACE
+_WHITESPACE_RE = re.compile(r'[\r\n]+|\s{2,}')
+
+# The common case: attribute-free <thead>/<tr> blocks of plain-text cells directly under <table>
+_CELL = r'<(?:th>[^<]*</th|td>[^<]*</td)>'
+_SIMPLE_TABLE_RE = re.compile(
+    rf'\s*<table>(?:\s*<thead>(?:\s*{_CELL})*\s*</thead>|\s*<tr>(?:\s*{_CELL})*\s*</tr>)*\s*</table>\s*'
+)
+_SIMPLE_BLOCK_RE = re.compile(r'<(thead|tr)>(.*?)</\1>', re.S)
+_SIMPLE_CELL_RE = re.compile(r'<(t[hd])>([^<]*)</t[hd]>')
+
+Cell = Tuple[str, str, int, int]  # tag, text, rowspan, colspan
+
+
+class UnsupportedTable(Exception):
+    """The HTML is outside the simple structure the fast parser handles."""
+
+
+def _parse_attrs(attr_text: str) -> Dict[str, str]:
+    attrs = {}
+    for match in _ATTR_RE.finditer(attr_text):
+        name, double, single, bare = match.groups()
+        attrs[name.lower()] = next((v for v in (double, single, bare) if v is not None), '')
+    return attrs
+
+
+def _cell_text(parts: List[str]) -> str:
+    text = parts[0] if len(parts) == 1 else ''.join(parts)
+    if '&' in text:
+        if len(_SAFE_ENTITY_RE.findall(text)) != text.count('&'):
+            raise UnsupportedTable("entity")
+        text = unescape(text)
+    return _WHITESPACE_RE.sub(" ", text.strip())
+
+
+def _tokenize_simple_table(table_html: str) -> Optional[Tuple[List[List[Cell]], List[List[Cell]],
+                                                              List[List[Cell]], List[List[Cell]]]]:
+    if not _SIMPLE_TABLE_RE.fullmatch(table_html):
+        return None
+    head_rows, root_rows = [], []
+    for block, content in _SIMPLE_BLOCK_RE.findall(table_html):
+        cells = [(tag, _cell_text([text]), 1, 1) for tag, text in _SIMPLE_CELL_RE.findall(content)]
+        if block == 'thead':
+            # A <thead> with cells but no <tr> is read as one header row; an empty one adds nothing
+            if cells:
+                head_rows.append(cells)
+        else:
+            root_rows.append(cells)
+    return head_rows, [], root_rows, []
+
+
+def tokenize_table(table_html: str) -> Tuple[List[List[Cell]], List[List[Cell]], List[List[Cell]], List[List[Cell]]]:
+    """Split a single well-formed table into thead, tbody, root-level and tfoot rows of cells.
+
+    Rows are grouped the way pandas' lxml flavor finds them: <tr>s inside each <thead>
+    followed by the <thead> itself when it holds cells directly, <tr>s inside <tbody>,
+    <tr>s directly under <table>, and <tr>s inside <tfoot>.
+    """
+    simple = _tokenize_simple_table(table_html)
+    if simple is not None:
+        return simple
+
+    head_rows, tbody_rows, root_rows, foot_rows = [], [], [], []
+    stack: List[str] = []
+    row: Optional[List[Cell]] = None
+    section_cells: Optional[List[Cell]] = None
+    section_has_tr = False
+    cell: Optional[Tuple[str, Dict[str, str]]] = None
+    cell_text: List[str] = []
+    tables_seen = 0
+
+    for match in _TOKEN_RE.finditer(table_html):
+        closing, tag, attr_text, text, stray = match.groups()
+        if stray is not None:
+            raise UnsupportedTable("markup")
+        if text is not None:
+            if cell is not None:
+                cell_text.append(text)
+            elif text.strip():
+                raise UnsupportedTable("text outside cells")
+            continue
+
+        tag = tag.lower()
+        parent = stack[-1] if stack else None
+        if not closing:
+            attrs = _parse_attrs(attr_text)
+            if 'style' in attrs or attr_text.rstrip().endswith('/'):
+                raise UnsupportedTable("attributes")
+            if tag == 'table' and parent is None and tables_seen == 0:
+                tables_seen += 1
+            elif tag in SECTION_TAGS and parent == 'table':
+                section_cells, section_has_tr = [], False
+            elif tag == 'tr' and parent in ('table',) + SECTION_TAGS:
+                if parent in SECTION_TAGS:
+                    section_has_tr = True
+                row = []
+            elif tag in CELL_TAGS and (parent == 'tr' or parent == 'thead'):
+                cell, cell_text = (tag, attrs), []
+            else:
+                raise UnsupportedTable(f"<{tag}> inside <{parent}>")
+            stack.append(tag)
+            continue
+
+        if tag != parent:
+            raise UnsupportedTable(f"unbalanced </{tag}>")
+        stack.pop()
+        if tag in CELL_TAGS:
+            cell_tag, attrs = cell
+            try:
+                rowspan = int(attrs.get('rowspan') or 1)
+                colspan = int(attrs.get('colspan') or 1)
+            except ValueError:
+                raise UnsupportedTable("span")
+            target = row if stack[-1] == 'tr' else section_cells
+            target.append((cell_tag, _cell_text(cell_text), rowspan, colspan))
+            cell = None
+        elif tag == 'tr':
+            section = stack[-1]
+            {'table': root_rows, 'thead': head_rows, 'tbody': tbody_rows, 'tfoot': foot_rows}[section].append(row)
+            row = None
+        elif tag in SECTION_TAGS:
+            if section_cells:
+                if tag != 'thead' or section_has_tr:
+                    raise UnsupportedTable(f"cells directly in <{tag}>")
+                # lxml leaves <thead><th>..</th></thead> alone and pandas reads the <thead> as a row
+                head_rows.append(section_cells)
+            section_cells = None
+
+    if stack or tables_seen != 1:
+        raise UnsupportedTable("not a single complete table")
+    return head_rows, tbody_rows, root_rows, foot_rows
+
+
+def expand_spans(rows: List[List[Cell]]) -> List[List[str]]:
+    """Repeat colspan/rowspan cell text like pandas' _expand_colspan_rowspan, within one section."""
+    all_texts = []
+    remainder: List[Tuple[int, str, int]] = []
+    for cells in rows:
+        texts = []
+        next_remainder = []
+        index = 0
+        for _, text, rowspan, colspan in cells:
+            # Text from earlier rows' rowspans that comes before this cell
+            while remainder and remainder[0][0] <= index:
+                prev_index, prev_text, prev_rowspan = remainder.pop(0)
+                texts.append(prev_text)
+                if prev_rowspan > 1:
+                    next_remainder.append((prev_index, prev_text, prev_rowspan - 1))
+                index += 1
+            for _ in range(colspan):
+                texts.append(text)
+                if rowspan > 1:
+                    next_remainder.append((index, text, rowspan - 1))
+                index += 1
+        for prev_index, prev_text, prev_rowspan in remainder:
+            texts.append(prev_text)
+            if prev_rowspan > 1:
+                next_remainder.append((prev_index, prev_text, prev_rowspan - 1))
+        all_texts.append(texts)
+        remainder = next_remainder
+    if remainder:
+        # Rowspans past the end of a section are handled differently across pandas versions
+        raise UnsupportedTable("rowspan past section end")
+    return all_texts
+
+
+def fast_read_html_table(table_html: str) -> pd.DataFrame:
+    """Parse unstructured's table HTML into the same DataFrame pd.read_html returns for it.
+
+    Raises UnsupportedTable for anything outside the simple, closed-tag table structure.
+    """
+    head_rows, tbody_rows, root_rows, foot_rows = tokenize_table(table_html)
+    if not any(text.strip() for rows in (head_rows, tbody_rows, root_rows, foot_rows)
+               for cells in rows for _, text, _, _ in cells):
+        # read_html decides how to report tables without text
+        raise UnsupportedTable("no text")
+
+    body_rows = tbody_rows + root_rows
+    if not head_rows:
+        # No <thead>: leading all-<th> rows are the header
+        while body_rows and body_rows[0] and all(tag == 'th' for tag, _, _, _ in body_rows[0]):
+            head_rows.append(body_rows.pop(0))
+
+    head = expand_spans(head_rows)
+    body = expand_spans(body_rows)
+    foot = expand_spans(foot_rows)
+
+    # pandas.io.html._data_to_frame with read_html's default arguments
+    header = None
+    if head:
+        body = head + body
+        header = 0 if len(head) == 1 else [i for i, row in enumerate(head) if any(text for text in row)]
+    body += foot
+    width = max(len(row) for row in body)
+    body = [row + [""] * (width - len(row)) for row in body]
+    try:
+        with TextParser(body, header=header, index_col=None, skiprows=0, parse_dates=False, thousands=',',
+                        decimal='.', converters=None, na_values=None, keep_default_na=True) as parser:
+            return parser.read()
+    except EmptyDataError:
+        raise UnsupportedTable("empty")
+
+
+def read_html_tables(table_html: str) -> List[pd.DataFrame]:
+    """Drop-in for pd.read_html(StringIO(table_html)) on a single table, fast path first."""
+    try:
+        return [fast_read_html_table(table_html)]
+    except UnsupportedTable as e:
+        logger.debug(f"Falling back to pd.read_html for table HTML ({e})")
+    return pd.read_html(StringIO(table_html))
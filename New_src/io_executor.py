@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_IO_THREADS = 2
+DEFAULT_IO_QUEUE_DEPTH = 32
+
+# One executor per process, shared by every output sink. Rebuilt after a fork, since
+# the parent's threads do not exist in the child.
+_settings = {'threads': DEFAULT_IO_THREADS, 'queue_depth': DEFAULT_IO_QUEUE_DEPTH}
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_slots: Optional[threading.BoundedSemaphore] = None
+_lock = threading.Lock()
+_stats = {'io_tasks': 0, 'io_wait_seconds': 0.0}
+
+
+def configure_io_executor(threads: int = DEFAULT_IO_THREADS, queue_depth: int = DEFAULT_IO_QUEUE_DEPTH):
+    """Size the process's I/O executor; takes effect the next time work is submitted."""
+    if threads < 1 or queue_depth < threads:
+        raise ValueError(f"Invalid I/O executor size: {threads} threads, queue depth {queue_depth}")
+    shutdown_io_executor()
+    _settings.update(threads=threads, queue_depth=queue_depth)
+
+
+def _get_executor():
+    global _executor, _executor_pid, _slots
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=_settings['threads'], thread_name_prefix='output-io')
+            _executor_pid = os.getpid()
+            _slots = threading.BoundedSemaphore(_settings['queue_depth'])
+        return _executor, _slots
+
+
+def submit_io(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+    """Run fn on the shared I/O threads.
+
+    At most queue_depth tasks are queued or running at once; past that the caller blocks
+    until a write finishes, so a slow disk holds back partitioning instead of letting
+    pending output pile up in memory.
+    """
+    executor, slots = _get_executor()
+    if not slots.acquire(blocking=False):
+        started = time.perf_counter()
+        slots.acquire()
+        _stats['io_wait_seconds'] += time.perf_counter() - started
+    try:
+        future = executor.submit(fn, *args, **kwargs)
+    except BaseException:
+        slots.release()
+        raise
+    _stats['io_tasks'] += 1
+    future.add_done_callback(lambda _: slots.release())
+    return future
+
+
+def wait_io(futures: List[Future]) -> List[Any]:
+    """Wait for every future, then return their results in order (raising the first error)."""
+    wait(futures)
+    return [future.result() for future in futures]
+
+
+def shutdown_io_executor(wait_for_pending: bool = True):
+    global _executor, _executor_pid, _slots
+    with _lock:
+        if _executor is not None and _executor_pid == os.getpid():
+            _executor.shutdown(wait=wait_for_pending)
+        _executor, _executor_pid, _slots = None, None, None
+
+
+def get_io_stats() -> Dict[str, Any]:
+    return {'pid': os.getpid(), **_stats}
+
+
+class OrderedWriter:
+    """Append to a file from the shared I/O threads, one chunk at a time and in order.
+
+    Chunks are drained by a single task at a time, so writes to the same file never
+    interleave and no I/O thread sits waiting for an earlier chunk. write() blocks while
+    queue_depth chunks are waiting, and re-raises a failed write.
+    """
+
+    def __init__(self, file: Any):
+        self.file = file
+        self._ready = threading.Condition()
+        self._chunks = deque()
+        self._drain: Optional[Future] = None
+        self._error: Optional[BaseException] = None
+
+    def write(self, data: str):
+        with self._ready:
+            while self._error is None and len(self._chunks) >= _settings['queue_depth']:
+                self._ready.wait()
+            if self._error is not None:
+                raise self._error
+            self._chunks.append(data)
+            if self._drain is None:
+                self._drain = submit_io(self._write_pending)
+
+    def _write_pending(self):
+        while True:
+            with self._ready:
+                if not self._chunks:
+                    self._drain = None
+                    self._ready.notify_all()
+                    return
+                data = self._chunks.popleft()
+                self._ready.notify_all()
+            try:
+                self.file.write(data)
+            except BaseException as e:
+                with self._ready:
+                    self._error = e
+                    self._chunks.clear()
+                    self._drain = None
+                    self._ready.notify_all()
+                raise
+
+    def flush(self):
+        """Block until every chunk written so far is in the file object."""
+        with self._ready:
+            while self._drain is not None:
+                self._ready.wait()
+            if self._error is not None:
+                raise self._error
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.file.close()
+
+    def abort(self):
+        """Drop the chunks not written yet and close the file."""
+        with self._ready:
+            self._chunks.clear()
+            while self._drain is not None:
+                self._ready.wait()
+        self.file.close()
@@ -0,0 +1,75 @@
+import logging
+import os
+from typing import Any, Dict
+
+try:
+    import onnxruntime as ort
+    from unstructured_inference.models import tables
+    from unstructured_inference.models.base import get_model
+except ImportError:
+    ort = None
+    tables = None
+    get_model = None
+
+logger = logging.getLogger('pdf_processor')
+
+# Per-process state: each pool worker loads its models once and reuses them for every document
+_detection_models: Dict[str, Any] = {}
+_table_agent_loaded = False
+_model_loads = 0
+_documents = 0
+
+
+def is_gpu_available() -> bool:
+    try:
+        return 'CUDAExecutionProvider' in ort.get_available_providers()
+    except Exception as e:
+        logger.warning(f"Error checking GPU availability: {e}")
+        return False
+
+
+def get_detection_model(model_name: str = "yolox") -> Any:
+    """Return the cached layout model, loading it on first use in this process.
+
+    get_model() builds the model's one ONNX session, on the GPU when onnxruntime has a CUDA
+    provider, and registers the model in unstructured_inference's own cache, so the
+    partition_pdf calls in this process pick up the same instance and session.
+    """
+    global _model_loads
+    if get_model is None:
+        raise ImportError("The local partition backend requires unstructured_inference and onnxruntime")
+    if model_name not in _detection_models:
+        _detection_models[model_name] = get_model(model_name)
+        _model_loads += 1
+    return _detection_models[model_name]
+
+
+def load_table_agent():
+    global _table_agent_loaded, _model_loads
+    if not _table_agent_loaded:
+        if tables is None:
+            raise ImportError("Table structure inference requires unstructured_inference")
+        tables.load_agent()
+        _table_agent_loaded = True
+        _model_loads += 1
+
+
+def initialize_worker(model_name: str = "yolox", infer_table_structure: bool = True):
+    """ProcessPoolExecutor initializer that warms the models once per worker process."""
+    try:
+        get_detection_model(model_name)
+        if infer_table_structure:
+            load_table_agent()
+        logger.debug(f"Worker {os.getpid()} loaded layout models ({model_name})")
+    except Exception as e:
+        # partition_pdf will load the models itself if warming fails
+        logger.warning(f"Worker {os.getpid()} could not preload layout models: {e}")
+
+
+def record_document():
+    global _documents
+    _documents += 1
+
+
+def get_model_stats() -> Dict[str, int]:
+    return {'pid': os.getpid(), 'model_loads': _model_loads, 'documents': _documents}
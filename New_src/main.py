@@ -27,9 +27,9 @@ def main():
         logger.info(f"Configuration loaded from: {config_path}")
         logger.info(f"Input directory: {config['input_dir']}")
         logger.info(f"Output directory: {config['output_dir']}")
+        logger.info(f"Partition backend: {config['partition_backend']}")
         logger.info(f"Parallel processing: {'enabled' if config['parallel_processing'] else 'disabled'}")
         logger.info(f"Number of workers: {config['num_workers']}")
-        logger.info(f"Batch size: {config['batch_size']}")
 
         # Validate input and output directories
         if not config['input_dir'].exists():
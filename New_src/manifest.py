@@ -0,0 +1,192 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+MANIFEST_FILENAME = 'processed_manifest.sqlite'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+logger = logging.getLogger('pdf_processor')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS processed (
+    source_path TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    content_hash TEXT,
+    output_folder TEXT NOT NULL,
+    artifacts TEXT NOT NULL,
+    processed_at REAL NOT NULL,
+    rebuilt INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_processed_filename ON processed (filename, size);
+CREATE INDEX IF NOT EXISTS idx_processed_hash ON processed (content_hash);
+CREATE TABLE IF NOT EXISTS file_hashes (
+    source_path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    content_hash TEXT NOT NULL
+);
+"""
+
+
+def hash_file(file_path: Path, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class ProcessedManifest:
+    """SQLite index of processed PDFs kept under the output directory.
+
+    Rows are keyed by source path, size and mtime so the skip check is a single
+    indexed lookup. When the index file is missing it is rebuilt once from the
+    PDFs already copied into the output tree; those rows only know the copy's
+    name and size, so they are flagged and matched on filename and size.
+    """
+
+    def __init__(self, output_dir: Path, filename: str = MANIFEST_FILENAME):
+        self.output_dir = Path(output_dir)
+        self.db_path = self.output_dir / filename
+        is_new = not self.db_path.exists()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(processed)")]
+            if columns and 'rebuilt' not in columns:
+                # Manifests from before the flag: only rebuild() left rows without a hash
+                conn.execute("ALTER TABLE processed ADD COLUMN rebuilt INTEGER NOT NULL DEFAULT 0")
+                conn.execute("UPDATE processed SET rebuilt = 1 WHERE content_hash IS NULL")
+            conn.executescript(_SCHEMA)
+        if is_new:
+            self.rebuild()
+
+    def _connect(self) -> sqlite3.Connection:
+        # A fresh connection per call keeps the manifest picklable for worker processes
+        return sqlite3.connect(str(self.db_path), timeout=30)
+
+    def is_processed(self, file_path: Path) -> bool:
+        stat = file_path.stat()
+        with closing(self._connect()) as conn:
+            if conn.execute(
+                "SELECT 1 FROM processed WHERE source_path = ? AND size = ? AND mtime = ?",
+                (str(file_path), stat.st_size, stat.st_mtime),
+            ).fetchone():
+                return True
+            # Entries rebuilt from the output tree only know the copied file's name and size
+            if conn.execute(
+                "SELECT 1 FROM processed WHERE filename = ? AND size = ? AND rebuilt = 1",
+                (file_path.name, stat.st_size),
+            ).fetchone():
+                return True
+            hashes = {row[0] for row in conn.execute(
+                "SELECT content_hash FROM processed WHERE filename = ? AND size = ? AND content_hash IS NOT NULL",
+                (file_path.name, stat.st_size),
+            )}
+        # Same name and size at a new path or mtime (moved, or copied again): compare contents
+        if not hashes:
+            return False
+        content_hash = self.cached_hash(file_path) or hash_file(file_path)
+        if content_hash not in hashes:
+            return False
+        # Store the match under this path and mtime, so the next check is an exact match again
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO processed (source_path, filename, size, mtime, content_hash, output_folder, "
+                "artifacts, processed_at, rebuilt) "
+                "SELECT ?, filename, size, ?, content_hash, output_folder, artifacts, processed_at, 0 FROM processed "
+                "WHERE filename = ? AND size = ? AND content_hash = ? ORDER BY source_path = ? DESC LIMIT 1",
+                (str(file_path), stat.st_mtime, file_path.name, stat.st_size, content_hash, str(file_path)))
+        return True
+
+    def cached_hash(self, file_path: Path) -> Optional[str]:
+        """Return the stored content hash if the source file is unchanged since it was hashed."""
+        stat = file_path.stat()
+        key = (str(file_path), stat.st_size, stat.st_mtime)
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT content_hash FROM processed WHERE source_path = ? AND size = ? AND mtime = ? "
+                "AND content_hash IS NOT NULL",
+                key,
+            ).fetchone()
+            if row is None:
+                row = conn.execute(
+                    "SELECT content_hash FROM file_hashes WHERE source_path = ? AND size = ? AND mtime = ?", key
+                ).fetchone()
+        return row[0] if row else None
+
+    def store_hashes(self, content_hashes: Dict[Path, str]):
+        """Keep hashes computed outside record() (e.g. for deduplication) so later runs reuse them."""
+        rows = []
+        for file_path, content_hash in content_hashes.items():
+            stat = file_path.stat()
+            rows.append((str(file_path), stat.st_size, stat.st_mtime, content_hash))
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("INSERT OR REPLACE INTO file_hashes (source_path, size, mtime, content_hash) "
+                             "VALUES (?, ?, ?, ?)", rows)
+
+    def get(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM processed WHERE source_path = ?", (str(file_path),)).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        entry['artifacts'] = json.loads(entry['artifacts'])
+        return entry
+
+    def record(self, file_path: Path, output_folder: Path, artifacts: List[str],
+               content_hash: Optional[str] = None):
+        stat = file_path.stat()
+        if content_hash is None:
+            content_hash = self.cached_hash(file_path) or hash_file(file_path)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO processed (source_path, filename, size, mtime, content_hash, "
+                "output_folder, artifacts, processed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    str(file_path),
+                    file_path.name,
+                    stat.st_size,
+                    stat.st_mtime,
+                    content_hash,
+                    str(output_folder),
+                    json.dumps(sorted(artifacts)),
+                    time.time(),
+                ),
+            )
+
+    def rebuild(self):
+        """Index every PDF already present in the output tree (one-time scan)."""
+        rows = []
+        for pdf_path in self.output_dir.rglob('*.pdf'):
+            stat = pdf_path.stat()
+            artifacts = [p.name for p in pdf_path.parent.iterdir() if p.is_file()]
+            rows.append((
+                str(pdf_path),
+                pdf_path.name,
+                stat.st_size,
+                stat.st_mtime,
+                None,
+                str(pdf_path.parent),
+                json.dumps(sorted(artifacts)),
+                time.time(),
+                1,
+            ))
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO processed (source_path, filename, size, mtime, content_hash, "
+                "output_folder, artifacts, processed_at, rebuilt) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        logger.info(f"Rebuilt processed-file manifest with {len(rows)} entries: {self.db_path}")
+
+    def __len__(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM processed").fetchone()[0]
@@ -0,0 +1,161 @@
+import logging
+import os
+import queue
+import shlex
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+from PIL import Image as PILImage
+from unstructured.partition.utils import constants
+from unstructured.partition.utils.ocr_models.tesseract_ocr import OCRAgentTesseract
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+OCR_ENGINES = ('tesseract', 'tesserocr')
+OCR_AGENT_QNAME = f"{__name__}.OCRAgentTesserocr"
+
+# tesseract's hOCR renderer writes the page div only; the agent's parser expects the XHTML document
+_HOCR_DOCUMENT = '<html xmlns="http://www.w3.org/1999/xhtml"><body>{}</body></html>'
+
+logger = logging.getLogger('pdf_processor')
+
+_ocr_stats = Counter()
+
+
+class TesserocrPool:
+    """Tesseract API handles kept loaded for the life of a worker process.
+
+    At most `size` handles exist per language; callers beyond that wait for one to be
+    released. Loading the traineddata happens once per handle instead of once per call.
+    """
+
+    def __init__(self, size: int = 1, tessdata_dir: Optional[str] = None):
+        self.size = size
+        self.tessdata_dir = tessdata_dir
+        self._idle: Dict[str, queue.LifoQueue] = {}
+        self._created = Counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def engine(self, language: str) -> Iterator[Any]:
+        api = self._acquire(language)
+        try:
+            yield api
+        finally:
+            api.Clear()
+            self._idle[language].put(api)
+
+    def _acquire(self, language: str) -> Any:
+        with self._lock:
+            idle = self._idle.setdefault(language, queue.LifoQueue())
+            try:
+                return idle.get_nowait()
+            except queue.Empty:
+                create = self._created[language] < self.size
+                if create:
+                    self._created[language] += 1
+        if not create:
+            return idle.get()
+        kwargs = {'lang': language}
+        if self.tessdata_dir:
+            # tesserocr wants the trailing separator
+            kwargs['path'] = os.path.join(self.tessdata_dir, '')
+        _ocr_stats['ocr_engines_loaded'] += 1
+        return tesserocr.PyTessBaseAPI(**kwargs)
+
+
+class OCRAgentTesserocr(OCRAgentTesseract):
+    """unstructured's tesseract agent with tesseract run in-process on images in memory.
+
+    The stock agent shells out to the tesseract binary through temporary image files.
+    Here only those two calls (plain text and character-level hOCR) are replaced; zooming,
+    confidence filtering and parsing are inherited, so results match the stock agent.
+    """
+
+    def get_text_from_image(self, image: PILImage.Image) -> str:
+        started = time.perf_counter()
+        with get_ocr_pool().engine(self.language) as api:
+            api.SetImage(_to_pil(image))
+            text = api.GetUTF8Text()
+        _record_call(started)
+        return text
+
+    def image_to_data_with_character_confidence_filter(self, image: np.ndarray, lang: str = "eng", config: str = "",
+                                                       character_confidence_threshold: float = 0.0):
+        started = time.perf_counter()
+        with get_ocr_pool().engine(lang) as api:
+            for name, value in _config_variables("-c hocr_char_boxes=1 " + config).items():
+                api.SetVariable(name, value)
+            api.SetImage(_to_pil(image))
+            hocr = _HOCR_DOCUMENT.format(api.GetHOCRText(0)).encode('utf-8')
+        _record_call(started)
+        return self.hocr_to_dataframe(hocr, character_confidence_threshold)
+
+
+def _to_pil(image: Any) -> PILImage.Image:
+    return image if isinstance(image, PILImage.Image) else PILImage.fromarray(image)
+
+
+def _config_variables(config: str) -> Dict[str, str]:
+    """The `-c name=value` settings of a tesseract command line."""
+    tokens = shlex.split(config)
+    variables = {}
+    for flag, setting in zip(tokens, tokens[1:]):
+        if flag == '-c' and '=' in setting:
+            name, value = setting.split('=', 1)
+            variables[name] = value
+    return variables
+
+
+def _record_call(started: float):
+    _ocr_stats['ocr_calls'] += 1
+    _ocr_stats['ocr_seconds'] += time.perf_counter() - started
+
+
+_pool: Optional[TesserocrPool] = None
+_pool_pid: Optional[int] = None
+_pool_settings = (1, None)
+
+
+def get_ocr_pool() -> TesserocrPool:
+    """The process's engine pool, rebuilt after fork since tesseract handles are not fork-safe."""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        _pool = TesserocrPool(*_pool_settings)
+        _pool_pid = os.getpid()
+    return _pool
+
+
+def install_ocr_engine(engine: str, pool_size: int = 1, tessdata_dir: Optional[str] = None):
+    """Route unstructured's OCR in this process through `engine`.
+
+    'tesseract' leaves unstructured's stock agent (the tesseract binary via temp files) in
+    place; 'tesserocr' switches to OCRAgentTesserocr with `pool_size` engines per language.
+    """
+    global _pool, _pool_settings
+    if engine not in OCR_ENGINES:
+        raise ValueError(f"Unknown OCR engine: {engine} (expected one of {', '.join(OCR_ENGINES)})")
+    if engine == 'tesseract':
+        return
+    if tesserocr is None:
+        raise ImportError("The tesserocr OCR engine requires the tesserocr package")
+    _pool_settings = (pool_size, tessdata_dir)
+    _pool = None
+    module_name = OCR_AGENT_QNAME.rsplit('.', 1)[0]
+    # unstructured only loads OCR agents from whitelisted modules; the list is read at call time
+    if module_name not in constants.OCR_AGENT_MODULES_WHITELIST:
+        constants.OCR_AGENT_MODULES_WHITELIST.append(module_name)
+    os.environ['OCR_AGENT'] = OCR_AGENT_QNAME
+    logger.debug(f"OCR through tesserocr, {pool_size} engine(s) per language")
+
+
+def get_ocr_stats() -> Dict[str, Any]:
+    return {'pid': os.getpid(), 'ocr_calls': _ocr_stats['ocr_calls'], 'ocr_seconds': _ocr_stats['ocr_seconds'],
+            'ocr_engines_loaded': _ocr_stats['ocr_engines_loaded']}
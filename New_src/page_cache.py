@@ -0,0 +1,203 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+import zlib
+from collections import Counter
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, List
+
+from PyPDF2 import PdfReader
+from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+from unstructured.__version__ import __version__ as unstructured_version
+from unstructured.documents.elements import assign_and_map_hash_ids
+from unstructured.staging.base import elements_from_dicts, elements_to_dicts
+
+try:
+    from unstructured.partition.common.metadata import get_last_modified_date
+except ImportError:  # unstructured < 0.16
+    from unstructured.partition.common import get_last_modified_date
+
+PAGE_CACHE_FILENAME = 'page_cache.sqlite'
+# Bump when the stored element format changes so old entries stop matching
+PAGE_CACHE_FORMAT = 1
+
+# Page attributes that determine how it renders; /Parent and /Annots lead back to the rest of the document
+_PAGE_KEYS = ('/Contents', '/Resources', '/MediaBox', '/CropBox', '/Rotate', '/UserUnit')
+_SKIPPED_KEYS = {'/Parent', '/P'}
+
+logger = logging.getLogger('pdf_processor')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    key TEXT PRIMARY KEY,
+    elements BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pages_last_used ON pages (last_used);
+"""
+
+_cache_stats = Counter()
+
+
+def _hash_object(obj: Any, sha, digests: Dict[Any, bytes], active: set):
+    if isinstance(obj, IndirectObject):
+        ref = (obj.idnum, obj.generation)
+        if ref in active:
+            sha.update(b'<cycle>')
+            return
+        if ref not in digests:
+            active.add(ref)
+            inner = hashlib.sha256()
+            _hash_object(obj.get_object(), inner, digests, active)
+            active.discard(ref)
+            digests[ref] = inner.digest()
+        sha.update(digests[ref])
+    elif isinstance(obj, DictionaryObject):
+        if isinstance(obj, StreamObject):
+            # The encoded bytes: decoding every image just to hash it would cost more than it saves
+            sha.update(b'<stream>')
+            sha.update(obj._data or b'')
+        sha.update(b'<<')
+        for key in sorted(obj):
+            if key not in _SKIPPED_KEYS:
+                sha.update(key.encode('utf-8'))
+                _hash_object(obj.raw_get(key), sha, digests, active)
+        sha.update(b'>>')
+    elif isinstance(obj, ArrayObject):
+        sha.update(b'[')
+        for item in obj:
+            _hash_object(item, sha, digests, active)
+        sha.update(b']')
+    else:
+        sha.update(repr(obj).encode('utf-8'))
+
+
+def page_fingerprints(file_path: Path, start: int, end: int) -> List[str]:
+    """Hash of each page's content streams and everything they draw (fonts, images, forms).
+
+    Identical pages hash the same whatever file, position or document they appear in.
+    Objects shared between pages, like fonts, are hashed once per document.
+    """
+    reader = PdfReader(str(file_path))
+    digests = {}
+    fingerprints = []
+    for page_index in range(start - 1, end):
+        page = reader.pages[page_index]
+        sha = hashlib.sha256()
+        for key in _PAGE_KEYS:
+            if key in page:
+                sha.update(key.encode('utf-8'))
+                _hash_object(page.raw_get(key), sha, digests, set())
+        fingerprints.append(sha.hexdigest())
+    return fingerprints
+
+
+def page_cache_key(fingerprint: str, settings: Dict[str, Any]) -> str:
+    """Cache key for a page partitioned with the given partition_pdf arguments."""
+    settings = {**settings, 'unstructured': unstructured_version, 'format': PAGE_CACHE_FORMAT}
+    return hashlib.sha256(f"{fingerprint}:{json.dumps(settings, sort_keys=True, default=str)}".encode(
+        'utf-8')).hexdigest()
+
+
+def split_pages(elements: List[Any], start: int, end: int) -> Dict[int, List[Dict[str, Any]]]:
+    """Element dicts for each page in start..end, as stored in the cache.
+
+    Page breaks are dropped (merging re-adds them) and so are parent ids pointing at
+    another page, which the shard merger re-derives from the surrounding document.
+    """
+    pages = {page_number: [] for page_number in range(start, end + 1)}
+    for element in elements:
+        if element.category != 'PageBreak' and element.metadata.page_number in pages:
+            pages[element.metadata.page_number].append(element)
+    stored = {}
+    for page_number, page_elements in pages.items():
+        ids = {element.id for element in page_elements}
+        dicts = elements_to_dicts(page_elements)
+        for element_dict in dicts:
+            if element_dict['metadata'].get('parent_id') not in ids:
+                element_dict['metadata'].pop('parent_id', None)
+        stored[page_number] = dicts
+    return stored
+
+
+def load_page(dicts: List[Dict[str, Any]], file_path: Path, page_number: int) -> List[Any]:
+    """Rebuild a cached page's elements as if page_number of file_path had just been partitioned."""
+    elements = elements_from_dicts(dicts)
+    last_modified = get_last_modified_date(str(file_path))
+    for element in elements:
+        element.metadata.filename = file_path.name
+        element.metadata.file_directory = str(file_path.parent)
+        element.metadata.last_modified = last_modified
+        element.metadata.page_number = page_number
+    # Ids hash the filename and page number, so they are recomputed like partition_pdf does
+    return assign_and_map_hash_ids(elements)
+
+
+class PageCache:
+    """On-disk LRU of per-page partition results, shared by every worker process.
+
+    Entries are zlib-compressed element JSON in a SQLite file. Once the entries add up
+    to more than max_bytes the least recently used are evicted.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int, filename: str = PAGE_CACHE_FILENAME):
+        self.db_path = Path(cache_dir) / filename
+        self.max_bytes = max_bytes
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            # WAL lets workers read while another one writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # A fresh connection per call keeps the cache picklable for worker processes
+        return sqlite3.connect(str(self.db_path), timeout=30)
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        keys = list(set(keys))
+        found = {}
+        with closing(self._connect()) as conn, conn:
+            for offset in range(0, len(keys), 500):
+                chunk = keys[offset:offset + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = conn.execute(f"SELECT key, elements FROM pages WHERE key IN ({placeholders})", chunk)
+                found.update((key, json.loads(zlib.decompress(blob))) for key, blob in rows)
+                conn.execute(f"UPDATE pages SET last_used = ? WHERE key IN ({placeholders})", [time.time(), *chunk])
+        _cache_stats['page_cache_hits'] += len(found)
+        _cache_stats['page_cache_misses'] += len(keys) - len(found)
+        return found
+
+    def put_many(self, entries: Dict[str, List[Dict[str, Any]]]):
+        now = time.time()
+        rows = []
+        for key, dicts in entries.items():
+            blob = zlib.compress(json.dumps(dicts, separators=(',', ':')).encode('utf-8'))
+            rows.append((key, blob, len(blob), now))
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("INSERT OR REPLACE INTO pages (key, elements, size, last_used) VALUES (?, ?, ?, ?)", rows)
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in conn.execute("SELECT key, size FROM pages ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM pages WHERE key = ?", evicted)
+        _cache_stats['page_cache_evictions'] += len(evicted)
+        logger.debug(f"Evicted {len(evicted)} pages from the page cache")
+
+
+def get_page_cache_stats() -> Dict[str, int]:
+    return {'pid': os.getpid(), 'page_cache_hits': _cache_stats['page_cache_hits'],
+            'page_cache_misses': _cache_stats['page_cache_misses'],
+            'page_cache_evictions': _cache_stats['page_cache_evictions']}
@@ -0,0 +1,97 @@
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+from pdfminer.high_level import extract_pages
+from pdfminer.layout import LAParams, LTCurve, LTFigure, LTImage, LTTextContainer
+
+FAST_PATH = 'fast'
+HI_RES_PATH = 'hi_res'
+
+# A page is treated as born-digital when its text layer carries real content and it is
+# not mostly a scanned image; ruling lines are the cheapest signal of a drawn table.
+MIN_TEXT_CHARS = 200
+MIN_TEXT_COVERAGE = 0.05
+MAX_IMAGE_COVERAGE = 0.5
+MAX_RULING_LINES = 8
+
+# Per-process counters, reported back to the main process like the model-load counters
+_page_path_counts = Counter()
+
+
+def _area(item) -> float:
+    return max(item.width, 0) * max(item.height, 0)
+
+
+def _walk(items: Iterable) -> Iterable:
+    for item in items:
+        yield item
+        if isinstance(item, LTFigure):
+            yield from _walk(item)
+
+
+def measure_page(page) -> Dict[str, float]:
+    page_area = _area(page) or 1.0
+    text_chars = 0
+    text_area = 0.0
+    image_area = 0.0
+    ruling_lines = 0
+    for item in _walk(page):
+        if isinstance(item, LTTextContainer):
+            text_chars += len(item.get_text().strip())
+            text_area += _area(item)
+        elif isinstance(item, LTImage):
+            image_area += _area(item)
+        elif isinstance(item, LTCurve):
+            # LTRect and LTLine are LTCurve subclasses
+            ruling_lines += 1
+    return {
+        'text_chars': text_chars,
+        'text_coverage': min(text_area / page_area, 1.0),
+        'image_coverage': min(image_area / page_area, 1.0),
+        'ruling_lines': ruling_lines,
+    }
+
+
+def choose_path(measurements: Dict[str, float]) -> str:
+    born_digital = (
+        measurements['text_chars'] >= MIN_TEXT_CHARS
+        and measurements['text_coverage'] >= MIN_TEXT_COVERAGE
+        and measurements['image_coverage'] <= MAX_IMAGE_COVERAGE
+    )
+    table_heavy = measurements['ruling_lines'] > MAX_RULING_LINES
+    return FAST_PATH if born_digital and not table_heavy else HI_RES_PATH
+
+
+def classify_pages(file_path: Path, start: int, end: int) -> Dict[int, str]:
+    """Map each 1-based page in [start, end] to the fast or hi_res partition path."""
+    page_paths = {}
+    page_numbers = range(start - 1, end)
+    for page_number, page in zip(range(start, end + 1),
+                                 extract_pages(str(file_path), page_numbers=page_numbers, laparams=LAParams())):
+        page_paths[page_number] = choose_path(measure_page(page))
+    # Pages pdfminer could not lay out fall back to hi_res
+    for page_number in range(start, end + 1):
+        page_paths.setdefault(page_number, HI_RES_PATH)
+    return page_paths
+
+
+def group_page_runs(page_paths: Dict[int, str]) -> List[Tuple[str, int, int]]:
+    """Collapse consecutive pages on the same path into (path, start, end) runs."""
+    runs = []
+    for page_number in sorted(page_paths):
+        path = page_paths[page_number]
+        if runs and runs[-1][0] == path and runs[-1][2] == page_number - 1:
+            runs[-1] = (path, runs[-1][1], page_number)
+        else:
+            runs.append((path, page_number, page_number))
+    return runs
+
+
+def record_page_paths(page_paths: Dict[int, str]):
+    _page_path_counts.update(page_paths.values())
+
+
+def get_page_path_stats() -> Dict[str, int]:
+    return {'pid': os.getpid(), FAST_PATH: _page_path_counts[FAST_PATH], HI_RES_PATH: _page_path_counts[HI_RES_PATH]}
@@ -0,0 +1,146 @@
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from PyPDF2 import PdfReader, PdfWriter
+from unstructured.documents.elements import ElementMetadata, PageBreak
+
+try:
+    from unstructured.partition.common.metadata import HIERARCHY_RULE_SET, get_last_modified_date
+except ImportError:  # unstructured < 0.16
+    from unstructured.partition.common import HIERARCHY_RULE_SET, get_last_modified_date
+
+PageRange = Tuple[int, int]
+
+
+def get_page_count(file_path: Path) -> int:
+    return len(PdfReader(str(file_path)).pages)
+
+
+def split_page_ranges(page_count: int, pages_per_shard: int) -> List[PageRange]:
+    """Split 1-based page numbers into inclusive (start, end) ranges."""
+    return [
+        (start, min(start + pages_per_shard - 1, page_count))
+        for start in range(1, page_count + 1, pages_per_shard)
+    ]
+
+
+def extract_page_range(file_path: Path, start: int, end: int) -> bytes:
+    reader = PdfReader(str(file_path))
+    writer = PdfWriter()
+    for page_index in range(start - 1, end):
+        writer.add_page(reader.pages[page_index])
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def partition_page_range(file_path: Path, start: int, end: int, partition_kwargs: Dict[str, Any]) -> List[Any]:
+    """Partition one page range of a PDF as if it were part of the whole document.
+
+    The filename, last-modified date and starting page number match the full-file run,
+    so metadata and hashed element ids come out identical to partitioning the file whole.
+    """
+    from unstructured.partition.pdf import partition_pdf
+
+    pdf_bytes = extract_page_range(file_path, start, end)
+    return partition_pdf(
+        file=BytesIO(pdf_bytes),
+        metadata_filename=str(file_path),
+        metadata_last_modified=get_last_modified_date(str(file_path)),
+        starting_page_number=start,
+        **partition_kwargs,
+    )
+
+
+def _hierarchy_parent_index(stack: List[Any], element: Any) -> int:
+    """Index of the element's parent in a hierarchy stack (-1 if none), without popping."""
+    category = element.category
+    depth = getattr(element.metadata, 'category_depth', 0) or 0
+    for index in range(len(stack) - 1, -1, -1):
+        top = stack[index]
+        top_depth = getattr(top.metadata, 'category_depth', 0) or 0
+        if (top.category == category and top_depth < depth) or (
+            top.category != category and category in HIERARCHY_RULE_SET.get(top.category, [])
+        ):
+            return index
+    return -1
+
+
+def page_break_after(element: Any) -> PageBreak:
+    """The PageBreak partition_pdf emits after element's page.
+
+    partition_pdf gives page breaks the document-wide metadata only (no page number) and
+    hashes their ids like any other element's, from the filename, text, page number and
+    position among consecutive elements of that page (the first one without a page).
+    """
+    page_break = PageBreak(text="")
+    page_break.metadata = ElementMetadata(
+        filename=element.metadata.filename,
+        file_directory=element.metadata.file_directory,
+        filetype=element.metadata.filetype,
+    )
+    page_break.id_to_hash(0)
+    return page_break
+
+
+class ShardMerger:
+    """Merge page-ordered shards one at a time, remapping parent ids across shard boundaries.
+
+    Each shard's title hierarchy was computed with an empty stack, so elements at the
+    top of a shard lost the parent they would have had in a single-process run. The
+    hierarchy walk is replayed over the merged elements with the document-wide stack;
+    parents assigned by layout nesting (which do not match the shard-local walk) are kept.
+    A page break resets the stack, as it does in partition_pdf, so with page breaks on
+    shards keep the parents they were partitioned with.
+    """
+
+    def __init__(self, include_page_breaks: bool = True):
+        self.include_page_breaks = include_page_breaks
+        self.document_stack = []
+        self.shard_count = 0
+        self.last_element = None
+
+    def add(self, shard: List[Any]) -> List[Any]:
+        merged = []
+        if self.include_page_breaks and self.last_element is not None and shard \
+                and self.last_element.category != 'PageBreak':
+            page_break = page_break_after(self.last_element)
+            merged.append(page_break)
+            self.document_stack = [page_break]
+
+        shard_stack = []
+        for element in shard:
+            if not getattr(element, 'category', None):
+                merged.append(element)
+                continue
+            shard_parent_index = _hierarchy_parent_index(shard_stack, element)
+            shard_parent = shard_stack[shard_parent_index].id if shard_parent_index >= 0 else None
+            if element.metadata.parent_id == shard_parent:
+                document_index = _hierarchy_parent_index(self.document_stack, element)
+                if self.shard_count > 0:
+                    element.metadata.parent_id = (
+                        self.document_stack[document_index].id if document_index >= 0 else None
+                    )
+                del shard_stack[shard_parent_index + 1:]
+                del self.document_stack[document_index + 1:]
+                shard_stack.append(element)
+                self.document_stack.append(element)
+            merged.append(element)
+
+        self.shard_count += 1
+        if merged:
+            self.last_element = merged[-1]
+        return merged
+
+
+def merge_shards(shards: List[List[Any]], include_page_breaks: bool = True) -> List[Any]:
+    """Concatenate page-ordered shards into one document (see ShardMerger)."""
+    merger = ShardMerger(include_page_breaks)
+    merged = []
+    for shard in shards:
+        merged.extend(merger.add(shard))
+    # partition_pdf closes the last page with a break too; shards rebuilt from the page cache do not
+    if include_page_breaks and merged and merged[-1].category != 'PageBreak':
+        merged.append(page_break_after(merged[-1]))
+    return merged
@@ -0,0 +1,218 @@
+import abc
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from unstructured.staging.base import elements_from_dicts
+
+from api_client import get_api_client, number_page_range
+from api_stub import page_elements
+from ocr_engine import get_ocr_stats, install_ocr_engine
+from page_cache import PageCache, get_page_cache_stats, load_page, page_cache_key, page_fingerprints, split_pages
+from page_classifier import HI_RES_PATH, classify_pages, group_page_runs, record_page_paths
+from page_sharding import extract_page_range, get_page_count, merge_shards, partition_page_range
+from telemetry import install_stage_hooks
+
+logger = logging.getLogger('pdf_processor')
+
+
+class PartitionBackend(abc.ABC):
+    """How PDFProcessor turns a PDF, or one page range of it, into unstructured elements.
+
+    Everything around partitioning (scheduling, sharding, streaming, deduplication, output
+    sinks, write-behind) lives in PDFProcessor and is shared by every backend. Backends are
+    pickled into the pool's worker processes, so they hold the config and nothing else.
+    """
+
+    name = ''
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+
+    def initialize_worker(self):
+        """Called once in each worker process (and in the main one when running sequentially)."""
+
+    @abc.abstractmethod
+    def partition(self, file_path: Path, page_range: Optional[Tuple[int, int]] = None) -> List[Any]:
+        """Elements of the whole PDF, or of pages start..end (1-based, inclusive) numbered as in the document."""
+
+    def partition_document(self, file_path: Path) -> List[Any]:
+        """Elements of the whole PDF, as Element objects or element dicts (ElementWriter takes either)."""
+        return self.partition(file_path)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters for the run summary, cumulative per process."""
+        return {}
+
+    def take_request_seconds(self) -> List[float]:
+        """Latencies of the partition requests made since the last call."""
+        return []
+
+
+class LocalBackend(PartitionBackend):
+    """partition_pdf in the worker process, with the layout model loaded once per worker.
+
+    With page_cache on, each page's elements are stored under a hash of the page's content
+    and the partition settings, and only pages missing from the cache are partitioned.
+    partition_pdf and the layout models are imported on first use, so the other backends
+    run without unstructured_inference and onnxruntime installed.
+    """
+
+    name = 'local'
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.page_cache = None
+        if config['page_cache']:
+            self.page_cache = PageCache(config['page_cache_dir'] or config['output_dir'],
+                                        config['page_cache_max_mb'] * 1024 * 1024)
+        # Fails here, in the main process, when the engine is unknown or not installed
+        self._install_ocr_engine()
+
+    def _install_ocr_engine(self):
+        install_ocr_engine(self.config['ocr_engine'], self.config['ocr_pool_size'], self.config['tessdata_dir'])
+
+    def initialize_worker(self):
+        self._install_ocr_engine()
+        if self.config['telemetry']:
+            install_stage_hooks()
+        from layout_models import initialize_worker
+        initialize_worker(self.config['hi_res_model_name'], infer_table_structure=True)
+
+    def partition_kwargs(self, strategy: str = HI_RES_PATH) -> Dict[str, Any]:
+        return dict(
+            strategy=strategy,
+            hi_res_model_name=self.config['hi_res_model_name'],
+            infer_table_structure=True,
+            include_metadata=True,
+            include_page_breaks=True,
+            extract_images_in_pdf=False,
+            ocr_languages=['eng'],
+            use_ocr_for_pages_with_text=False,
+            max_partition=1000,  # Adjust based on your needs
+        )
+
+    def partition(self, file_path: Path, page_range: Optional[Tuple[int, int]] = None) -> List[Any]:
+        """Partition a PDF or one page range, sending born-digital pages down the fast path when enabled."""
+        from unstructured.partition.pdf import partition_pdf
+
+        if not self.config['text_layer_fast_path'] and self.page_cache is None:
+            if page_range is None:
+                return partition_pdf(filename=str(file_path), **self.partition_kwargs())
+            return partition_page_range(file_path, *page_range, self.partition_kwargs())
+
+        start, end = page_range or (1, get_page_count(file_path))
+        if self.config['text_layer_fast_path']:
+            page_paths = classify_pages(file_path, start, end)
+            record_page_paths(page_paths)
+        else:
+            page_paths = {page_number: HI_RES_PATH for page_number in range(start, end + 1)}
+        if self.page_cache is not None:
+            return self._partition_cached(file_path, page_paths)
+
+        runs = group_page_runs(page_paths)
+        if page_range is None and len(runs) == 1:
+            return partition_pdf(filename=str(file_path), **self.partition_kwargs(runs[0][0]))
+        shards = [
+            partition_page_range(file_path, run_start, run_end, self.partition_kwargs(path))
+            for path, run_start, run_end in runs
+        ]
+        return merge_shards(shards, include_page_breaks=True)
+
+    def _partition_cached(self, file_path: Path, page_paths: Dict[int, str]) -> List[Any]:
+        """Load cached pages and partition the rest in runs, caching each partitioned page."""
+        start, end = min(page_paths), max(page_paths)
+        keys = {
+            page_number: page_cache_key(fingerprint, self.partition_kwargs(page_paths[page_number]))
+            for page_number, fingerprint in zip(range(start, end + 1), page_fingerprints(file_path, start, end))
+        }
+        cached = self.page_cache.get_many(list(keys.values()))
+        missing = {page_number: path for page_number, path in page_paths.items() if keys[page_number] not in cached}
+        if missing:
+            logger.debug(f"Page cache: {len(page_paths) - len(missing)} of {len(page_paths)} pages "
+                         f"cached for {file_path.name}")
+
+        # Each cached page is its own shard, so merging restores the hierarchy across pages
+        runs = {run_start: (path, run_end) for path, run_start, run_end in group_page_runs(missing)}
+        shards = []
+        page_number = start
+        while page_number <= end:
+            if page_number in runs:
+                path, run_end = runs[page_number]
+                elements = partition_page_range(file_path, page_number, run_end, self.partition_kwargs(path))
+                self.page_cache.put_many({keys[page]: dicts
+                                          for page, dicts in split_pages(elements, page_number, run_end).items()})
+                shards.append(elements)
+                page_number = run_end + 1
+            else:
+                shards.append(load_page(cached[keys[page_number]], file_path, page_number))
+                page_number += 1
+        return merge_shards(shards, include_page_breaks=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = get_ocr_stats() if self.config['ocr_engine'] == 'tesserocr' else {}
+        if self.page_cache is not None:
+            stats.update(get_page_cache_stats())
+        return stats
+
+
+class ApiBackend(PartitionBackend):
+    """The unstructured partition API at api_url, through each process's pooled client.
+
+    A whole document's element dicts go straight to the output sinks, which read them into
+    ElementColumns. Page ranges are rebuilt into Element objects, since shards are merged
+    (and checkpointed) as Elements.
+    """
+
+    name = 'api'
+
+    def partition(self, file_path: Path, page_range: Optional[Tuple[int, int]] = None) -> List[Any]:
+        return elements_from_dicts(self.partition_dicts(file_path, page_range))
+
+    def partition_document(self, file_path: Path) -> List[Any]:
+        return self.partition_dicts(file_path)
+
+    def partition_dicts(self, file_path: Path, page_range: Optional[Tuple[int, int]] = None) -> List[Dict[str, Any]]:
+        client = get_api_client(self.config)
+        if page_range is None:
+            return client.partition_file(file_path)
+        return client.partition_page_range(file_path, *page_range)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(get_api_client(self.config).stats)
+
+    def take_request_seconds(self) -> List[float]:
+        return get_api_client(self.config).take_batch_seconds()
+
+
+class StubBackend(ApiBackend):
+    """Canned elements for every page (api_stub.page_elements), made in-process.
+
+    Costs almost nothing to partition, so a run measures the orchestration and output
+    overhead that the other backends pay on top of partitioning.
+    """
+
+    name = 'stub'
+
+    def partition_dicts(self, file_path: Path, page_range: Optional[Tuple[int, int]] = None) -> List[Dict[str, Any]]:
+        if page_range is None:
+            return page_elements(file_path.read_bytes(), filename=file_path.name)
+        start, end = page_range
+        return number_page_range(page_elements(extract_page_range(file_path, start, end), filename=file_path.name),
+                                 start)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {}
+
+    def take_request_seconds(self) -> List[float]:
+        return []
+
+
+PARTITION_BACKENDS = {backend.name: backend for backend in (LocalBackend, ApiBackend, StubBackend)}
+
+
+def create_backend(config: Dict[str, Any]) -> PartitionBackend:
+    name = config['partition_backend']
+    if name not in PARTITION_BACKENDS:
+        raise ValueError(f"Unknown partition backend: {name} (expected one of {', '.join(PARTITION_BACKENDS)})")
+    return PARTITION_BACKENDS[name](config)
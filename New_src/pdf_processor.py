@@ -1,23 +1,46 @@
 import logging
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import os
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 from tqdm import tqdm
-from unstructured.partition.pdf import partition_pdf
-from unstructured.staging.base import elements_to_json
 
-from element_processor import process_elements
+from api_client import latency_percentiles
+from checkpoints import DocumentCheckpoint, get_checkpoint_stats, reset_checkpoint_stats
+from element_processor import iter_pages
 from file_handler import (
+    ELEMENTS_DATASET_DIR,
+    ElementWriter,
+    SinkOptions,
+    fsync_outputs,
     generate_summary_report,
+    get_sink_stats,
     load_error_files,
-    save_elements_data,
-    save_metadata_html,
-    save_metadata_json,
-    save_tables,
+    save_cost_log,
     update_error_log,
 )
-from utils import copy_pdf_to_output, get_output_folder, is_already_processed
+from io_executor import configure_io_executor, get_io_stats, submit_io
+from layout_models import get_model_stats, record_document
+from manifest import ProcessedManifest, hash_file
+from page_classifier import FAST_PATH, HI_RES_PATH, get_page_path_stats
+from page_sharding import ShardMerger, get_page_count, merge_shards, split_page_ranges
+from partition_backends import PartitionBackend, create_backend
+from scheduler import ScheduledTask, estimate_cost, estimate_page_range_cost, run_longest_first
+from supervisor import SupervisedPool, WorkerKilled
+from telemetry import TELEMETRY_FILE, DocumentTelemetry, activate, in_stage, stage
+from utils import copy_pdf_to_output, get_copy_stats, get_output_folder, is_already_processed, link_or_copy
+from write_behind import drain_write_behind, get_write_behind, get_write_behind_stats
+
+
+def initialize_process(backend: PartitionBackend, io_threads: int, io_queue_depth: int):
+    """Pool initializer: size the shared output I/O executor and prepare the partition backend."""
+    configure_io_executor(io_threads, io_queue_depth)
+    reset_checkpoint_stats()
+    backend.initialize_worker()
 
 
 class PDFProcessor:
@@ -28,92 +51,555 @@ class PDFProcessor:
         self.logger = logging.getLogger('pdf_processor')
         self.error_log_file = Path(self.config['output_dir']) / 'error_log.json'
         self.error_files = load_error_files(self.error_log_file)
+        self.manifest = ProcessedManifest(Path(self.config['output_dir']))
+        configure_io_executor(self.config['io_threads'], self.config['io_queue_depth'])
+        self.backend = create_backend(self.config)
+        self.telemetry_log = Path(self.config['output_dir']) / TELEMETRY_FILE
+        # Telemetry records of one run share this id, so the report can pick out a run
+        self.run_id = datetime.now().isoformat(timespec='seconds')
 
     def process_pdfs(self):
         pdf_files = list(Path(self.config['input_dir']).glob('**/*.pdf'))
         successful_files = []
         failed_files = []
+        run_stats = {}
+        request_seconds = []
 
+        duplicate_groups = []
+        if self.config['deduplicate_inputs']:
+            pdf_files, duplicate_groups = self._deduplicate(pdf_files)
+
+        start_time = time.perf_counter()
         if self.config['parallel_processing']:
             self.logger.info("Parallel processing enabled")
-            with ProcessPoolExecutor(max_workers=self.config['num_workers']) as executor:
-                futures = []
-                for i in range(0, len(pdf_files), self.config['batch_size']):
-                    batch = pdf_files[i:i+self.config['batch_size']]
-                    futures.append(executor.submit(self._process_batch, batch))
-                
-                for future in tqdm(as_completed(futures), total=len(futures), desc="Processing PDF batches"):
-                    batch_results = future.result()
-                    successful_files.extend(batch_results['successful'])
-                    failed_files.extend(batch_results['failed'])
+            worker_stats = {}
+            cost_log = []
+            tasks, skipped_files, pending_shards = self._build_tasks(pdf_files)
+            successful_files.extend(str(file_path) for file_path in skipped_files)
+            failed_shards = set()
+            with self._create_pool() as executor:
+                completed = run_longest_first(executor, tasks, self.config['num_workers'])
+                for task, future, seconds in tqdm(completed, total=len(tasks), desc="Processing PDFs"):
+                    file_path, shard_index = task.key
+                    cost_log.append(self._log_cost(task, seconds))
+                    if future.exception() is None:
+                        # Counters are cumulative per worker, so keep the latest report from each process
+                        stats = future.result()['worker_stats']
+                        worker_stats[stats['pid']] = stats
+                        request_seconds.extend(future.result()['request_seconds'])
+                    elif isinstance(future.exception(), WorkerKilled):
+                        self._log_killed(task, future.exception())
+                    if shard_index is not None:
+                        result = self._collect_shard(future, file_path, shard_index, pending_shards, failed_shards)
+                    elif future.exception() is not None:
+                        self.logger.error(f"Error processing {file_path}: {str(future.exception())}")
+                        result = False
+                    else:
+                        result = future.result()['success']
+                    if result is True:
+                        successful_files.append(str(file_path))
+                    elif result is False:
+                        failed_files.append(str(file_path))
+            # Files whose shards were all checkpointed by an earlier run had nothing to schedule
+            for file_path in [path for path, shards in pending_shards.items() if None not in shards]:
+                if self._finish_sharded_file(file_path, pending_shards.pop(file_path)):
+                    successful_files.append(str(file_path))
+                else:
+                    failed_files.append(str(file_path))
+            self._finish_write_behind(successful_files, failed_files)
+            # Sharded files are merged and written here, and resumed shards are counted here
+            worker_stats[os.getpid()] = self._worker_stats()
+            save_cost_log(cost_log, Path(self.config['output_dir']))
+            run_stats.update(self._cost_stats(cost_log))
+            run_stats.update(self._worker_run_stats(list(worker_stats.values())))
+            if isinstance(executor, SupervisedPool):
+                run_stats.update(self._supervisor_stats(executor))
         else:
             self.logger.info("Parallel processing disabled")
+            self.backend.initialize_worker()
+            skipped_files = []
             for file_path in tqdm(pdf_files, desc="Processing PDFs"):
+                if self._pdf_exists_in_output(file_path):
+                    self.logger.info(f"Skipping already processed file: {file_path}")
+                    skipped_files.append(file_path)
+                    successful_files.append(str(file_path))
+                    continue
                 result = self._process_file(file_path)
                 if result:
                     successful_files.append(str(file_path))
                 else:
                     failed_files.append(str(file_path))
+            self._finish_write_behind(successful_files, failed_files)
+            request_seconds.extend(self.backend.take_request_seconds())
+            run_stats.update(self._worker_run_stats([self._worker_stats()]))
+        elapsed = time.perf_counter() - start_time
+        if request_seconds:
+            run_stats["Partition request latency (s)"] = latency_percentiles(request_seconds)
+
+        if duplicate_groups:
+            self._materialize_duplicates(duplicate_groups, successful_files, failed_files)
+            # Skipped files took no partition time, so only the files processed now set the rate
+            skipped = set(skipped_files)
+            processed_files = [file_path for file_path in pdf_files if file_path not in skipped]
+            run_stats.update(self._dedup_stats(duplicate_groups, processed_files, elapsed))
+
+        generate_summary_report(successful_files, failed_files, Path(self.config['output_dir']), run_stats)
+
+    def _create_pool(self) -> Executor:
+        initargs = (self.backend, self.config['io_threads'], self.config['io_queue_depth'])
+        if not self.config['supervise_workers']:
+            return ProcessPoolExecutor(max_workers=self.config['num_workers'], initializer=initialize_process,
+                                       initargs=initargs)
+        return SupervisedPool(self.config['num_workers'], initializer=initialize_process, initargs=initargs,
+                              task_timeout=self.config['file_timeout_seconds'],
+                              max_rss_mb=self.config['worker_max_rss_mb'],
+                              max_tasks_per_worker=self.config['worker_max_tasks'])
+
+    def _log_killed(self, task: ScheduledTask, error: WorkerKilled):
+        """Record a task whose worker was killed in the error log, with the reason."""
+        file_path, shard_index = task.key
+        entry = {"file": str(file_path), "reason": error.reason, "detail": str(error),
+                 "time": datetime.now().isoformat(timespec='seconds')}
+        if shard_index is not None:
+            entry["pages"] = f"{task.args[1]}-{task.args[2]}"
+        self.error_files.append(entry)
+        update_error_log(self.error_files, self.error_log_file)
+
+    def _supervisor_stats(self, pool: SupervisedPool) -> Dict[str, Any]:
+        stats = pool.get_stats()
+        return {
+            "Tasks killed (timeout)": stats['tasks_killed_timeout'],
+            "Tasks killed (memory)": stats['tasks_killed_memory'],
+            "Tasks killed (worker crash)": stats['tasks_killed_crash'],
+            "Workers recycled": stats['workers_recycled'],
+        }
+
+    def _content_hash(self, file_path: Path) -> Tuple[str, bool]:
+        """The file's content hash, and whether it had to be computed (rather than read from the manifest)."""
+        content_hash = self.manifest.cached_hash(file_path)
+        if content_hash:
+            return content_hash, False
+        return hash_file(file_path), True
+
+    def _deduplicate(self, pdf_files: List[Path]) -> Tuple[List[Path], List[Tuple[str, Path, List[Path]]]]:
+        """Group inputs by content hash so each unique document is partitioned once."""
+        with ThreadPoolExecutor(max_workers=self.config['num_workers']) as executor:
+            content_hashes = list(tqdm(executor.map(self._content_hash, pdf_files),
+                                       total=len(pdf_files), desc="Hashing PDFs"))
+        # Write new hashes back so the next run only hashes new or changed inputs
+        self.manifest.store_hashes({file_path: content_hash
+                                    for file_path, (content_hash, computed) in zip(pdf_files, content_hashes)
+                                    if computed})
+
+        groups = defaultdict(list)
+        for file_path, (content_hash, _) in zip(pdf_files, content_hashes):
+            groups[content_hash].append(file_path)
+
+        unique_files = []
+        duplicate_groups = []
+        for content_hash, files in groups.items():
+            # Prefer a copy that was already processed so its output can be reused directly
+            canonical = next((f for f in files if self._pdf_exists_in_output(f)), files[0])
+            unique_files.append(canonical)
+            duplicates = [f for f in files if f != canonical]
+            if duplicates:
+                duplicate_groups.append((content_hash, canonical, duplicates))
 
-        generate_summary_report(successful_files, failed_files, Path(self.config['output_dir']))
+        duplicate_count = sum(len(duplicates) for _, _, duplicates in duplicate_groups)
+        self.logger.info(f"Found {len(unique_files)} unique PDFs and {duplicate_count} duplicates")
+        return unique_files, duplicate_groups
 
-    def _process_batch(self, batch: List[Path]) -> Dict[str, List[str]]:
-        successful = []
-        failed = []
-        for file_path in batch:
-            result = self._process_file(file_path)
-            if result:
-                successful.append(str(file_path))
+    def _materialize_duplicates(self, duplicate_groups: List[Tuple[str, Path, List[Path]]],
+                                successful_files: List[str], failed_files: List[str]):
+        output_dir = Path(self.config['output_dir'])
+        failed = set(failed_files)
+        for content_hash, canonical, duplicates in duplicate_groups:
+            if str(canonical) in failed:
+                for duplicate in duplicates:
+                    self.logger.error(f"Not processing duplicate {duplicate}: canonical copy {canonical} failed")
+                    failed_files.append(str(duplicate))
+                continue
+
+            entry = self.manifest.get(canonical)
+            canonical_folder = Path(entry['output_folder']) if entry else get_output_folder(canonical, output_dir)
+            if entry:
+                artifacts = entry['artifacts']
             else:
-                failed.append(str(file_path))
-        return {'successful': successful, 'failed': failed}
+                artifacts = [p.name for p in canonical_folder.iterdir() if p.is_file()]
+            artifacts = [name for name in artifacts if not name.lower().endswith('.pdf')]
+
+            for duplicate in duplicates:
+                try:
+                    self._link_duplicate_output(duplicate, canonical_folder, artifacts, content_hash)
+                    successful_files.append(str(duplicate))
+                except Exception as e:
+                    self.logger.error(f"Error linking duplicate {duplicate} to {canonical}: {str(e)}")
+                    failed_files.append(str(duplicate))
+
+    def _link_duplicate_output(self, file_path: Path, canonical_folder: Path, artifacts: List[str],
+                               content_hash: str):
+        if self._pdf_exists_in_output(file_path):
+            return
+
+        output_folder = get_output_folder(file_path, Path(self.config['output_dir']))
+        output_folder.mkdir(parents=True, exist_ok=True)
+        linked = []
+        if output_folder != canonical_folder:
+            for name in artifacts:
+                source = canonical_folder / name
+                if source.exists():
+                    link_or_copy(source, output_folder / name)
+                    linked.append(name)
+
+        copy_pdf_to_output(file_path, output_folder, self.config['pdf_copy_mode'])
+        self.manifest.record(file_path, output_folder, linked + [file_path.name], content_hash=content_hash)
+        self.logger.info(f"Reused output of identical document for: {file_path}")
+
+    def _dedup_stats(self, duplicate_groups: List[Tuple[str, Path, List[Path]]], processed_files: List[Path],
+                     elapsed: float) -> Dict[str, Any]:
+        duplicate_files = [f for _, _, duplicates in duplicate_groups for f in duplicates]
+        duplicate_bytes = sum(f.stat().st_size for f in duplicate_files)
+        processed_bytes = sum(f.stat().st_size for f in processed_files)
+        # Partition time scales roughly with input size, so extrapolate from this run's throughput
+        seconds_per_byte = elapsed / processed_bytes if processed_bytes else 0.0
+        return {
+            "Duplicate inputs reused": len(duplicate_files),
+            "Duplicate input size (MB)": round(duplicate_bytes / 1024 ** 2, 1),
+            "Estimated partition time saved (s)": round(duplicate_bytes * seconds_per_byte, 1),
+        }
+
+    def _process_file_task(self, file_path: Path) -> Dict[str, Any]:
+        return {'success': self._process_file(file_path), 'worker_stats': self._worker_stats(),
+                'request_seconds': self.backend.take_request_seconds()}
+
+    def _partition_shard_task(self, file_path: Path, start: int, end: int) -> Dict[str, Any]:
+        telemetry = self._start_telemetry(file_path, (start, end), kind='shard')
+        try:
+            with activate(telemetry):
+                elements = self._partition(file_path, (start, end))
+        except Exception:
+            self._finish_telemetry(telemetry, 'failed')
+            raise
+        self._finish_telemetry(telemetry)
+        return {'elements': elements, 'worker_stats': self._worker_stats(),
+                'request_seconds': self.backend.take_request_seconds()}
+
+    def _start_telemetry(self, file_path: Path, page_range: Optional[Tuple[int, int]] = None,
+                         kind: str = 'document') -> Optional[DocumentTelemetry]:
+        """Start timing the stages of a PDF, a page shard ('shard') or a sharded PDF's outputs ('outputs')."""
+        if not self.config['telemetry']:
+            return None
+        if page_range is not None:
+            pages = page_range[1] - page_range[0] + 1
+        else:
+            try:
+                pages = get_page_count(file_path)
+            except Exception:
+                pages = 0
+        return DocumentTelemetry(self.telemetry_log, self.run_id, file_path, pages, page_range, kind)
+
+    def _finish_telemetry(self, telemetry: Optional[DocumentTelemetry], status: str = 'ok'):
+        if telemetry is None:
+            return
+        try:
+            telemetry.finish(status)
+        except OSError as e:
+            self.logger.warning(f"Could not write telemetry for {telemetry.record['file']}: {str(e)}")
+
+    def _worker_stats(self) -> Dict[str, int]:
+        return {**get_model_stats(), **get_page_path_stats(), **get_sink_stats(), **get_io_stats(),
+                **get_write_behind_stats(), **get_copy_stats(), **get_checkpoint_stats(), **self.backend.get_stats()}
+
+    def _worker_run_stats(self, worker_stats: List[Dict[str, int]]) -> Dict[str, Any]:
+        model_loads = sum(stats['model_loads'] for stats in worker_stats)
+        documents = sum(stats['documents'] for stats in worker_stats)
+        self.logger.info(f"Layout model loads: {model_loads} for {documents} documents "
+                         f"across {len(worker_stats)} worker(s)")
+        run_stats = {"Partition backend": self.backend.name, "Layout model loads": model_loads,
+                     "Documents partitioned": documents}
+        if self.config['text_layer_fast_path']:
+            run_stats["Pages on fast text-layer path"] = sum(stats[FAST_PATH] for stats in worker_stats)
+            run_stats["Pages on hi_res path"] = sum(stats[HI_RES_PATH] for stats in worker_stats)
+        sink_seconds = defaultdict(float)
+        for stats in worker_stats:
+            for name, seconds in stats['sink_seconds'].items():
+                sink_seconds[name] += seconds
+        for name, seconds in sink_seconds.items():
+            run_stats[f"Output time {name} (s)"] = round(seconds, 2)
+        copy_bytes = sum(stats['copy_bytes'] for stats in worker_stats)
+        copy_seconds = sum(stats['copy_seconds'] for stats in worker_stats)
+        copy_methods = Counter()
+        for stats in worker_stats:
+            copy_methods.update(stats['copy_methods'])
+        run_stats["PDF copies by method"] = dict(copy_methods)
+        run_stats["PDF copy throughput (MB/s)"] = (
+            round(copy_bytes / 1024 ** 2 / copy_seconds, 1) if copy_seconds else 0.0)
+        run_stats["Output I/O tasks"] = sum(stats['io_tasks'] for stats in worker_stats)
+        run_stats["Output I/O backpressure wait (s)"] = round(
+            sum(stats['io_wait_seconds'] for stats in worker_stats), 2)
+        if any('ocr_calls' in stats for stats in worker_stats):
+            run_stats["OCR calls (tesserocr)"] = sum(stats['ocr_calls'] for stats in worker_stats)
+            run_stats["OCR time (s)"] = round(sum(stats['ocr_seconds'] for stats in worker_stats), 2)
+        if any('page_cache_hits' in stats for stats in worker_stats):
+            run_stats["Page cache hits"] = sum(stats['page_cache_hits'] for stats in worker_stats)
+            run_stats["Page cache misses"] = sum(stats['page_cache_misses'] for stats in worker_stats)
+            run_stats["Page cache evictions"] = sum(stats['page_cache_evictions'] for stats in worker_stats)
+        if any('api_requests' in stats for stats in worker_stats):
+            run_stats["Partition API requests"] = sum(stats['api_requests'] for stats in worker_stats)
+            run_stats["Partition API retries"] = sum(stats['api_retries'] for stats in worker_stats)
+        if self.config['checkpoints']:
+            run_stats["Checkpointed page ranges saved"] = sum(
+                stats['checkpoint_ranges_saved'] for stats in worker_stats)
+            run_stats["Checkpointed page ranges resumed"] = sum(
+                stats['checkpoint_ranges_resumed'] for stats in worker_stats)
+        if self.config['write_behind']:
+            run_stats["Write-behind documents"] = sum(stats['write_behind_jobs'] for stats in worker_stats)
+            run_stats["Write-behind queue wait (s)"] = round(
+                sum(stats['write_behind_wait_seconds'] for stats in worker_stats), 2)
+        return run_stats
 
     def _process_file(self, file_path: Path) -> bool:
+        telemetry = None
         try:
             output_dir = Path(self.config['output_dir'])
-            pdf_filename = file_path.name
 
-            # Check if the PDF already exists in any subfolder of the output directory
-            if self._pdf_exists_in_output(output_dir, pdf_filename):
+            # Check the processed-file manifest instead of walking the output tree
+            if self._pdf_exists_in_output(file_path):
                 self.logger.info(f"Skipping already processed file: {file_path}")
                 return True  # Return True to indicate successful handling (skipping)
 
             output_folder = get_output_folder(file_path, output_dir)
             output_folder.mkdir(parents=True, exist_ok=True)
 
-            elements = partition_pdf(
-                filename=str(file_path),
-                strategy='hi_res',
-                hi_res_model_name="yolox",
-                infer_table_structure=True,
-                include_metadata=True,
-                include_page_breaks=True,
-                extract_images_in_pdf=False,
-                ocr_languages=['eng'],
-                use_ocr_for_pages_with_text=False,
-                max_partition=1000,  # Adjust based on your needs
-            )
-
-            all_elements_df, tables, all_elements_metadata = process_elements(elements)
-
-            save_elements_data(all_elements_df, output_folder)
-            save_metadata_json(all_elements_metadata, output_folder)
-            save_metadata_html(all_elements_metadata, output_folder)
-            save_tables(tables, output_folder)
-
-            # Save raw JSON output
-            raw_json_path = output_folder / "raw_elements.json"
-            elements_to_json(elements, filename=str(raw_json_path))
-
-            copy_pdf_to_output(file_path, output_folder)
+            record_document()
+            telemetry = self._start_telemetry(file_path)
+            with activate(telemetry):
+                if self.config['streaming_output']:
+                    self._stream_outputs(file_path, output_folder)
+                elif self.config['write_behind']:
+                    elements = self._partition(file_path)
+                    # The write-behind job finishes the telemetry once the outputs are written
+                    get_write_behind(self.config['write_behind_depth']).submit(
+                        self._write_outputs_behind, file_path, output_folder, elements, telemetry)
+                    self.logger.info(f"Partitioned file, outputs queued: {file_path}")
+                    return True
+                else:
+                    elements = self._partition(file_path)
+                    self._write_outputs(file_path, output_folder, elements)
+            self._finish_telemetry(telemetry)
+            self.logger.info(f"Processed file: {file_path}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Error processing {file_path}: {str(e)}")
+            self._finish_telemetry(telemetry, 'failed')
+            return False
+
+    def _partition(self, file_path: Path, page_range: Optional[Tuple[int, int]] = None) -> List[Any]:
+        """Partition through the backend, in checkpointed page ranges when checkpoints are on."""
+        if not self.config['checkpoints']:
+            return self._backend_partition(file_path, page_range)
+        if page_range is not None:
+            return self._partition_checkpointed(file_path, *page_range)
+        page_ranges = split_page_ranges(get_page_count(file_path), self.config['checkpoint_pages'])
+        if len(page_ranges) == 1:
+            return self._backend_partition(file_path)
+        shards = [self._partition_checkpointed(file_path, start, end) for start, end in page_ranges]
+        with stage('post_processing'):
+            return merge_shards(shards, include_page_breaks=True)
+
+    def _backend_partition(self, file_path: Path, page_range: Optional[Tuple[int, int]] = None) -> List[Any]:
+        with stage('partition'):
+            if page_range is None:
+                return self.backend.partition_document(file_path)
+            return self.backend.partition(file_path, page_range)
+
+    def _checkpoint(self, file_path: Path) -> DocumentCheckpoint:
+        output_folder = get_output_folder(file_path, Path(self.config['output_dir']))
+        return DocumentCheckpoint(output_folder, file_path, {
+            key: self.config[key]
+            for key in ('partition_backend', 'hi_res_model_name', 'text_layer_fast_path', 'ocr_engine')
+        })
+
+    def _partition_checkpointed(self, file_path: Path, start: int, end: int) -> List[Any]:
+        checkpoint = self._checkpoint(file_path)
+        elements = checkpoint.load(start, end)
+        if elements is None:
+            elements = self._backend_partition(file_path, (start, end))
+            checkpoint.save(start, end, elements)
+        return elements
+
+    def _element_writer(self, file_path: Path, output_folder: Path) -> ElementWriter:
+        return ElementWriter(output_folder, sinks=self.config['output_sinks'], options=SinkOptions(
+            compact_json=self.config['compact_json'],
+            buffer_size=self.config['output_buffer_size'],
+            source_path=file_path,
+            dataset_dir=Path(self.config['output_dir']) / ELEMENTS_DATASET_DIR,
+        ))
+
+    def _write_outputs(self, file_path: Path, output_folder: Path, elements: List[Any], durable: bool = False):
+        pdf_copy = submit_io(in_stage('pdf_copy', copy_pdf_to_output), file_path, output_folder, self.config['pdf_copy_mode'])
+        writer = self._element_writer(file_path, output_folder)
+        try:
+            writer.write(elements)
+            artifacts = writer.close()
+        except BaseException:
+            # Nothing half-written is published (e.g. renamed into the Parquet dataset)
+            writer.abort()
+            raise
+        finally:
+            pdf_copy.result()
+        artifacts.append(file_path.name)
+        if durable:
+            fsync_outputs(output_folder, artifacts)
+        # The manifest row is the completion marker the skip check relies on
+        self.manifest.record(file_path, output_folder, artifacts)
+        if self.config['checkpoints']:
+            self._checkpoint(file_path).discard()
+
+    def _write_outputs_behind(self, file_path: Path, output_folder: Path, elements: List[Any],
+                              telemetry: Optional[DocumentTelemetry] = None):
+        """Write-behind job: a failure leaves the file unrecorded, so the next run retries it."""
+        try:
+            with activate(telemetry):
+                self._write_outputs(file_path, output_folder, elements, durable=True)
+            self._finish_telemetry(telemetry)
             self.logger.info(f"Processed file: {file_path}")
+        except Exception as e:
+            self._finish_telemetry(telemetry, 'failed')
+            self.logger.error(f"Error writing outputs for {file_path}: {str(e)}")
+
+    def _finish_write_behind(self, successful_files: List[str], failed_files: List[str]):
+        """Wait for queued outputs, then fail any partitioned file whose outputs were never recorded."""
+        if not self.config['write_behind']:
+            return
+        # Pool workers have already drained their queues on exit; sharded files are written here
+        drain_write_behind()
+        unwritten = [f for f in successful_files if not self._pdf_exists_in_output(Path(f))]
+        for f in unwritten:
+            self.logger.error(f"Outputs were not written for: {f}")
+            successful_files.remove(f)
+            failed_files.append(f)
+
+    def _stream_outputs(self, file_path: Path, output_folder: Path):
+        """Partition a few pages at a time and hand each page straight to the output sinks.
+
+        Peak memory is bounded by one window of elements instead of the whole document.
+        """
+        merger = ShardMerger(include_page_breaks=True)
+        pdf_copy = submit_io(in_stage('pdf_copy', copy_pdf_to_output), file_path, output_folder, self.config['pdf_copy_mode'])
+        writer = self._element_writer(file_path, output_folder)
+        try:
+            for start, end in split_page_ranges(get_page_count(file_path), self.config['streaming_pages']):
+                for page_elements in iter_pages(merger.add(self._partition(file_path, (start, end)))):
+                    writer.write(page_elements)
+            artifacts = writer.close()
+        except BaseException:
+            writer.abort()
+            raise
+        finally:
+            pdf_copy.result()
+        self.manifest.record(file_path, output_folder, artifacts + [file_path.name])
+        if self.config['checkpoints']:
+            self._checkpoint(file_path).discard()
+
+    def _build_tasks(self, pdf_files: List[Path]) -> Tuple[List[ScheduledTask], List[Path], Dict[Path, List[Any]]]:
+        """Estimate the cost of every unprocessed PDF and turn it into whole-file or page-shard tasks."""
+        tasks = []
+        skipped_files = []
+        pending_shards = {}
+        for file_path in tqdm(pdf_files, desc="Estimating PDF costs"):
+            if self._pdf_exists_in_output(file_path):
+                self.logger.info(f"Skipping already processed file: {file_path}")
+                skipped_files.append(file_path)
+                continue
+            estimate = estimate_cost(file_path)
+            if self.config['page_sharding'] and estimate.page_count >= self.config['page_sharding_min_pages']:
+                page_ranges = split_page_ranges(estimate.page_count, self.config['pages_per_shard'])
+                pending_shards[file_path] = [None] * len(page_ranges)
+                checkpoint = self._checkpoint(file_path) if self.config['checkpoints'] else None
+                for shard_index, (start, end) in enumerate(page_ranges):
+                    # Shards finished by an earlier, interrupted run are not scheduled again
+                    resumed = checkpoint.load(start, end) if checkpoint else None
+                    if resumed is not None:
+                        pending_shards[file_path][shard_index] = resumed
+                        continue
+                    tasks.append(ScheduledTask(
+                        (file_path, shard_index),
+                        estimate_page_range_cost(estimate, start, end),
+                        self._partition_shard_task,
+                        (file_path, start, end),
+                    ))
+            else:
+                tasks.append(ScheduledTask((file_path, None), estimate, self._process_file_task, (file_path,)))
+        self.logger.info(f"Scheduled {len(tasks)} tasks ({len(pending_shards)} PDFs page-sharded), "
+                         f"skipped {len(skipped_files)} already processed")
+        return tasks, skipped_files, pending_shards
+
+    def _log_cost(self, task: ScheduledTask, seconds: float) -> Dict[str, Any]:
+        file_path, shard_index = task.key
+        estimate = task.estimate
+        label = file_path.name if shard_index is None else f"{file_path.name} shard {shard_index + 1}"
+        self.logger.info(f"Cost of {label}: estimated {estimate.seconds:.1f}s "
+                         f"({estimate.page_count} pages, {estimate.size_mb:.1f} MB), actual {seconds:.1f}s")
+        return {
+            "file": str(file_path),
+            "shard": "" if shard_index is None else shard_index + 1,
+            "pages": estimate.page_count,
+            "size_mb": round(estimate.size_mb, 2),
+            "estimated_seconds": round(estimate.seconds, 2),
+            "actual_seconds": round(seconds, 2),
+        }
+
+    def _cost_stats(self, cost_log: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if not cost_log:
+            return {}
+        estimated = sum(entry['estimated_seconds'] for entry in cost_log)
+        actual = sum(entry['actual_seconds'] for entry in cost_log)
+        pages = sum(entry['pages'] for entry in cost_log)
+        return {
+            "Estimated partition time (s)": round(estimated, 1),
+            "Actual partition time (s)": round(actual, 1),
+            "Observed seconds per page": round(actual / pages, 2) if pages else 0.0,
+        }
+
+    def _collect_shard(self, future: Future, file_path: Path, shard_index: int,
+                       pending_shards: Dict[Path, List[Any]], failed_shards: set) -> Optional[bool]:
+        """Store a finished shard; once a file's shards are all in, merge and write it."""
+        shards = pending_shards[file_path]
+        try:
+            shards[shard_index] = future.result()['elements']
+        except Exception as e:
+            self.logger.error(f"Error partitioning shard {shard_index + 1} of {file_path}: {str(e)}")
+            failed_shards.add(file_path)
+            shards[shard_index] = []
+        if any(shard is None for shard in shards):
+            return None
+        del pending_shards[file_path]
+        return file_path not in failed_shards and self._finish_sharded_file(file_path, shards)
+
+    def _finish_sharded_file(self, file_path: Path, shards: List[List[Any]]) -> bool:
+        telemetry = self._start_telemetry(file_path, kind='outputs')
+        try:
+            with activate(telemetry):
+                with stage('post_processing'):
+                    elements = merge_shards(shards, include_page_breaks=True)
+                output_folder = get_output_folder(file_path, Path(self.config['output_dir']))
+                output_folder.mkdir(parents=True, exist_ok=True)
+                if self.config['write_behind']:
+                    get_write_behind(self.config['write_behind_depth']).submit(
+                        self._write_outputs_behind, file_path, output_folder, elements, telemetry)
+                    return True
+                self._write_outputs(file_path, output_folder, elements)
+            self._finish_telemetry(telemetry)
+            self.logger.info(f"Processed file in {len(shards)} page shards: {file_path}")
             return True
         except Exception as e:
             self.logger.error(f"Error processing {file_path}: {str(e)}")
+            self._finish_telemetry(telemetry, 'failed')
             return False
 
-    def _pdf_exists_in_output(self, output_dir: Path, pdf_filename: str) -> bool:
-        return any(output_dir.rglob(pdf_filename))
+    def _pdf_exists_in_output(self, file_path: Path) -> bool:
+        return self.manifest.is_processed(file_path)
 
     def _output_files_exist(self, output_folder: Path) -> bool:
         required_files = [
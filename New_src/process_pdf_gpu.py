@@ -1,9 +1,8 @@
 import os
 import sys
 import subprocess
-from unstructured_inference.models.base import get_model
 from unstructured_inference.inference.layout import DocumentLayout
-import onnxruntime as ort
+from layout_models import get_detection_model, is_gpu_available
 
 def run_command(command):
     try:
@@ -33,13 +32,6 @@ def check_cuda_path():
     else:
         print("CUDA_PATH is not set in environment variables.")
 
-def is_gpu_available():
-    try:
-        return 'CUDAExecutionProvider' in ort.get_available_providers()
-    except Exception as e:
-        print(f"Error checking GPU availability: {e}")
-        return False
-
 # Run diagnostic checks
 check_cuda_path()
 check_cuda_installation()
@@ -48,37 +40,15 @@ check_gpu_drivers()
 # Check if GPU is available
 if is_gpu_available():
     print("GPU is available for ONNX Runtime")
-    providers = ['CUDAExecutionProvider', 'CPUExecutionProvider']
 else:
     print("GPU is not available for ONNX Runtime. Using CPU instead.")
-    providers = ['CPUExecutionProvider']
 
-# Set up ONNX Runtime session options
-sess_options = ort.SessionOptions()
-sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
-
-# Load the YOLOX model
+# Load the YOLOX model through the same cached path the PDF processor workers use
 try:
-    model = get_model("yolox")
-    model.model = ort.InferenceSession(
-        model.model_path,
-        sess_options=sess_options,
-        providers=providers
-    )
+    model = get_detection_model("yolox")
 except Exception as e:
     print(f"Error loading model: {e}")
-    print("Attempting to fall back to CPU-only mode...")
-    try:
-        model = get_model("yolox")
-        model.model = ort.InferenceSession(
-            model.model_path,
-            sess_options=sess_options,
-            providers=['CPUExecutionProvider']
-        )
-        print("Successfully loaded model in CPU-only mode.")
-    except Exception as e:
-        print(f"Error loading model in CPU-only mode: {e}")
-        sys.exit(1)
+    sys.exit(1)
 
 # File path
 file_path = r"C:\Users\Miller\PycharmProjects\UnstructuredFinal\New_src\samples\sample.pdf"
@@ -0,0 +1,66 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, NamedTuple, Tuple
+
+from page_sharding import get_page_count
+
+logger = logging.getLogger('pdf_processor')
+
+# Rough hi_res costs (YOLOX + OCR dominate and scale with pages); checked against the logged actuals
+SECONDS_PER_PAGE = 2.0
+SECONDS_PER_MB = 0.5
+PAGES_PER_MB_FALLBACK = 10
+
+
+class CostEstimate(NamedTuple):
+    page_count: int
+    size_mb: float
+    seconds: float
+
+
+class ScheduledTask(NamedTuple):
+    key: Any
+    estimate: CostEstimate
+    fn: Callable
+    args: Tuple
+
+
+def estimate_cost(file_path: Path, page_count: int = None) -> CostEstimate:
+    """Estimate partition time from the page count (a cheap xref read) and file size."""
+    size_mb = file_path.stat().st_size / 1024 ** 2
+    if page_count is None:
+        try:
+            page_count = get_page_count(file_path)
+        except Exception as e:
+            logger.warning(f"Could not read page count of {file_path}, estimating from size: {e}")
+            page_count = max(1, round(size_mb * PAGES_PER_MB_FALLBACK))
+    return CostEstimate(page_count, size_mb, page_count * SECONDS_PER_PAGE + size_mb * SECONDS_PER_MB)
+
+
+def estimate_page_range_cost(estimate: CostEstimate, start: int, end: int) -> CostEstimate:
+    fraction = (end - start + 1) / estimate.page_count
+    return CostEstimate(end - start + 1, estimate.size_mb * fraction, estimate.seconds * fraction)
+
+
+def run_longest_first(executor: Executor, tasks: List[ScheduledTask],
+                      max_in_flight: int) -> Iterator[Tuple[ScheduledTask, Future, float]]:
+    """Submit tasks longest-first, keeping max_in_flight running, and yield them as they finish.
+
+    Submitting one task per free worker (instead of pre-chunked batches) means a worker
+    that finishes early immediately picks up the next largest remaining file. Yields the
+    task, its future and the observed wall time since submission.
+    """
+    queue = sorted(tasks, key=lambda task: task.estimate.seconds, reverse=True)
+    in_flight = {}
+    position = 0
+    while position < len(queue) or in_flight:
+        while position < len(queue) and len(in_flight) < max_in_flight:
+            task = queue[position]
+            position += 1
+            in_flight[executor.submit(task.fn, *task.args)] = (task, time.perf_counter())
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            task, submitted_at = in_flight.pop(future)
+            yield task, future, time.perf_counter() - submitted_at
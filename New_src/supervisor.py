@@ -0,0 +1,247 @@
+import logging
+import multiprocessing
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Executor, Future
+from multiprocessing.connection import wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger('pdf_processor')
+
+KILL_REASONS = ('timeout', 'memory', 'crash')
+
+
+class WorkerKilled(Exception):
+    """A task whose worker process was killed by the supervisor, or died on its own."""
+
+    def __init__(self, reason: str, detail: str):
+        super().__init__(detail)
+        self.reason = reason
+
+
+def _worker_main(conn, initializer: Optional[Callable], initargs: Tuple):
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        task = conn.recv()
+        if task is None:
+            return
+        fn, args, kwargs = task
+        try:
+            result = (True, fn(*args, **kwargs))
+        except BaseException as e:
+            result = (False, e)
+        try:
+            conn.send(result)
+        except Exception as e:
+            # An unpicklable result or exception must not leave the task waiting forever
+            conn.send((False, RuntimeError(f"Could not return task result: {e!r}")))
+
+
+class _Worker:
+
+    def __init__(self, context, initializer: Optional[Callable], initargs: Tuple):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, initializer, initargs), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks_done = 0
+        self.future: Optional[Future] = None
+        self.started_at = 0.0
+
+    def rss_bytes(self) -> int:
+        """Resident memory of the worker and of the processes it started (e.g. tesseract)."""
+        try:
+            process = psutil.Process(self.process.pid)
+            return sum(p.memory_info().rss for p in [process] + process.children(recursive=True))
+        except psutil.Error:
+            return 0
+
+    def kill(self):
+        if psutil is not None:
+            try:
+                for child in psutil.Process(self.process.pid).children(recursive=True):
+                    child.kill()
+            except psutil.Error:
+                pass
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def retire(self):
+        """Ask the worker to exit; it may take a while (e.g. draining its write-behind queue)."""
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+
+    def reap(self, timeout: Optional[float] = 0) -> bool:
+        """Collect the retired worker once it has exited; False while it is still exiting."""
+        self.process.join(timeout)
+        if self.process.exitcode is None:
+            return False
+        self.conn.close()
+        return True
+
+
+class SupervisedPool(Executor):
+    """A process pool that survives its workers, for use in place of ProcessPoolExecutor.
+
+    Each worker runs one task at a time. A supervisor thread kills a worker whose task runs
+    longer than `task_timeout` seconds or whose RSS exceeds `max_rss_mb`, fails that task's
+    future with WorkerKilled and starts a replacement; a worker that dies on its own (segfault,
+    OOM killer) fails only its task. The rest of the queue keeps flowing, where
+    ProcessPoolExecutor would raise BrokenProcessPool for every pending task. Workers are
+    also replaced after `max_tasks_per_worker` tasks to bound leaks.
+    """
+
+    def __init__(self, max_workers: int, initializer: Optional[Callable] = None, initargs: Tuple = (),
+                 task_timeout: Optional[float] = None, max_rss_mb: Optional[int] = None,
+                 max_tasks_per_worker: Optional[int] = None, poll_interval: float = 0.5):
+        if max_rss_mb and psutil is None:
+            raise ImportError("A worker memory ceiling (worker_max_rss_mb) requires the psutil package")
+        self.max_workers = max_workers
+        self.initializer = initializer
+        self.initargs = initargs
+        self.task_timeout = task_timeout or None
+        self.max_rss_bytes = max_rss_mb * 1024 * 1024 if max_rss_mb else None
+        self.max_tasks_per_worker = max_tasks_per_worker or None
+        self.poll_interval = poll_interval
+        self.stats = Counter()
+        self._context = multiprocessing.get_context()
+        self._pending = deque()
+        self._workers: List[_Worker] = []
+        # Retired workers still exiting, reaped by the supervisor loop without waiting on them
+        self._retiring: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._shutdown = False
+        self._thread = threading.Thread(target=self._supervise, name='pool-supervisor', daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            self._pending.append((future, fn, args, kwargs))
+        self._wakeup.set()
+        return future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                while self._pending:
+                    self._pending.popleft()[0].cancel()
+        self._wakeup.set()
+        if wait:
+            self._thread.join()
+
+    def _supervise(self):
+        while True:
+            self._retiring = [worker for worker in self._retiring if not worker.reap()]
+            self._dispatch()
+            busy = [worker for worker in self._workers if worker.future is not None]
+            if not busy:
+                with self._lock:
+                    if self._shutdown and not self._pending:
+                        break
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            ready = wait([worker.conn for worker in busy] + [worker.process.sentinel for worker in busy],
+                         timeout=self.poll_interval)
+            for worker in busy:
+                if worker.conn in ready:
+                    self._collect(worker)
+                elif worker.process.sentinel in ready:
+                    self._crashed(worker)
+            self._enforce_limits()
+        for worker in self._workers:
+            worker.retire()
+        for worker in self._retiring + self._workers:
+            worker.reap(timeout=None)
+        self._workers.clear()
+        self._retiring.clear()
+
+    def _dispatch(self):
+        """Hand pending tasks to idle workers, starting workers up to max_workers."""
+        while True:
+            idle = next((worker for worker in self._workers if worker.future is None), None)
+            if idle is None and len(self._workers) >= self.max_workers:
+                return
+            with self._lock:
+                if not self._pending:
+                    return
+                future, fn, args, kwargs = self._pending.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+            if idle is None:
+                idle = _Worker(self._context, self.initializer, self.initargs)
+                self._workers.append(idle)
+            try:
+                idle.conn.send((fn, args, kwargs))
+            except OSError:
+                # The worker died starting up (e.g. in the initializer)
+                idle.future = future
+                self._crashed(idle)
+                continue
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            idle.future = future
+            idle.started_at = time.monotonic()
+
+    def _collect(self, worker: _Worker):
+        try:
+            ok, value = worker.conn.recv()
+        except (EOFError, OSError):
+            self._crashed(worker)
+            return
+        future, worker.future = worker.future, None
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+        worker.tasks_done += 1
+        if self.max_tasks_per_worker and worker.tasks_done >= self.max_tasks_per_worker:
+            worker.retire()
+            self._workers.remove(worker)
+            self._retiring.append(worker)
+            self.stats['workers_recycled'] += 1
+
+    def _enforce_limits(self):
+        now = time.monotonic()
+        for worker in [worker for worker in self._workers if worker.future is not None]:
+            elapsed = now - worker.started_at
+            if self.task_timeout and elapsed > self.task_timeout:
+                self._replace(worker, 'timeout', f"killed after {elapsed:.0f}s (limit {self.task_timeout:.0f}s)")
+            elif self.max_rss_bytes:
+                rss = worker.rss_bytes()
+                if rss > self.max_rss_bytes:
+                    self._replace(worker, 'memory', f"killed at {rss / 1024 ** 2:.0f} MB RSS "
+                                                    f"(limit {self.max_rss_bytes / 1024 ** 2:.0f} MB)")
+
+    def _crashed(self, worker: _Worker):
+        worker.process.join()
+        self._replace(worker, 'crash', f"worker exited unexpectedly (exit code {worker.process.exitcode})")
+
+    def _replace(self, worker: _Worker, reason: str, detail: str):
+        """Kill a worker and fail its task; the next dispatch starts a replacement if there is work."""
+        future, worker.future = worker.future, None
+        worker.kill()
+        self._workers.remove(worker)
+        self.stats[f'tasks_killed_{reason}'] += 1
+        logger.warning(f"Worker {worker.process.pid} {detail}")
+        future.set_exception(WorkerKilled(reason, detail))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'workers_recycled': self.stats['workers_recycled'],
+                **{f'tasks_killed_{reason}': self.stats[f'tasks_killed_{reason}'] for reason in KILL_REASONS}}
@@ -0,0 +1,311 @@
+"""Per-document stage telemetry for the PDF pipeline.
+
+Summarize a run from New_src with ``python telemetry.py <output_dir>``.
+"""
+import argparse
+import functools
+import importlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+TELEMETRY_FILE = 'telemetry.jsonl'
+
+# Stages inside partition_pdf, as (stage, module, function). The functions are looked up on
+# their module at call time, so wrapping the module attribute times every call; targets
+# missing from the installed unstructured version are skipped.
+STAGE_HOOKS = (
+    ('open_rasterize', 'unstructured_inference.inference.layout', 'convert_pdf_to_image'),
+    ('open_rasterize', 'unstructured.partition.pdf_image.pdf_image_utils', 'convert_pdf_to_image'),
+    ('open_rasterize', 'unstructured.partition.pdf_image.ocr', 'convert_pdf_to_image'),
+    ('open_rasterize', 'pdf2image', 'convert_from_path'),
+    ('layout', 'unstructured_inference.inference.layout', 'process_file_with_model'),
+    ('layout', 'unstructured_inference.inference.layout', 'process_data_with_model'),
+    ('ocr', 'unstructured.partition.pdf_image.ocr', 'process_file_with_ocr'),
+    ('ocr', 'unstructured.partition.pdf_image.ocr', 'process_data_with_ocr'),
+    ('table_structure', 'unstructured.partition.pdf_image.ocr', 'supplement_element_with_table_extraction'),
+    ('post_processing', 'unstructured.partition.pdf', 'document_to_element_list'),
+)
+
+logger = logging.getLogger('pdf_processor')
+
+_local = threading.local()
+_open_frames = set()
+_frames_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _can_reset_peak_rss() -> bool:
+    """Whether the RSS high-water mark can be reset; probed by the first stage timed.
+
+    Probing resets the mark, so it waits until telemetry is in use rather than running when
+    the module is imported.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss() -> int:
+    """The process's RSS high-water mark in bytes (since the last reset, on Linux)."""
+    if _can_reset_peak_rss():
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        # Windows reports the peak working set; elsewhere the current RSS is the best available
+        return getattr(info, 'peak_wset', info.rss)
+    return 0
+
+
+class _Frame:
+    __slots__ = ('name', 'document', 'wall', 'cpu', 'child_wall', 'child_cpu', 'peak')
+
+    def __init__(self, name: str, document: 'DocumentTelemetry'):
+        self.name = name
+        self.document = document
+        self.child_wall = 0.0
+        self.child_cpu = 0.0
+        with _frames_lock:
+            if _can_reset_peak_rss():
+                # Every open stage keeps the peak reached so far before the mark is reset
+                peak = _peak_rss()
+                for frame in _open_frames:
+                    frame.peak = max(frame.peak, peak)
+                with open('/proc/self/clear_refs', 'w') as f:
+                    f.write('5')
+            self.peak = _peak_rss()
+            _open_frames.add(self)
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+
+    def close(self) -> Tuple[float, float]:
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        with _frames_lock:
+            peak = _peak_rss()
+            for frame in _open_frames:
+                frame.peak = max(frame.peak, peak)
+            _open_frames.discard(self)
+        return wall, cpu
+
+
+class DocumentTelemetry:
+    """Wall time, CPU time and peak RSS per pipeline stage for one PDF, page shard or set of outputs.
+
+    Stages nest: a stage's time excludes the stages run inside it, so 'partition' is the
+    partition work not covered by a finer stage. CPU time is the whole process's, which
+    includes helper threads such as onnxruntime's but also stages running concurrently on
+    the output I/O threads. Peak RSS is the process's high-water mark while the stage ran;
+    it is exact on Linux, and elsewhere the process's peak so far.
+    """
+
+    def __init__(self, log_path: Path, run_id: str, file_path: Path, pages: int,
+                 page_range: Optional[Tuple[int, int]] = None, kind: str = 'document'):
+        self.log_path = log_path
+        self.record = {'run': run_id, 'file': str(file_path), 'kind': kind, 'pages': pages,
+                       'page_range': list(page_range) if page_range else None, 'pid': os.getpid(),
+                       'started': datetime.now().isoformat(timespec='seconds')}
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._frame = _Frame('total', self)
+
+    def add(self, name: str, wall: float, cpu: float, peak: int):
+        with self._lock:
+            stage = self.stages.setdefault(name, {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'peak_rss_mb': 0.0,
+                                                  'calls': 0})
+            stage['wall_seconds'] += wall
+            stage['cpu_seconds'] += cpu
+            stage['peak_rss_mb'] = max(stage['peak_rss_mb'], peak / 1024 ** 2)
+            stage['calls'] += 1
+
+    def finish(self, status: str = 'ok'):
+        """Append the document's record to the telemetry log."""
+        wall, cpu = self._frame.close()
+        with self._lock:
+            stages = {name: {'wall_seconds': round(stage['wall_seconds'], 4),
+                             'cpu_seconds': round(stage['cpu_seconds'], 4),
+                             'peak_rss_mb': round(stage['peak_rss_mb'], 1), 'calls': stage['calls']}
+                      for name, stage in self.stages.items()}
+        record = {**self.record, 'status': status, 'wall_seconds': round(wall, 4), 'cpu_seconds': round(cpu, 4),
+                  'peak_rss_mb': round(self._frame.peak / 1024 ** 2, 1), 'stages': stages}
+        # One write per line on an O_APPEND descriptor, so worker processes can share the file
+        fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, (json.dumps(record) + '\n').encode('utf-8'))
+        finally:
+            os.close(fd)
+
+
+def current_document() -> Optional[DocumentTelemetry]:
+    return getattr(_local, 'document', None)
+
+
+@contextmanager
+def activate(document: Optional[DocumentTelemetry]) -> Iterator[None]:
+    """Attribute the stages run on this thread to `document` (no-op for None)."""
+    previous = current_document()
+    _local.document = document
+    try:
+        yield
+    finally:
+        _local.document = previous
+
+
+@contextmanager
+def stage(name: str, document: Optional[DocumentTelemetry] = None) -> Iterator[None]:
+    """Time a stage of the active document; does nothing when no document is active."""
+    document = document or current_document()
+    stack = _local.__dict__.setdefault('stack', [])
+    if document is None or (stack and stack[-1].name == name and stack[-1].document is document):
+        # Telemetry is off, or the stage calls itself (e.g. one renderer wrapping another)
+        yield
+        return
+    frame = _Frame(name, document)
+    stack.append(frame)
+    try:
+        yield
+    finally:
+        stack.pop()
+        wall, cpu = frame.close()
+        if stack and stack[-1].document is document:
+            stack[-1].child_wall += wall
+            stack[-1].child_cpu += cpu
+        document.add(name, wall - frame.child_wall, cpu - frame.child_cpu, frame.peak)
+
+
+def in_stage(name: str, fn: Callable) -> Callable:
+    """Wrap fn to run as a stage of the document active now, for running on another thread."""
+    document = current_document()
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        with stage(name, document):
+            return fn(*args, **kwargs)
+    return run
+
+
+def install_stage_hooks():
+    """Time the stages inside partition_pdf in this process; safe to call more than once."""
+    for name, module_name, attribute in STAGE_HOOKS:
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        fn = getattr(module, attribute, None)
+        if fn is None or hasattr(fn, '_telemetry_stage'):
+            continue
+
+        def timed(*args, _fn=fn, _name=name, **kwargs):
+            with stage(_name):
+                return _fn(*args, **kwargs)
+        functools.update_wrapper(timed, fn)
+        timed._telemetry_stage = name
+        setattr(module, attribute, timed)
+        logger.debug(f"Telemetry stage {name}: {module_name}.{attribute}")
+
+
+def load_records(path: Path, run: Optional[str] = 'latest') -> List[Dict[str, Any]]:
+    """Records of one run ('latest' by default) or, with run=None, of every run in the log."""
+    if path.is_dir():
+        path = path / TELEMETRY_FILE
+    with open(path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if run == 'latest' and records:
+        run = max(record['run'] for record in records)
+    return [record for record in records if run is None or record['run'] == run]
+
+
+def summarize(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Per-stage percentiles of wall time per record, totals, and pages per second of stage time."""
+    stage_records = defaultdict(list)
+    for record in records:
+        for name, stats in record['stages'].items():
+            stage_records[name].append((record['pages'], stats))
+    total_wall = sum(stats['wall_seconds'] for entries in stage_records.values() for _, stats in entries)
+    stages = {}
+    for name, entries in sorted(stage_records.items(), key=lambda item: -sum(s['wall_seconds'] for _, s in item[1])):
+        wall = [stats['wall_seconds'] for _, stats in entries]
+        p50, p90, p99 = np.percentile(wall, [50, 90, 99])
+        pages = sum(pages for pages, _ in entries)
+        stages[name] = {
+            'records': len(entries),
+            'wall_p50': round(float(p50), 3), 'wall_p90': round(float(p90), 3), 'wall_p99': round(float(p99), 3),
+            'wall_total': round(sum(wall), 2),
+            'wall_share': round(sum(wall) / total_wall, 3) if total_wall else 0.0,
+            'cpu_total': round(sum(stats['cpu_seconds'] for _, stats in entries), 2),
+            'peak_rss_mb': round(max(stats['peak_rss_mb'] for _, stats in entries), 1),
+            'pages_per_second': round(pages / sum(wall), 2) if sum(wall) else None,
+        }
+    # A sharded PDF has a record per shard plus an 'outputs' record for merging and writing; count its pages once
+    partitioned = [record for record in records if record['kind'] != 'outputs']
+    pages = sum(record['pages'] for record in partitioned)
+    documents = [record for record in records if record['kind'] == 'document']
+    return {
+        'records': len(records),
+        'failed': sum(record['status'] != 'ok' for record in records),
+        'pages': pages,
+        'wall_seconds': round(total_wall, 2),
+        'pages_per_second': round(pages / total_wall, 2) if total_wall else 0.0,
+        'document_pages_per_second': round(float(np.median(
+            [record['pages'] / record['wall_seconds'] for record in documents if record['wall_seconds']]
+        )), 2) if documents else None,
+        'stages': stages,
+    }
+
+
+def format_report(summary: Dict[str, Any]) -> str:
+    header = (f"{summary['records']} records ({summary['failed']} failed), {summary['pages']} pages, "
+              f"{summary['wall_seconds']:.1f}s of stage time: {summary['pages_per_second']:.2f} pages/s per worker")
+    if summary['document_pages_per_second'] is not None:
+        header += f", median document {summary['document_pages_per_second']:.2f} pages/s"
+    lines = [
+        header,
+        "",
+        f"{'stage':<24}{'records':>8}{'p50 s':>9}{'p90 s':>9}{'p99 s':>9}{'total s':>10}{'share':>7}"
+        f"{'cpu s':>10}{'peak MB':>9}{'pages/s':>10}",
+    ]
+    for name, stats in summary['stages'].items():
+        pages_per_second = '-' if stats['pages_per_second'] is None else f"{stats['pages_per_second']:.1f}"
+        lines.append(
+            f"{name:<24}{stats['records']:>8}{stats['wall_p50']:>9.3f}{stats['wall_p90']:>9.3f}"
+            f"{stats['wall_p99']:>9.3f}{stats['wall_total']:>10.2f}{stats['wall_share']:>7.0%}"
+            f"{stats['cpu_total']:>10.2f}{stats['peak_rss_mb']:>9.0f}{pages_per_second:>10}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help=f"Output folder of a run, or its {TELEMETRY_FILE}")
+    parser.add_argument('--run', default='latest', help="Run to report (the 'run' field; default: the latest)")
+    parser.add_argument('--all-runs', action='store_true', help="Report every run in the log together")
+    parser.add_argument('--json', action='store_true', help="Print the summary as JSON")
+    args = parser.parse_args()
+    records = load_records(Path(args.path), None if args.all_runs else args.run)
+    if not records:
+        parser.error(f"No telemetry records for run {args.run}")
+    summary = summarize(records)
+    print(json.dumps(summary, indent=2) if args.json else format_report(summary))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The pipeline modules import their siblings by bare name (as when run from New_src)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
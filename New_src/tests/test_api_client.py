@@ -0,0 +1,136 @@
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from PyPDF2 import PdfWriter
+from New_src.api_client import PartitionApiClient, PartitionApiError, latency_percentiles
+from New_src.api_stub import StubPartitionServer, page_elements
+
+ELEMENTS = [{'type': 'Title', 'element_id': 'a', 'text': 'Item 1', 'metadata': {'page_number': 1}}]
+
+
+class TestPartitionApiClient(unittest.TestCase):
+
+    def client(self, server, **kwargs):
+        client = PartitionApiClient(server.url, backoff_base=0.01, **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def test_returns_elements_and_reuses_connection(self):
+        with StubPartitionServer(ELEMENTS) as server:
+            client = self.client(server)
+            for _ in range(5):
+                self.assertEqual(client.partition_bytes('a.pdf', b'%PDF-1.4'), ELEMENTS)
+        self.assertEqual(server.requests, 5)
+        self.assertEqual(server.connections, 1)
+        self.assertIn(b'name="strategy"', server.bodies[0])
+
+    def test_retries_5xx_and_429(self):
+        with StubPartitionServer(ELEMENTS, failures=[503, 429, 502]) as server:
+            client = self.client(server, retries=3)
+            self.assertEqual(client.partition_bytes('a.pdf', b'%PDF-1.4'), ELEMENTS)
+        self.assertEqual(server.requests, 4)
+        self.assertEqual(client.stats['api_retries'], 3)
+
+    def test_gives_up_after_retries(self):
+        with StubPartitionServer(ELEMENTS, failures=[500] * 3) as server:
+            client = self.client(server, retries=2)
+            with self.assertRaises(PartitionApiError):
+                client.partition_bytes('a.pdf', b'%PDF-1.4')
+        self.assertEqual(server.requests, 3)
+
+    def test_client_errors_are_not_retried(self):
+        with StubPartitionServer(ELEMENTS, failures=[422]) as server:
+            client = self.client(server, retries=3)
+            with self.assertRaises(PartitionApiError):
+                client.partition_bytes('a.pdf', b'%PDF-1.4')
+        self.assertEqual(server.requests, 1)
+
+    def test_backoff_is_jittered_and_capped(self):
+        client = PartitionApiClient(backoff_base=0.5, backoff_max=4.0)
+        self.addCleanup(client.close)
+        for attempt, ceiling in enumerate([0.5, 1.0, 2.0, 4.0, 4.0]):
+            delays = {client.backoff_delay(attempt) for _ in range(20)}
+            self.assertTrue(all(0 <= delay <= ceiling for delay in delays))
+            self.assertGreater(len(delays), 1)
+
+    def test_timeout_is_retried(self):
+        with StubPartitionServer(ELEMENTS, latency=0.5) as server:
+            client = self.client(server, retries=1, read_timeout=0.05)
+            with self.assertRaises(PartitionApiError):
+                client.partition_bytes('a.pdf', b'%PDF-1.4')
+        self.assertEqual(server.requests, 2)
+
+    def test_concurrency_is_bounded(self):
+        with StubPartitionServer(ELEMENTS, latency=0.05) as server:
+            client = self.client(server, max_concurrency=3)
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(executor.map(lambda i: client.partition_bytes(f'{i}.pdf', b'%PDF'), range(12)))
+            elapsed = time.perf_counter() - started
+        self.assertEqual(results, [ELEMENTS] * 12)
+        self.assertEqual(server.max_in_flight, 3)
+        self.assertLessEqual(server.connections, 3)
+        # 12 requests, 3 at a time, 50 ms each
+        self.assertGreaterEqual(elapsed, 0.2)
+
+
+class TestPartitionPages(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.pdf_path = Path(self.tmp_dir.name) / 'Acme_2023_Virginia.pdf'
+        writer = PdfWriter()
+        for _ in range(7):
+            writer.add_blank_page(612, 792)
+        with open(self.pdf_path, 'wb') as f:
+            writer.write(f)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_batches_reassemble_like_the_whole_file(self):
+        with StubPartitionServer(page_elements) as server:
+            with PartitionApiClient(server.url, max_concurrency=3) as client:
+                whole = client.partition_file(self.pdf_path)
+                split = client.partition_pages(self.pdf_path, 2)
+        self.assertEqual(server.requests, 1 + 4)
+        self.assertEqual([(e['type'], e['text'], e['metadata'].get('page_number')) for e in split],
+                         [(e['type'], e['text'], e['metadata'].get('page_number')) for e in whole])
+        ids = [e['element_id'] for e in split]
+        self.assertEqual(len(ids), len(set(ids)))
+        by_id = {e['element_id']: e for e in split}
+        for element in split:
+            parent_id = element['metadata'].get('parent_id')
+            if parent_id is not None:
+                self.assertEqual(by_id[parent_id]['metadata']['page_number'], element['metadata']['page_number'])
+
+    def test_page_range_is_numbered_as_in_the_document(self):
+        with StubPartitionServer(page_elements) as server:
+            with PartitionApiClient(server.url) as client:
+                whole = client.partition_file(self.pdf_path)
+                pages = client.partition_page_range(self.pdf_path, 3, 5)
+        self.assertEqual(server.requests, 2)
+        self.assertEqual([(e['type'], e['metadata'].get('page_number')) for e in pages],
+                         [(e['type'], e['metadata'].get('page_number')) for e in whole
+                          if 3 <= e['metadata']['page_number'] <= 5])
+
+    def test_batches_run_concurrently(self):
+        with StubPartitionServer(page_elements, latency=0.05) as server:
+            with PartitionApiClient(server.url, max_concurrency=4, split_pages=1) as client:
+                client.partition_file(self.pdf_path)
+                latencies = client.take_batch_seconds()
+        self.assertEqual(server.max_in_flight, 4)
+        self.assertEqual(len(latencies), 7)
+        self.assertGreaterEqual(latency_percentiles(latencies)['p50'], 0.05)
+
+    def test_failed_batch_fails_the_file(self):
+        with StubPartitionServer(page_elements, failures=[422]) as server:
+            with PartitionApiClient(server.url, max_concurrency=1, split_pages=3) as client:
+                with self.assertRaises(PartitionApiError):
+                    client.partition_file(self.pdf_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from unstructured.documents.elements import ElementMetadata, NarrativeText, Table, Title
+from New_src.Config import load_config
+from New_src.benchmarks import synthetic_corpus
+from New_src.checkpoints import CHECKPOINT_DIR, DocumentCheckpoint
+from New_src.pdf_processor import PDFProcessor
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.yaml'
+
+SETTINGS = {'partition_backend': 'local', 'hi_res_model_name': 'yolox'}
+
+
+def make_elements(page_number: int):
+    title = Title("Item 5", metadata=ElementMetadata(page_number=page_number))
+    text = NarrativeText("Initial fees", metadata=ElementMetadata(page_number=page_number, parent_id=title.id))
+    table = Table("Fee 100", metadata=ElementMetadata(page_number=page_number, text_as_html="<table></table>"))
+    return [title, text, table]
+
+
+class TestDocumentCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.pdf_path = self.root / 'Acme_2023_Virginia.pdf'
+        self.pdf_path.write_bytes(b'%PDF-1.4 original')
+        self.output_folder = self.root / 'output' / 'Acme_2023'
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_saved_range_is_resumed(self):
+        elements = make_elements(51)
+        DocumentCheckpoint(self.output_folder, self.pdf_path, SETTINGS).save(51, 100, elements)
+        checkpoint = DocumentCheckpoint(self.output_folder, self.pdf_path, SETTINGS)
+        resumed = checkpoint.load(51, 100)
+        self.assertEqual([(e.id, e.category, e.text, e.metadata.page_number, e.metadata.parent_id) for e in resumed],
+                         [(e.id, e.category, e.text, e.metadata.page_number, e.metadata.parent_id) for e in elements])
+        self.assertEqual(resumed[2].metadata.text_as_html, "<table></table>")
+        self.assertIsNone(checkpoint.load(1, 50))
+
+    def test_changed_source_or_settings_start_over(self):
+        DocumentCheckpoint(self.output_folder, self.pdf_path, SETTINGS).save(1, 50, make_elements(1))
+        other_settings = DocumentCheckpoint(self.output_folder, self.pdf_path, {**SETTINGS, 'hi_res_model_name': 'detectron2'})
+        self.assertIsNone(other_settings.load(1, 50))
+        self.pdf_path.write_bytes(b'%PDF-1.4 amended filing')
+        self.assertIsNone(DocumentCheckpoint(self.output_folder, self.pdf_path, SETTINGS).load(1, 50))
+
+    def test_discard_keeps_other_documents(self):
+        other_pdf = self.root / 'Acme_2023_Ohio.pdf'
+        other_pdf.write_bytes(b'%PDF-1.4 other')
+        checkpoint = DocumentCheckpoint(self.output_folder, self.pdf_path, SETTINGS)
+        other = DocumentCheckpoint(self.output_folder, other_pdf, SETTINGS)
+        checkpoint.save(1, 50, make_elements(1))
+        other.save(1, 50, make_elements(1))
+        checkpoint.discard()
+        self.assertIsNone(checkpoint.load(1, 50))
+        self.assertIsNotNone(other.load(1, 50))
+        other.discard()
+        self.assertFalse((self.output_folder / CHECKPOINT_DIR).exists())
+        self.assertEqual(os.listdir(self.output_folder), [])
+
+
+class TestStreamingCheckpoints(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.tmp_dir.name)
+        (root / 'input').mkdir()
+        synthetic_corpus(root / 'input', 1, 6)
+        self.pdf_path = root / 'input' / 'Entity0_2023_Virginia.pdf'
+        self.output_folder = root / 'output' / 'Entity0_2023'
+        self.config = {**load_config(str(CONFIG_PATH)), 'input_dir': root / 'input', 'output_dir': root / 'output',
+                       'partition_backend': 'stub', 'parallel_processing': False, 'deduplicate_inputs': False,
+                       'streaming_output': True, 'streaming_pages': 2, 'checkpoints': True, 'write_behind': False}
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def run_processor(self, fail_at_page: int = None) -> mock.Mock:
+        processor = PDFProcessor(self.config)
+        partition_dicts = processor.backend.partition_dicts
+
+        def partition(file_path, page_range=None):
+            if page_range and page_range[0] == fail_at_page:
+                raise RuntimeError("worker lost")
+            return partition_dicts(file_path, page_range)
+
+        processor.backend.partition_dicts = mock.Mock(side_effect=partition)
+        processor.process_pdfs()
+        return processor.backend.partition_dicts
+
+    def test_streamed_document_resumes_and_then_drops_its_checkpoint(self):
+        self.run_processor(fail_at_page=5)
+        self.assertTrue((self.output_folder / CHECKPOINT_DIR).exists())
+
+        partition_dicts = self.run_processor()
+        # The two windows saved before the failure are not partitioned again
+        self.assertEqual([call.args[1] for call in partition_dicts.call_args_list], [(5, 6)])
+        self.assertFalse((self.output_folder / CHECKPOINT_DIR).exists())
+        self.assertTrue((self.output_folder / 'elements_data.csv').exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
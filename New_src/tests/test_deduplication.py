@@ -0,0 +1,118 @@
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from New_src import pdf_processor
+from New_src.Config import load_config
+from New_src.benchmarks import synthetic_corpus
+from New_src.manifest import MANIFEST_FILENAME, hash_file
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.yaml'
+
+
+class TestInputDeduplication(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        root = self.root = Path(self.tmp_dir.name)
+        self.input_dir = root / 'input'
+        self.output_dir = root / 'output'
+        self.input_dir.mkdir()
+        synthetic_corpus(self.input_dir, 2, 3)
+        self.config = {**load_config(str(CONFIG_PATH)), 'input_dir': self.input_dir, 'output_dir': self.output_dir,
+                       'partition_backend': 'stub', 'parallel_processing': False, 'deduplicate_inputs': True}
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def run_processor(self) -> pdf_processor.PDFProcessor:
+        processor = pdf_processor.PDFProcessor(self.config)
+        processor.backend.partition_dicts = mock.Mock(wraps=processor.backend.partition_dicts)
+        processor.process_pdfs()
+        return processor
+
+    def test_duplicate_is_partitioned_once_and_its_outputs_are_linked(self):
+        original = self.input_dir / 'Entity0_2023_Virginia.pdf'
+        duplicate = self.input_dir / 'Copy_2023_Ohio.pdf'
+        shutil.copy(original, duplicate)
+
+        processor = self.run_processor()
+
+        partitioned = [call.args[0] for call in processor.backend.partition_dicts.call_args_list]
+        self.assertEqual(len(partitioned), 2)
+        canonical, = [f for f in partitioned if f in (original, duplicate)]
+        reused = duplicate if canonical == original else original
+
+        canonical_folder = self.output_dir / ('Entity0_2023' if canonical == original else 'Copy_2023')
+        reused_folder = self.output_dir / ('Copy_2023' if canonical == original else 'Entity0_2023')
+        artifacts = sorted(p.name for p in canonical_folder.iterdir() if p.suffix != '.pdf')
+        self.assertIn('elements_data.csv', artifacts)
+        for name in artifacts:
+            self.assertTrue((reused_folder / name).samefile(canonical_folder / name), name)
+        self.assertTrue((reused_folder / reused.name).exists())
+        self.assertEqual(processor.manifest.get(reused)['content_hash'], hash_file(original))
+        self.assertTrue(processor.manifest.is_processed(reused))
+
+    def test_reprocessing_a_former_duplicate_leaves_the_canonical_outputs_alone(self):
+        original = self.input_dir / 'Entity0_2023_Virginia.pdf'
+        duplicate = self.input_dir / 'Copy_2023_Ohio.pdf'
+        shutil.copy(original, duplicate)
+        processor = self.run_processor()
+        canonical, = [call.args[0] for call in processor.backend.partition_dicts.call_args_list
+                      if call.args[0] in (original, duplicate)]
+        reused = duplicate if canonical == original else original
+        canonical_folder = self.output_dir / ('Entity0_2023' if canonical == original else 'Copy_2023')
+        reused_folder = self.output_dir / ('Copy_2023' if canonical == original else 'Entity0_2023')
+        before = {p.name: p.read_bytes() for p in canonical_folder.iterdir()}
+
+        # The former duplicate's source is replaced by a different, longer document
+        (self.root / 'other').mkdir()
+        synthetic_corpus(self.root / 'other', 1, 7)
+        shutil.copy(self.root / 'other' / 'Entity0_2023_Virginia.pdf', reused)
+        processor = self.run_processor()
+
+        self.assertEqual([call.args[0] for call in processor.backend.partition_dicts.call_args_list], [reused])
+        self.assertEqual({p.name: p.read_bytes() for p in canonical_folder.iterdir()}, before)
+        self.assertTrue(processor.manifest.is_processed(canonical))
+        self.assertFalse((reused_folder / 'elements_data.csv').samefile(canonical_folder / 'elements_data.csv'))
+        self.assertNotEqual((reused_folder / 'elements_data.csv').read_bytes(), before['elements_data.csv'])
+
+    def test_hashes_are_kept_for_later_runs(self):
+        self.run_processor()
+        # A manifest rebuilt from the output tree has no hash for the inputs
+        (self.output_dir / MANIFEST_FILENAME).unlink()
+        shutil.copy(self.input_dir / 'Entity0_2023_Virginia.pdf', self.input_dir / 'Copy_2023_Ohio.pdf')
+
+        with mock.patch.object(pdf_processor, 'hash_file', wraps=hash_file) as hashed:
+            self.run_processor()
+        self.assertEqual(hashed.call_count, 3)
+
+        manifest_module = sys.modules[pdf_processor.ProcessedManifest.__module__]
+        with mock.patch.object(pdf_processor, 'hash_file', wraps=hash_file) as hashed, \
+                mock.patch.object(manifest_module, 'hash_file', wraps=hash_file) as rehashed:
+            processor = self.run_processor()
+        hashed.assert_not_called()
+        rehashed.assert_not_called()
+        processor.backend.partition_dicts.assert_not_called()
+
+    def test_saving_estimate_uses_only_files_partitioned_in_this_run(self):
+        self.run_processor()
+        shutil.copy(self.input_dir / 'Entity0_2023_Virginia.pdf', self.input_dir / 'Copy_2023_Ohio.pdf')
+        (self.root / 'more').mkdir()
+        synthetic_corpus(self.root / 'more', 3, 1)
+        new_file = self.input_dir / 'Entity2_2023_Virginia.pdf'
+        shutil.move(self.root / 'more' / new_file.name, new_file)
+
+        with mock.patch.object(pdf_processor.PDFProcessor, '_dedup_stats', autospec=True,
+                               return_value={}) as dedup_stats:
+            self.run_processor()
+        _, duplicate_groups, processed_files, _ = dedup_stats.call_args.args
+        self.assertEqual(processed_files, [new_file])
+        self.assertEqual([duplicates for _, _, duplicates in duplicate_groups],
+                         [[self.input_dir / 'Copy_2023_Ohio.pdf']])
+
+
+if __name__ == '__main__':
+    unittest.main()
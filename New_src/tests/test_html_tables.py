@@ -0,0 +1,122 @@
+import random
+import unittest
+from io import StringIO
+from unittest import mock
+import pandas as pd
+from New_src import html_tables
+from New_src.html_tables import UnsupportedTable, fast_read_html_table, read_html_tables
+
+
+def random_table_html(rng: random.Random) -> str:
+    """Table HTML in the shapes unstructured emits, with spans, entities and numbers mixed in."""
+    def cell(tag):
+        attrs = ''
+        if rng.random() < 0.15:
+            attrs += f' colspan="{rng.randint(2, 3)}"'
+        if rng.random() < 0.1:
+            attrs += f' rowspan="{rng.randint(2, 3)}"'
+        text = rng.choice([
+            '', 'Virginia', 'Initial &amp; franchise', 'A &lt;b&gt;', '&#36;1,000', f"{rng.randint(0, 99999):,}",
+            str(rng.randint(0, 500)), f"{rng.uniform(0, 100):.2f}", '  spaced\n text ', 'N/A',
+        ])
+        return f'<{tag}{attrs}>{text}</{tag}>'
+
+    def rows(count, width, tag='td'):
+        return ''.join('<tr>' + ''.join(cell(tag) for _ in range(width)) + '</tr>' for _ in range(count))
+
+    width = rng.randint(1, 5)
+    parts = ['<table>']
+    head = rng.random()
+    if head < 0.3:
+        parts.append('<thead>' + ''.join(cell('th') for _ in range(width)) + '</thead>')
+    elif head < 0.5:
+        parts.append('<thead>' + rows(rng.randint(1, 2), width, 'th') + '</thead>')
+    elif head < 0.6:
+        parts.append(rows(1, width, 'th'))
+    if rng.random() < 0.5:
+        parts.append('<tbody>' + rows(rng.randint(1, 6), width) + '</tbody>')
+    else:
+        parts.append(rows(rng.randint(1, 6), width))
+    if rng.random() < 0.1:
+        parts.append('<tfoot>' + rows(1, width) + '</tfoot>')
+    parts.append('</table>')
+    return ''.join(parts)
+
+
+class TestFastReadHtmlTable(unittest.TestCase):
+
+    def assertSameAsReadHtml(self, table_html):
+        expected = pd.read_html(StringIO(table_html))[0]
+        actual = fast_read_html_table(table_html)
+        pd.testing.assert_frame_equal(actual, expected)
+        self.assertEqual(actual.to_csv(index=False), expected.to_csv(index=False))
+
+    def test_th_header_and_thousands_separators(self):
+        self.assertSameAsReadHtml("<table><tr><th>State</th><th>Outlets</th><th>Fee</th></tr>"
+                                  "<tr><td>Virginia</td><td>1,204</td><td>45,000.50</td></tr>"
+                                  "<tr><td>Ohio</td><td>87</td><td>12,500.00</td></tr></table>")
+
+    def test_thead_without_tr(self):
+        table_html = ("<table><thead><th>Fee</th><th>Amount</th></thead>"
+                      "<tbody><tr><td>Initial</td><td>1,000</td></tr></tbody></table>")
+        self.assertSameAsReadHtml(table_html)
+        self.assertEqual(list(fast_read_html_table(table_html).columns), ['Fee', 'Amount'])
+
+    def test_colspan_and_rowspan(self):
+        self.assertSameAsReadHtml('<table><thead><tr><th colspan="2">Outlets</th><th>Year</th></tr></thead>'
+                                  '<tbody><tr><td rowspan="2">Virginia</td><td>12</td><td>2022</td></tr>'
+                                  '<tr><td>14</td><td>2023</td></tr>'
+                                  '<tr><td colspan="3">Total 26</td></tr></tbody></table>')
+
+    def test_entities(self):
+        self.assertSameAsReadHtml("<table><tr><td>Initial &amp; franchise</td><td>&lt;1%&gt;</td></tr>"
+                                  "<tr><td>&#36;1,000&nbsp;due</td><td>&quot;Fee&quot; &#x41;</td></tr></table>")
+
+    def test_unsupported_html_is_rejected(self):
+        for table_html in (
+            '<table><tr><td style="width:10px">1</td></tr></table>',
+            '<table><tr><td><b>bold</b></td></tr></table>',
+            '<table><tr><td>&copy; 2023</td></tr></table>',
+            '<table><tr><td></td></tr></table>',
+            '<table><tr><td rowspan="3">1</td></tr></table>',
+            '<table><tr><td>1</td></tr></table><table><tr><td>2</td></tr></table>',
+        ):
+            with self.subTest(table_html=table_html), self.assertRaises(UnsupportedTable):
+                fast_read_html_table(table_html)
+
+    def test_random_tables_match_read_html(self):
+        rng = random.Random(0)
+        accepted = 0
+        for index in range(500):
+            table_html = random_table_html(rng)
+            try:
+                fast_read_html_table(table_html)
+            except UnsupportedTable:
+                continue
+            accepted += 1
+            try:
+                self.assertSameAsReadHtml(table_html)
+            except AssertionError as e:
+                self.fail(f"Table {index} differs from read_html: {table_html}\n{e}")
+        # Most take the fast path; the rest (mostly rowspans past a section's end) fall back
+        self.assertGreater(accepted, 250)
+
+
+class TestReadHtmlTables(unittest.TestCase):
+
+    def test_fast_path_does_not_call_read_html(self):
+        with mock.patch.object(html_tables.pd, 'read_html', wraps=pd.read_html) as read_html:
+            tables = read_html_tables("<table><tr><th>A</th></tr><tr><td>1</td></tr></table>")
+        read_html.assert_not_called()
+        self.assertEqual(tables[0]['A'].tolist(), [1])
+
+    def test_unsupported_table_falls_back_to_read_html(self):
+        table_html = '<table><tr><th>A</th></tr><tr><td><span>1,5</span></td></tr></table>'
+        with mock.patch.object(html_tables.pd, 'read_html', wraps=pd.read_html) as read_html:
+            tables = read_html_tables(table_html)
+        read_html.assert_called_once()
+        pd.testing.assert_frame_equal(tables[0], pd.read_html(StringIO(table_html))[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
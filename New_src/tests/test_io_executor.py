@@ -0,0 +1,148 @@
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+from New_src import file_handler, io_executor
+from New_src.io_executor import (DEFAULT_IO_QUEUE_DEPTH, DEFAULT_IO_THREADS, OrderedWriter, configure_io_executor,
+                                 get_io_stats, submit_io, wait_io)
+from New_src.tests.test_output_sinks import make_document
+
+
+class SlowFile:
+    """A file object whose writes take a moment, recording what reaches it."""
+
+    def __init__(self, delay: float = 0.001, fail_on: str = None):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.chunks = []
+        self.closed = False
+
+    def write(self, data):
+        time.sleep(self.delay)
+        if data == self.fail_on:
+            raise OSError("disk full")
+        self.chunks.append(data)
+
+    def close(self):
+        self.closed = True
+
+
+class IoExecutorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        configure_io_executor(threads=2, queue_depth=3)
+
+    def tearDown(self):
+        configure_io_executor(DEFAULT_IO_THREADS, DEFAULT_IO_QUEUE_DEPTH)
+
+
+class TestSubmitIo(IoExecutorTestCase):
+
+    def test_submit_blocks_once_queue_depth_tasks_are_pending(self):
+        release = threading.Event()
+        futures = [submit_io(release.wait) for _ in range(3)]
+        wait_before = get_io_stats()['io_wait_seconds']
+
+        submitted = threading.Event()
+        submitter = threading.Thread(target=lambda: (futures.append(submit_io(lambda: 'late')), submitted.set()))
+        submitter.start()
+        self.assertFalse(submitted.wait(0.2))
+
+        release.set()
+        self.assertTrue(submitted.wait(5))
+        submitter.join()
+        self.assertEqual(wait_io(futures), [True, True, True, 'late'])
+        self.assertGreater(get_io_stats()['io_wait_seconds'] - wait_before, 0.1)
+
+    def test_slot_is_released_when_a_task_fails(self):
+        for _ in range(10):
+            future = submit_io(int, 'not a number')
+            with self.assertRaises(ValueError):
+                future.result(timeout=5)
+        self.assertEqual(submit_io(int, '7').result(timeout=5), 7)
+
+    def test_wait_io_waits_for_every_task_before_raising(self):
+        finished = []
+
+        def slow():
+            time.sleep(0.1)
+            finished.append(True)
+
+        futures = [submit_io(int, 'bad'), submit_io(slow)]
+        with self.assertRaises(ValueError):
+            wait_io(futures)
+        self.assertEqual(finished, [True])
+
+    def test_executor_is_rebuilt_after_fork(self):
+        executor, _ = io_executor._get_executor()
+        with mock.patch.object(io_executor.os, 'getpid', return_value=-1):
+            child_executor, _ = io_executor._get_executor()
+        child_executor.shutdown()
+        self.assertIsNot(child_executor, executor)
+
+
+class TestOrderedWriter(IoExecutorTestCase):
+
+    def test_chunks_are_written_in_order(self):
+        file = SlowFile()
+        writer = OrderedWriter(file)
+        for index in range(50):
+            writer.write(f"{index},")
+        writer.close()
+        self.assertEqual(''.join(file.chunks), ''.join(f"{index}," for index in range(50)))
+        self.assertTrue(file.closed)
+
+    def test_write_blocks_while_queue_depth_chunks_are_waiting(self):
+        file = SlowFile(delay=0.05)
+        writer = OrderedWriter(file)
+        started = time.perf_counter()
+        for index in range(6):
+            writer.write(str(index))
+        # At most 3 chunks wait; the rest of the writes waited for the file
+        self.assertGreaterEqual(time.perf_counter() - started, 0.1)
+        writer.flush()
+        self.assertEqual(file.chunks, [str(index) for index in range(6)])
+        writer.close()
+
+    def test_failed_write_is_raised_to_the_writer(self):
+        file = SlowFile(fail_on='2')
+        writer = OrderedWriter(file)
+        with self.assertRaisesRegex(OSError, "disk full"):
+            for index in range(100):
+                writer.write(str(index))
+            writer.flush()
+        with self.assertRaisesRegex(OSError, "disk full"):
+            writer.close()
+        self.assertEqual(file.chunks, ['0', '1'])
+        self.assertTrue(file.closed)
+
+    def test_abort_drops_pending_chunks(self):
+        file = SlowFile(delay=0.05)
+        writer = OrderedWriter(file)
+        for index in range(3):
+            writer.write(str(index))
+        writer.abort()
+        self.assertLess(len(file.chunks), 3)
+        self.assertTrue(file.closed)
+
+
+class TestTableSink(IoExecutorTestCase):
+
+    def test_tables_are_written_on_the_io_threads(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_folder = Path(tmp_dir)
+            with mock.patch.object(file_handler, 'submit_io', wraps=file_handler.submit_io) as submit:
+                writer = file_handler.ElementWriter(output_folder, sinks=['tables'])
+                writer.write(make_document(3))
+                artifacts = writer.close()
+
+            self.assertEqual(submit.call_count, 3)
+            self.assertEqual(artifacts, [f"table_title{page}_page{page}_part1.csv" for page in (1, 2, 3)])
+            self.assertEqual((output_folder / artifacts[0]).read_text().splitlines()[1],
+                             'Initial & franchise,1000,title1,1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import importlib
+import sys
+import types
+import unittest
+from unittest import mock
+
+
+def load_layout_models(get_model=None, load_agent=None):
+    """Import layout_models afresh against a stand-in unstructured_inference, or without one."""
+    if get_model is None:
+        modules = {'onnxruntime': None, 'unstructured_inference': None}
+    else:
+        onnxruntime = types.ModuleType('onnxruntime')
+        onnxruntime.InferenceSession = mock.Mock(side_effect=AssertionError("session built outside get_model"))
+        onnxruntime.get_available_providers = lambda: ['CPUExecutionProvider']
+        base = types.ModuleType('unstructured_inference.models.base')
+        base.get_model = get_model
+        tables = types.ModuleType('unstructured_inference.models.tables')
+        tables.load_agent = load_agent or mock.Mock()
+        models = types.ModuleType('unstructured_inference.models')
+        models.base, models.tables = base, tables
+        modules = {'onnxruntime': onnxruntime, 'unstructured_inference': types.ModuleType('unstructured_inference'),
+                   'unstructured_inference.models': models, 'unstructured_inference.models.base': base,
+                   'unstructured_inference.models.tables': tables}
+    with mock.patch.dict(sys.modules, modules):
+        sys.modules.pop('layout_models', None)
+        module = importlib.import_module('layout_models')
+    sys.modules.pop('layout_models', None)
+    return module
+
+
+class TestLayoutModels(unittest.TestCase):
+
+    def test_model_is_loaded_once_through_unstructured_inference(self):
+        model = types.SimpleNamespace(model='session', model_path='/models/yolox.onnx')
+        get_model = mock.Mock(return_value=model)
+        layout_models = load_layout_models(get_model)
+
+        self.assertIs(layout_models.get_detection_model('yolox'), model)
+        self.assertIs(layout_models.get_detection_model('yolox'), model)
+        get_model.assert_called_once_with('yolox')
+        self.assertEqual(model.model, 'session')
+        self.assertEqual(layout_models.get_model_stats()['model_loads'], 1)
+
+    def test_initializer_warms_each_model_once(self):
+        get_model, load_agent = mock.Mock(), mock.Mock()
+        layout_models = load_layout_models(get_model, load_agent)
+        layout_models.initialize_worker('yolox')
+        layout_models.initialize_worker('yolox')
+        get_model.assert_called_once_with('yolox')
+        load_agent.assert_called_once_with()
+        self.assertEqual(layout_models.get_model_stats()['model_loads'], 2)
+
+    def test_failed_warm_up_is_left_to_partition_pdf(self):
+        layout_models = load_layout_models(mock.Mock(side_effect=OSError("model download failed")))
+        with self.assertLogs('pdf_processor', 'WARNING'):
+            layout_models.initialize_worker('yolox')
+        self.assertEqual(layout_models.get_model_stats()['model_loads'], 0)
+
+    def test_importable_without_the_inference_stack(self):
+        layout_models = load_layout_models()
+        layout_models.record_document()
+        self.assertEqual(layout_models.get_model_stats()['documents'], 1)
+        with self.assertRaises(ImportError):
+            layout_models.get_detection_model('yolox')
+
+    def test_other_backends_do_not_load_the_layout_models(self):
+        with mock.patch.dict(sys.modules, {'onnxruntime': None, 'unstructured_inference': None}):
+            sys.modules.pop('layout_models', None)
+            from partition_backends import create_backend
+            backend = create_backend({'partition_backend': 'stub'})
+            backend.initialize_worker()
+            self.assertNotIn('layout_models', sys.modules)
+
+
+if __name__ == '__main__':
+    unittest.main()
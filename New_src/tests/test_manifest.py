@@ -0,0 +1,117 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from contextlib import closing
+from pathlib import Path
+from unittest import mock
+from New_src import manifest as manifest_module
+from New_src.manifest import MANIFEST_FILENAME, ProcessedManifest, hash_file
+
+
+class TestProcessedManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.input_dir = self.root / 'input'
+        self.output_dir = self.root / 'output'
+        self.input_dir.mkdir()
+        self.pdf_path = self.input_dir / 'Acme_2023_Virginia.pdf'
+        self.pdf_path.write_bytes(b'%PDF-1.4 sample content')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_record_and_lookup(self):
+        manifest = ProcessedManifest(self.output_dir)
+        self.assertFalse(manifest.is_processed(self.pdf_path))
+
+        output_folder = self.output_dir / 'Acme_2023'
+        manifest.record(self.pdf_path, output_folder, ['elements_data.csv', self.pdf_path.name])
+
+        self.assertTrue(manifest.is_processed(self.pdf_path))
+        entry = manifest.get(self.pdf_path)
+        self.assertEqual(entry['output_folder'], str(output_folder))
+        self.assertEqual(entry['content_hash'], hash_file(self.pdf_path))
+        self.assertIn('elements_data.csv', entry['artifacts'])
+
+    def test_modified_source_is_reprocessed(self):
+        manifest = ProcessedManifest(self.output_dir)
+        manifest.record(self.pdf_path, self.output_dir / 'Acme_2023', [])
+
+        self.pdf_path.write_bytes(b'%PDF-1.4 a longer revised filing')
+
+        self.assertFalse(manifest.is_processed(self.pdf_path))
+
+    def test_rebuild_from_existing_output_tree(self):
+        output_folder = self.output_dir / 'Acme_2023'
+        output_folder.mkdir(parents=True)
+        (output_folder / self.pdf_path.name).write_bytes(self.pdf_path.read_bytes())
+        (output_folder / 'elements_data.csv').write_text('Page Number\n')
+
+        manifest = ProcessedManifest(self.output_dir)
+
+        self.assertEqual(len(manifest), 1)
+        self.assertTrue(manifest.is_processed(self.pdf_path))
+
+    def test_name_and_size_alone_only_match_rebuilt_rows(self):
+        manifest = ProcessedManifest(self.output_dir)
+        other_source = self.root / 'other' / self.pdf_path.name
+        other_source.parent.mkdir()
+        other_source.write_bytes(b'%PDF-1.4 sample CONTENT')  # same name and size, different bytes
+        manifest.record(other_source, self.output_dir / 'Acme_2023', [])
+
+        self.assertFalse(manifest.is_processed(self.pdf_path))
+
+    def test_touched_source_is_matched_by_content_hash(self):
+        manifest = ProcessedManifest(self.output_dir)
+        manifest.record(self.pdf_path, self.output_dir / 'Acme_2023', [])
+        stat = self.pdf_path.stat()
+        os.utime(self.pdf_path, (stat.st_atime, stat.st_mtime + 60))
+
+        self.assertTrue(manifest.is_processed(self.pdf_path))
+        # The new mtime is stored, so the next run is an exact match again
+        self.assertEqual(manifest.get(self.pdf_path)['mtime'], self.pdf_path.stat().st_mtime)
+
+        self.pdf_path.write_bytes(b'%PDF-1.4 sample CONTENT')
+        self.assertFalse(manifest.is_processed(self.pdf_path))
+
+    def test_moved_source_is_hashed_once(self):
+        manifest = ProcessedManifest(self.output_dir)
+        manifest.record(self.pdf_path, self.output_dir / 'Acme_2023', ['elements_data.csv'])
+        moved = self.root / 'archive' / self.pdf_path.name
+        moved.parent.mkdir()
+        self.pdf_path.rename(moved)
+
+        with mock.patch.object(manifest_module, 'hash_file', wraps=hash_file) as hashed:
+            self.assertTrue(manifest.is_processed(moved))
+            self.assertTrue(manifest.is_processed(moved))
+        hashed.assert_called_once_with(moved)
+        entry = manifest.get(moved)
+        self.assertEqual((entry['output_folder'], entry['artifacts']), (str(self.output_dir / 'Acme_2023'),
+                                                                        ['elements_data.csv']))
+        self.assertEqual(entry['mtime'], moved.stat().st_mtime)
+
+    def test_manifest_without_rebuilt_flag_is_migrated(self):
+        self.output_dir.mkdir()
+        with closing(sqlite3.connect(str(self.output_dir / MANIFEST_FILENAME))) as conn, conn:
+            conn.execute("CREATE TABLE processed (source_path TEXT PRIMARY KEY, filename TEXT NOT NULL, "
+                         "size INTEGER NOT NULL, mtime REAL NOT NULL, content_hash TEXT, "
+                         "output_folder TEXT NOT NULL, artifacts TEXT NOT NULL, processed_at REAL NOT NULL)")
+            conn.execute("INSERT INTO processed VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         ('/output/Acme_2023/Acme_2023_Virginia.pdf', self.pdf_path.name,
+                          self.pdf_path.stat().st_size, 0.0, None, '/output/Acme_2023', '[]', 0.0))
+            conn.execute("INSERT INTO processed VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         ('/input/Beta_2023_Ohio.pdf', 'Beta_2023_Ohio.pdf', 10, 0.0, 'abc', '/output/Beta_2023',
+                          '[]', 0.0))
+
+        manifest = ProcessedManifest(self.output_dir)
+
+        self.assertEqual(manifest.get(Path('/output/Acme_2023/Acme_2023_Virginia.pdf'))['rebuilt'], 1)
+        self.assertEqual(manifest.get(Path('/input/Beta_2023_Ohio.pdf'))['rebuilt'], 0)
+        self.assertTrue(manifest.is_processed(self.pdf_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+from PIL import Image
+from unstructured.partition.utils import constants
+from unstructured.partition.utils.ocr_models.ocr_interface import OCRAgent
+from New_src import ocr_engine
+from New_src.ocr_engine import OCR_AGENT_QNAME, OCRAgentTesserocr, get_ocr_pool, get_ocr_stats, install_ocr_engine
+
+
+class FakeTessBaseAPI:
+    """Stands in for tesserocr.PyTessBaseAPI, recording what each handle was asked to do."""
+
+    def __init__(self, lang: str = 'eng', path: str = None):
+        self.lang = lang
+        self.path = path
+        self.calls = []
+
+    def SetImage(self, image):
+        self.calls.append('SetImage')
+
+    def SetVariable(self, name, value):
+        self.calls.append(f"{name}={value}")
+
+    def GetUTF8Text(self):
+        return f"text ({self.lang})"
+
+    def GetHOCRText(self, page):
+        return "<div class='ocr_page'></div>"
+
+    def Clear(self):
+        self.calls.append('Clear')
+
+
+class OcrEngineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tesserocr = mock.Mock()
+        self.tesserocr.PyTessBaseAPI = mock.Mock(side_effect=FakeTessBaseAPI)
+        whitelist = list(constants.OCR_AGENT_MODULES_WHITELIST)
+        # unstructured holds on to the list object itself, so it is restored in place
+        self.addCleanup(constants.OCR_AGENT_MODULES_WHITELIST.__setitem__, slice(None), whitelist)
+        for patcher in (mock.patch.object(ocr_engine, 'tesserocr', self.tesserocr),
+                        mock.patch.object(ocr_engine, '_pool', None),
+                        mock.patch.object(ocr_engine, '_pool_settings', (1, None)),
+                        mock.patch.dict(os.environ)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        os.environ.pop('OCR_AGENT', None)
+        OCRAgent.get_instance.cache_clear()
+        self.addCleanup(OCRAgent.get_instance.cache_clear)
+
+
+class TestInstallOcrEngine(OcrEngineTestCase):
+
+    def test_tesserocr_agent_is_selected(self):
+        install_ocr_engine('tesserocr')
+        install_ocr_engine('tesserocr')
+
+        module_name = OCR_AGENT_QNAME.rsplit('.', 1)[0]
+        self.assertEqual(os.environ['OCR_AGENT'], OCR_AGENT_QNAME)
+        self.assertEqual(constants.OCR_AGENT_MODULES_WHITELIST.count(module_name), 1)
+        agent = OCRAgent.get_agent('eng')
+        self.assertEqual(type(agent).__name__, 'OCRAgentTesserocr')
+        self.assertEqual(type(agent).__module__, module_name)
+
+    def test_tesseract_keeps_the_stock_agent(self):
+        install_ocr_engine('tesseract')
+        self.assertNotIn('OCR_AGENT', os.environ)
+        self.assertNotIn(OCR_AGENT_QNAME.rsplit('.', 1)[0], constants.OCR_AGENT_MODULES_WHITELIST)
+        self.assertEqual(type(OCRAgent.get_agent('eng')).__name__, 'OCRAgentTesseract')
+
+    def test_unknown_engine_or_missing_package_is_an_error(self):
+        with self.assertRaisesRegex(ValueError, "Unknown OCR engine"):
+            install_ocr_engine('paddle')
+        with mock.patch.object(ocr_engine, 'tesserocr', None), self.assertRaises(ImportError):
+            install_ocr_engine('tesserocr')
+        self.assertNotIn('OCR_AGENT', os.environ)
+
+
+class TestTesserocrPool(OcrEngineTestCase):
+
+    def test_engines_are_reused_per_language(self):
+        install_ocr_engine('tesserocr', pool_size=1, tessdata_dir='/opt/tessdata')
+        loaded_before = get_ocr_stats()['ocr_engines_loaded']
+        image = Image.new('RGB', (40, 20), 'white')
+
+        self.assertEqual(OCRAgentTesserocr('eng').get_text_from_image(image), "text (eng)")
+        self.assertEqual(OCRAgentTesserocr('eng').get_text_from_image(image), "text (eng)")
+        self.assertEqual(OCRAgentTesserocr('deu').get_text_from_image(image), "text (deu)")
+
+        self.assertEqual(self.tesserocr.PyTessBaseAPI.call_args_list,
+                         [mock.call(lang='eng', path='/opt/tessdata/'), mock.call(lang='deu', path='/opt/tessdata/')])
+        self.assertEqual(get_ocr_stats()['ocr_engines_loaded'] - loaded_before, 2)
+        with get_ocr_pool().engine('eng') as api:
+            # Each use ends with Clear() so no image or variable leaks into the next call
+            self.assertEqual(api.calls, ['SetImage', 'Clear', 'SetImage', 'Clear'])
+
+    def test_callers_beyond_pool_size_wait_for_an_engine(self):
+        install_ocr_engine('tesserocr', pool_size=2)
+        lock = threading.Lock()
+        in_use = set()
+        peak = []
+
+        def ocr():
+            with get_ocr_pool().engine('eng') as api:
+                with lock:
+                    in_use.add(id(api))
+                    peak.append(len(in_use))
+                time.sleep(0.05)
+                with lock:
+                    in_use.discard(id(api))
+
+        threads = [threading.Thread(target=ocr) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.tesserocr.PyTessBaseAPI.call_count, 2)
+        self.assertEqual(max(peak), 2)
+
+    def test_install_and_fork_start_a_new_pool(self):
+        install_ocr_engine('tesserocr')
+        pool = get_ocr_pool()
+        self.assertIs(get_ocr_pool(), pool)
+        with mock.patch.object(ocr_engine.os, 'getpid', return_value=-1):
+            self.assertIsNot(get_ocr_pool(), pool)
+        install_ocr_engine('tesserocr', pool_size=3)
+        self.assertEqual(get_ocr_pool().size, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
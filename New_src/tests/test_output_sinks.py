@@ -0,0 +1,335 @@
+import filecmp
+import json
+import random
+import re
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+import pyarrow.parquet as pq
+from unstructured.documents.coordinates import PixelSpace
+from unstructured.documents.elements import (CoordinatesMetadata, ElementMetadata, NarrativeText, PageBreak, Table,
+                                             Title)
+from unstructured.staging.base import _fix_metadata_field_precision, elements_from_dicts, elements_to_dicts
+from New_src import pdf_processor
+from New_src.Config import load_config
+from New_src.benchmarks import synthetic_corpus
+from New_src.element_processor import iter_pages
+from New_src.file_handler import DEFAULT_OUTPUT_SINKS, ELEMENTS_DATASET_DIR, ElementWriter, SinkOptions
+from New_src.tests.baseline_writers import process_elements, save_metadata_html, write_baseline_outputs
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.yaml'
+TABLE_HTML = ("<table><thead><tr><th>Fee</th><th>Amount</th></tr></thead>"
+              "<tbody><tr><td>Initial &amp; franchise</td><td>1,000</td></tr></tbody></table>")
+
+
+def make_document(pages: int = 3):
+    """Elements of a small filing: a title, text and a table on each page, closed by a page break."""
+    elements = []
+    system = PixelSpace(1700, 2200)
+    for page_number in range(1, pages + 1):
+        def metadata(y, **kwargs):
+            return ElementMetadata(page_number=page_number, filename='Acme_2023_Virginia.pdf',
+                                   coordinates=CoordinatesMetadata(((100.0, y), (100.0, y + 40.5), (900.0, y + 40.5),
+                                                                    (900.0, y)), system),
+                                   detection_class_prob=0.91, **kwargs)
+
+        title = Title(f"Item {page_number + 4}", element_id=f"title{page_number}", metadata=metadata(100.0))
+        text = NarrativeText(f"Fees <due> on page {page_number}", element_id=f"text{page_number}",
+                             metadata=metadata(200.0, parent_id=title.id))
+        table = Table("Fee Amount Initial & franchise 1,000", element_id=f"table{page_number}",
+                      metadata=metadata(300.0, parent_id=title.id, text_as_html=TABLE_HTML))
+        elements += [title, text, table, PageBreak(text="", element_id=f"break{page_number}")]
+    return elements
+
+
+def without_addresses(path: Path) -> str:
+    # The Coordinates column of elements_data.csv holds the coordinate system's repr, which includes its address
+    return re.sub(r' at 0x[0-9a-f]+', '', path.read_text())
+
+
+class TestBaselineOutputs(unittest.TestCase):
+    """The default sinks write the same files as the writers they replaced (tests/baseline_writers.py)."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.baseline_folder = Path(self.tmp_dir.name) / 'baseline'
+        self.sinks_folder = Path(self.tmp_dir.name) / 'sinks'
+        self.baseline_folder.mkdir()
+        self.sinks_folder.mkdir()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, elements, batches, sinks=None, options=SinkOptions()):
+        write_baseline_outputs(elements, self.baseline_folder)
+        writer = ElementWriter(self.sinks_folder, sinks=sinks, options=options)
+        for batch in batches:
+            writer.write(batch)
+        artifacts = writer.close()
+
+        names = sorted(p.name for p in self.baseline_folder.iterdir())
+        if sinks is None:
+            self.assertEqual(sorted(artifacts), names)
+        self.assertIn('table_title2_page2_part1.csv', names)
+        return names
+
+    def assertSameFiles(self, names):
+        names = [name for name in names if name != 'elements_data.csv']
+        match, mismatch, errors = filecmp.cmpfiles(self.baseline_folder, self.sinks_folder, names, shallow=False)
+        self.assertEqual((mismatch, errors), ([], []))
+        self.assertEqual(without_addresses(self.sinks_folder / 'elements_data.csv'),
+                         without_addresses(self.baseline_folder / 'elements_data.csv'))
+
+    def test_whole_document(self):
+        elements = make_document(3)
+        for element in elements:
+            element.metadata.coordinates = None
+        self.assertSameFiles(self.write(elements, [elements]))
+
+    def test_page_batches(self):
+        elements = make_document(3)
+        for element in elements:
+            element.metadata.coordinates = None
+        batches = list(iter_pages(elements))
+        # Each page's closing PageBreak stays in its batch
+        self.assertEqual([[element.id for element in batch] for batch in batches],
+                         [[f"title{page}", f"text{page}", f"table{page}", f"break{page}"] for page in (1, 2, 3)])
+        self.assertSameFiles(self.write(elements, batches))
+
+    def test_compact_streamed_json_parses_to_the_same_data(self):
+        elements = make_document(3)
+        for element in elements:
+            element.metadata.coordinates = None
+        self.write(elements, list(iter_pages(elements)), sinks=DEFAULT_OUTPUT_SINKS + ['metadata_jsonl'],
+                   options=SinkOptions(compact_json=True))
+
+        for name in ('all_elements_metadata.json', 'raw_elements.json'):
+            with self.subTest(name=name):
+                written = (self.sinks_folder / name).read_text()
+                self.assertNotIn('\n', written)
+                self.assertEqual(json.loads(written), json.loads((self.baseline_folder / name).read_text()))
+        lines = (self.sinks_folder / 'all_elements_metadata.jsonl').read_text().splitlines()
+        self.assertEqual([json.loads(line) for line in lines],
+                         json.loads((self.baseline_folder / 'all_elements_metadata.json').read_text()))
+
+    def test_coordinates_are_written_to_the_metadata_json(self):
+        # The baseline read a system.name attribute that coordinate systems lack, so it wrote
+        # null coordinates for every element; that is the one intended difference
+        elements = make_document(2)
+        names = self.write(elements, [elements])
+        self.assertSameFiles([name for name in names if name != 'all_elements_metadata.json'])
+
+        baseline = json.loads((self.baseline_folder / 'all_elements_metadata.json').read_text())
+        written = json.loads((self.sinks_folder / 'all_elements_metadata.json').read_text())
+        self.assertEqual(written[0]['coordinates']['system'],
+                         {'name': 'PixelSpace', 'orientation': 'SCREEN', 'width': 1700, 'height': 2200})
+        for elem in written:
+            for key in ('coordinates', 'relative_coordinates'):
+                if key in elem:
+                    elem[key] = None
+        self.assertEqual(written, baseline)
+
+
+class TestMetadataHtmlSink(unittest.TestCase):
+
+    def element_dicts(self, seed):
+        """A page-break-heavy document whose elements sometimes arrive after a later page's."""
+        rng = random.Random(seed)
+        categories = ['Title', 'NarrativeText', 'ListItem', 'Table', 'Header', 'Image', 'PageBreak']
+        elements = []
+        for index in range(300):
+            category = rng.choice(categories)
+            metadata = {}
+            if category != 'PageBreak' and rng.random() > 0.02:
+                metadata['page_number'] = index // 10 + 1 - (rng.randint(1, 3) if rng.random() < 0.1 else 0)
+            if category == 'Table':
+                metadata['parent_id'] = f"title{index}"
+                if rng.random() < 0.8:
+                    metadata['text_as_html'] = TABLE_HTML
+            elements.append({'type': category, 'element_id': f"id{index}", 'metadata': metadata,
+                             'text': '' if category == 'PageBreak' else f"Item {index} & <more> \"text\""})
+        return elements
+
+    def test_same_bytes_as_the_baseline_writer(self):
+        for seed in range(5):
+            with self.subTest(seed=seed), tempfile.TemporaryDirectory() as tmp_dir:
+                element_dicts = self.element_dicts(seed)
+                baseline_folder, sink_folder = Path(tmp_dir) / 'baseline', Path(tmp_dir) / 'sink'
+                baseline_folder.mkdir()
+                sink_folder.mkdir()
+                _, _, metadata = process_elements(elements_from_dicts(element_dicts))
+                save_metadata_html(metadata, baseline_folder)
+
+                writer = ElementWriter(sink_folder, sinks=['html'])
+                for start in range(0, len(element_dicts), 25):
+                    writer.write(element_dicts[start:start + 25])
+                writer.close()
+
+                self.assertEqual((sink_folder / 'all_elements_metadata.html').read_bytes(),
+                                 (baseline_folder / 'all_elements_metadata.html').read_bytes())
+
+
+    def test_pages_are_written_as_later_pages_arrive(self):
+        def page(number, count=2, page_number=None):
+            return [{'type': 'NarrativeText', 'element_id': f"p{number}e{index}", 'text': f"Page {number} item {index}",
+                     'metadata': {'page_number': page_number or number}} for index in range(count)]
+
+        page_break = [{'type': 'PageBreak', 'element_id': 'break', 'text': '', 'metadata': {}}]
+        batches = [page(1) + page_break, page(2), page(4) + page_break, page(5),
+                   # Late: one more element of page 2, and page 3 after page 4 was written
+                   page(7, 1, page_number=2) + page(8, 1, page_number=3) + page(6)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            baseline_folder, sink_folder = Path(tmp_dir) / 'baseline', Path(tmp_dir) / 'sink'
+            baseline_folder.mkdir()
+            sink_folder.mkdir()
+            _, _, metadata = process_elements(elements_from_dicts([e for batch in batches for e in batch]))
+            save_metadata_html(metadata, baseline_folder)
+
+            writer = ElementWriter(sink_folder, sinks=['html'])
+            sink, = writer.sinks
+            held = []
+            for batch in batches:
+                writer.write(batch)
+                held.append(sorted(sink.pages))
+            writer.close()
+
+            self.assertEqual(held, [[1], [2], [4], [5], [6]])
+            self.assertEqual(dict(sink.late_pages).keys(), {2, 3})
+            self.assertEqual((sink_folder / 'all_elements_metadata.html').read_bytes(),
+                             (baseline_folder / 'all_elements_metadata.html').read_bytes())
+            self.assertEqual(sorted(p.name for p in sink_folder.iterdir()), ['all_elements_metadata.html'])
+
+
+class TestAbortedDocument(unittest.TestCase):
+
+    SINKS = ['csv', 'metadata_json', 'metadata_jsonl', 'html', 'raw_json']
+
+    def test_aborted_document_leaves_no_partial_files(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_folder = Path(tmp_dir)
+            writer = ElementWriter(output_folder, sinks=self.SINKS)
+            writer.write(make_document(1))
+            writer.abort()
+            self.assertEqual(list(output_folder.iterdir()), [])
+
+    def test_aborted_rerun_keeps_the_previous_outputs(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_folder = Path(tmp_dir)
+            writer = ElementWriter(output_folder, sinks=self.SINKS)
+            writer.write(make_document(2))
+            artifacts = writer.close()
+            before = {name: (output_folder / name).read_bytes() for name in artifacts}
+
+            writer = ElementWriter(output_folder, sinks=self.SINKS)
+            writer.write(make_document(3)[:4])
+            writer.abort()
+
+            self.assertEqual({p.name: p.read_bytes() for p in output_folder.iterdir()}, before)
+
+
+class TestParquetSink(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.output_dir = Path(self.tmp_dir.name)
+        self.output_folder = self.output_dir / 'Acme_2023'
+        self.output_folder.mkdir()
+        self.options = SinkOptions(source_path=Path('/input/Acme_2023_Virginia.pdf'),
+                                   dataset_dir=self.output_dir / ELEMENTS_DATASET_DIR)
+        self.partition_dir = self.output_dir / ELEMENTS_DATASET_DIR / 'entity=Acme' / 'year=2023'
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, elements, sinks=('csv', 'parquet')):
+        writer = ElementWriter(self.output_folder, sinks=list(sinks), options=self.options)
+        writer.write(elements)
+        return writer.close()
+
+    def test_document_rows_replace_the_previous_run(self):
+        self.write(make_document(3))
+        self.write(make_document(2))
+
+        self.assertEqual(sorted(p.name for p in self.partition_dir.iterdir()), ['Acme_2023_Virginia.parquet'])
+        table = pq.read_table(self.partition_dir / 'Acme_2023_Virginia.parquet')
+        self.assertEqual(table.num_rows, 8)
+        rows = table.to_pylist()
+        self.assertEqual(rows[2]['element_id'], 'table1')
+        self.assertEqual(rows[2]['parent_id'], 'title1')
+        self.assertEqual(rows[2]['text_as_html'], TABLE_HTML)
+        self.assertEqual(rows[0]['coordinates'], [100.0, 100.0, 100.0, 140.5, 900.0, 140.5, 900.0, 100.0])
+        self.assertEqual(rows[0]['layout_width'], 1700)
+
+    def test_failed_document_leaves_the_dataset_unchanged(self):
+        self.write(make_document(2))
+        before = (self.partition_dir / 'Acme_2023_Virginia.parquet').read_bytes()
+
+        writer = ElementWriter(self.output_folder, sinks=['csv', 'parquet'], options=self.options)
+        writer.write(make_document(1))
+        with mock.patch('New_src.file_handler.ElementColumns', side_effect=RuntimeError("bad element")):
+            with self.assertRaises(RuntimeError):
+                writer.write(make_document(3))
+        writer.abort()
+
+        self.assertEqual(sorted(p.name for p in self.partition_dir.iterdir()), ['Acme_2023_Virginia.parquet'])
+        self.assertEqual((self.partition_dir / 'Acme_2023_Virginia.parquet').read_bytes(), before)
+
+    def test_every_sink_is_closed_when_one_fails(self):
+        writer = ElementWriter(self.output_folder, sinks=['csv', 'metadata_json', 'parquet'], options=self.options)
+        writer.write(make_document(2))
+        csv_sink, json_sink, parquet_sink = writer.sinks
+        with mock.patch.object(csv_sink, 'close', side_effect=OSError("disk full")):
+            with self.assertRaisesRegex(OSError, "disk full"):
+                writer.close()
+        writer.abort()
+
+        self.assertTrue(csv_sink.file.closed)
+        self.assertTrue(json_sink.array.file.file.closed)
+        self.assertTrue((self.output_folder / 'all_elements_metadata.json').read_text().endswith(']'))
+        self.assertEqual(sorted(p.name for p in self.partition_dir.iterdir()), ['Acme_2023_Virginia.parquet'])
+
+
+class TestElementDicts(unittest.TestCase):
+
+    def test_dicts_from_the_api_give_the_same_outputs(self):
+        elements = make_document(3)
+        # As the partition API serializes elements (elements_to_json)
+        element_dicts = elements_to_dicts(_fix_metadata_field_precision(elements))
+        sinks = DEFAULT_OUTPUT_SINKS + ['metadata_jsonl']
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            folders = [Path(tmp_dir) / 'elements', Path(tmp_dir) / 'dicts']
+            for folder, batch in zip(folders, (elements, element_dicts)):
+                folder.mkdir()
+                writer = ElementWriter(folder, sinks=sinks)
+                writer.write(batch)
+                writer.close()
+
+            names = sorted(p.name for p in folders[0].iterdir())
+            self.assertIn('table_title1_page1_part1.csv', names)
+            self.assertEqual(sorted(p.name for p in folders[1].iterdir()), names)
+            match, mismatch, errors = filecmp.cmpfiles(folders[0], folders[1], names, shallow=False)
+            self.assertEqual((mismatch, errors), (['elements_data.csv'], []))
+            self.assertEqual(without_addresses(folders[1] / 'elements_data.csv'),
+                             without_addresses(folders[0] / 'elements_data.csv'))
+
+    def test_api_backend_documents_are_written_without_building_elements(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_dir, output_dir = Path(tmp_dir) / 'input', Path(tmp_dir) / 'output'
+            input_dir.mkdir()
+            synthetic_corpus(input_dir, 1, 2)
+            processor = pdf_processor.PDFProcessor({
+                **load_config(str(CONFIG_PATH)), 'input_dir': input_dir, 'output_dir': output_dir,
+                'partition_backend': 'stub', 'parallel_processing': False, 'checkpoints': False})
+            backends = sys.modules[type(processor.backend).__module__]
+            with mock.patch.object(backends, 'elements_from_dicts') as elements_from_dicts:
+                processor.process_pdfs()
+
+            elements_from_dicts.assert_not_called()
+            csv = (output_dir / 'Entity0_2023' / 'elements_data.csv').read_text()
+            self.assertEqual(csv.count('Item heading'), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from contextlib import closing
+from pathlib import Path
+from PyPDF2 import PageObject, PdfWriter
+from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject, NumberObject
+from unstructured.documents.elements import ElementMetadata, NarrativeText, PageBreak, Title, \
+    assign_and_map_hash_ids
+from New_src.page_cache import PageCache, load_page, page_cache_key, page_fingerprints, split_pages
+
+
+def add_page(writer: PdfWriter, content: bytes, image: bytes = None):
+    page = PageObject.create_blank_page(width=612, height=792)
+    stream = DecodedStreamObject()
+    stream.set_data(content)
+    page[NameObject('/Contents')] = writer._add_object(stream)
+    if image is not None:
+        xobject = DecodedStreamObject()
+        xobject.set_data(image)
+        xobject.update({NameObject('/Subtype'): NameObject('/Image'), NameObject('/Width'): NumberObject(1),
+                        NameObject('/Height'): NumberObject(1)})
+        page[NameObject('/Resources')] = DictionaryObject({NameObject('/XObject'): DictionaryObject(
+            {NameObject('/Im0'): writer._add_object(xobject)})})
+    writer.add_page(page)
+
+
+def write_pdf(path: Path, pages):
+    writer = PdfWriter()
+    for content, image in pages:
+        add_page(writer, content, image)
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+def partitioned(filename: str):
+    """Elements as partition_pdf would return them for a two-page document."""
+    elements = [
+        Title("Item 1", metadata=ElementMetadata(page_number=1)),
+        NarrativeText("Intro", metadata=ElementMetadata(page_number=1)),
+        PageBreak(""),
+        NarrativeText("Continued", metadata=ElementMetadata(page_number=2)),
+        Title("Item 2", metadata=ElementMetadata(page_number=2)),
+        NarrativeText("Body", metadata=ElementMetadata(page_number=2)),
+    ]
+    elements[2].metadata.page_number = 1
+    for element in elements:
+        element.metadata.filename = filename
+        element.metadata.file_directory = '/filings'
+    elements = assign_and_map_hash_ids(elements)
+    elements[1].metadata.parent_id = elements[0].id
+    # Across the page break, as hierarchy detection would set it
+    elements[3].metadata.parent_id = elements[0].id
+    elements[5].metadata.parent_id = elements[4].id
+    return elements
+
+
+class TestPageFingerprints(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_same_page_in_another_file_matches(self):
+        scan = b'q 612 0 0 792 0 0 cm /Im0 Do Q'
+        write_pdf(self.root / 'a.pdf', [(b'BT (cover) Tj ET', None), (scan, b'\x01'), (scan, b'\x02')])
+        write_pdf(self.root / 'b.pdf', [(scan, b'\x02'), (b'BT (other) Tj ET', None)])
+        a = page_fingerprints(self.root / 'a.pdf', 1, 3)
+        b = page_fingerprints(self.root / 'b.pdf', 1, 2)
+        self.assertEqual(a[2], b[0])
+        # Scanned pages share their content stream, so the image decides
+        self.assertNotEqual(a[1], a[2])
+        self.assertEqual(len(set(a + b)), 4)
+        self.assertEqual(page_fingerprints(self.root / 'a.pdf', 2, 3), a[1:])
+
+    def test_key_depends_on_settings(self):
+        self.assertNotEqual(page_cache_key('page', {'strategy': 'hi_res'}), page_cache_key('page', {'strategy': 'fast'}))
+        self.assertEqual(page_cache_key('page', {'a': 1, 'b': 2}), page_cache_key('page', {'b': 2, 'a': 1}))
+
+
+class TestStoredPages(unittest.TestCase):
+
+    def test_reload_under_another_name_matches_partitioning_it(self):
+        stored = split_pages(partitioned('Acme_2022_Ohio.pdf'), 1, 2)
+        self.assertEqual([len(stored[1]), len(stored[2])], [2, 3])
+        # The cross-page parent is left for the shard merger to restore
+        self.assertNotIn('parent_id', stored[2][0]['metadata'])
+
+        expected = partitioned('Acme_2023_Virginia.pdf')
+        for page_number in (1, 2):
+            page = load_page(stored[page_number], Path('/filings/Acme_2023_Virginia.pdf'), page_number)
+            want = [e for e in expected if e.metadata.page_number == page_number and e.category != 'PageBreak']
+            self.assertEqual([e.id for e in page], [e.id for e in want])
+            self.assertEqual([e.metadata.filename for e in page], ['Acme_2023_Virginia.pdf'] * len(want))
+            self.assertEqual([e.metadata.parent_id for e in page if e.text != 'Continued'],
+                             [e.metadata.parent_id for e in want if e.text != 'Continued'])
+
+
+class TestPageCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        cache = PageCache(self.root, max_bytes=1024 * 1024)
+        entry = [{'type': 'Title', 'element_id': 'x', 'text': 'Item 1', 'metadata': {'page_number': 1}}]
+        cache.put_many({'a': entry})
+        self.assertEqual(cache.get_many(['a', 'b']), {'a': entry})
+
+    def test_least_recently_used_pages_are_evicted(self):
+        def entry(key):
+            # Incompressible, so every entry stores about the same size
+            return [{'type': 'NarrativeText', 'text': key + os.urandom(2000).hex(), 'metadata': {}}]
+
+        cache = PageCache(self.root, max_bytes=1 << 30)
+        for key in ('a', 'b', 'c'):
+            cache.put_many({key: entry(key)})
+            time.sleep(0.05)
+        with closing(sqlite3.connect(str(cache.db_path))) as conn:
+            cache.max_bytes = conn.execute("SELECT SUM(size) FROM pages").fetchone()[0] + 100
+        cache.get_many(['a'])
+        time.sleep(0.05)
+        cache.put_many({'d': entry('d')})
+        self.assertEqual(set(cache.get_many(['a', 'b', 'c', 'd'])), {'a', 'c', 'd'})
+
+
+if __name__ == '__main__':
+    unittest.main()
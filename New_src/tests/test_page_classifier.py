@@ -0,0 +1,120 @@
+import io
+import sys
+import tempfile
+import types
+import unittest
+from pathlib import Path
+from unittest import mock
+from PIL import Image, ImageDraw
+from PyPDF2 import PageObject, PdfReader, PdfWriter
+from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject
+from New_src import partition_backends
+from New_src.Config import load_config
+from New_src.page_classifier import (FAST_PATH, HI_RES_PATH, MAX_RULING_LINES, MIN_TEXT_CHARS, choose_path,
+                                     classify_pages, group_page_runs)
+from New_src.tests.test_page_sharding import partition, snapshot
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.yaml'
+
+TEXT = (b"BT /F1 11 Tf 14 TL 72 720 Td "
+        + b" ".join(b"(Item 5 Initial fees. The initial franchise fee is due in full on signing.) ' "
+                    for _ in range(30))
+        + b" ET")
+RULING_LINES = b" ".join(b"72 %d m 540 %d l S" % (y, y) for y in range(100, 400, 20))
+
+
+def scanned_page() -> bytes:
+    """A single-page PDF holding only a page image, as a scanner makes them."""
+    image = Image.new('RGB', (850, 1100), 'white')
+    draw = ImageDraw.Draw(image)
+    for y in range(100, 1000, 30):
+        draw.text((80, y), "Item 5 Initial fees " * 4, fill='black')
+    pdf = io.BytesIO()
+    image.save(pdf, format='PDF', resolution=100)
+    return pdf.getvalue()
+
+
+def write_pdf(path: Path, pages):
+    """Write a PDF with one page per entry: 'text', 'table' (text with ruling lines), 'scan' or 'blank'."""
+    writer = PdfWriter()
+    font = DictionaryObject({NameObject('/Type'): NameObject('/Font'), NameObject('/Subtype'): NameObject('/Type1'),
+                             NameObject('/BaseFont'): NameObject('/Helvetica')})
+    for kind in pages:
+        if kind == 'scan':
+            writer.add_page(PdfReader(io.BytesIO(scanned_page())).pages[0])
+            continue
+        page = PageObject.create_blank_page(width=612, height=792)
+        if kind != 'blank':
+            page[NameObject('/Resources')] = DictionaryObject(
+                {NameObject('/Font'): DictionaryObject({NameObject('/F1'): font})})
+            content = DecodedStreamObject()
+            content.set_data(TEXT + (b" " + RULING_LINES if kind == 'table' else b""))
+            page[NameObject('/Contents')] = writer._add_object(content)
+        writer.add_page(page)
+    with open(path, 'wb') as f:
+        writer.write(f)
+
+
+class TestClassifyPages(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = Path(self.tmp_dir.name) / 'Acme_2023_Virginia.pdf'
+        write_pdf(self.file_path, ['text', 'table', 'scan', 'blank', 'text'])
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_only_born_digital_pages_without_tables_take_the_fast_path(self):
+        self.assertEqual(classify_pages(self.file_path, 1, 5),
+                         {1: FAST_PATH, 2: HI_RES_PATH, 3: HI_RES_PATH, 4: HI_RES_PATH, 5: FAST_PATH})
+
+    def test_page_range_keeps_document_page_numbers(self):
+        self.assertEqual(classify_pages(self.file_path, 4, 5), {4: HI_RES_PATH, 5: FAST_PATH})
+
+    def test_thresholds(self):
+        born_digital = {'text_chars': MIN_TEXT_CHARS, 'text_coverage': 0.3, 'image_coverage': 0.0,
+                        'ruling_lines': MAX_RULING_LINES}
+        self.assertEqual(choose_path(born_digital), FAST_PATH)
+        for key, value in (('text_chars', MIN_TEXT_CHARS - 1), ('text_coverage', 0.01),
+                           ('image_coverage', 0.9), ('ruling_lines', MAX_RULING_LINES + 1)):
+            with self.subTest(key=key):
+                self.assertEqual(choose_path({**born_digital, key: value}), HI_RES_PATH)
+
+
+class TestPageRuns(unittest.TestCase):
+
+    def test_consecutive_pages_on_a_path_form_one_run(self):
+        page_paths = {6: FAST_PATH, 1: FAST_PATH, 2: FAST_PATH, 3: HI_RES_PATH, 5: HI_RES_PATH, 7: FAST_PATH}
+        self.assertEqual(group_page_runs(page_paths),
+                         [(FAST_PATH, 1, 2), (HI_RES_PATH, 3, 3), (HI_RES_PATH, 5, 5), (FAST_PATH, 6, 7)])
+        self.assertEqual(group_page_runs({}), [])
+
+    def test_backend_partitions_each_run_and_merges_them(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = Path(tmp_dir) / 'Acme_2023_Virginia.pdf'
+            write_pdf(file_path, ['text', 'text', 'table', 'scan'])
+            backend = partition_backends.LocalBackend({**load_config(str(CONFIG_PATH)), 'text_layer_fast_path': True})
+            runs = []
+
+            def partition_page_range(path, start, end, partition_kwargs):
+                runs.append((partition_kwargs['strategy'], start, end))
+                return partition(path, start, end)
+
+            # The backend counts pages in the page_classifier module it imported
+            page_classifier = sys.modules[partition_backends.record_page_paths.__module__]
+            fast_before = page_classifier.get_page_path_stats()[FAST_PATH]
+            # partition_pdf is imported on first use; only the page-range path is exercised here
+            pdf_module = types.ModuleType('unstructured.partition.pdf')
+            pdf_module.partition_pdf = mock.Mock(side_effect=AssertionError("partitioned as a whole"))
+            with mock.patch.dict(sys.modules, {'unstructured.partition.pdf': pdf_module}), \
+                    mock.patch.object(partition_backends, 'partition_page_range', partition_page_range):
+                elements = backend.partition(file_path)
+
+            self.assertEqual(runs, [(FAST_PATH, 1, 2), (HI_RES_PATH, 3, 4)])
+            self.assertEqual(snapshot(elements), snapshot(partition(file_path)))
+            self.assertEqual(page_classifier.get_page_path_stats()[FAST_PATH] - fast_before, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
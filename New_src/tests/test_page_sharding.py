@@ -0,0 +1,87 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unstructured.documents.elements import (ElementMetadata, FigureCaption, Image, ListItem, NarrativeText, PageBreak,
+                                             Title, assign_and_map_hash_ids)
+from New_src.page_cache import load_page, split_pages
+from New_src.page_sharding import get_last_modified_date, merge_shards, split_page_ranges
+
+try:
+    from unstructured.partition.common.metadata import set_element_hierarchy
+except ImportError:  # unstructured < 0.16
+    from unstructured.partition.common import set_element_hierarchy
+
+# (element class, text, category_depth, nested in the previous element by the layout model)
+DOCUMENT = [
+    [(Title, "Item 5", 0, False), (NarrativeText, "Initial fees", None, False)],
+    [(NarrativeText, "Initial fees continued", None, False), (Title, "Item 6", 0, False),
+     (Title, "Other fees", 1, False), (ListItem, "Royalty", None, False)],
+    [(ListItem, "Royalty", None, False), (Image, "", None, False), (FigureCaption, "Figure 1", None, True)],
+    [(Title, "Item 7", 0, False), (NarrativeText, "Initial fees", None, False)],
+]
+
+
+def partition(file_path: Path, start: int = 1, end: int = len(DOCUMENT)):
+    """What partition_pdf returns for pages start..end, as if that range were the whole file:
+    a break closing every page, the title hierarchy, document metadata and hashed ids."""
+    elements = []
+    for page_number in range(start, end + 1):
+        for element_class, text, depth, nested in DOCUMENT[page_number - 1]:
+            element = element_class(text, metadata=ElementMetadata(
+                page_number=page_number, category_depth=depth, filetype='PPM',
+                last_modified=get_last_modified_date(str(file_path))))
+            if nested:
+                element.metadata.parent_id = elements[-1].id
+            elements.append(element)
+        elements.append(PageBreak(text=""))
+    set_element_hierarchy(elements)
+    for element in elements:
+        element.metadata.update(ElementMetadata(filename=str(file_path), filetype='application/pdf'))
+    return assign_and_map_hash_ids(elements)
+
+
+def snapshot(elements):
+    return [(element.id, element.category, element.text, element.metadata.to_dict()) for element in elements]
+
+
+class TestMergeShards(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = Path(self.tmp_dir.name) / 'Acme_2023_Virginia.pdf'
+        self.file_path.write_bytes(b'%PDF-1.4')
+        self.expected = snapshot(partition(self.file_path))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_merged_shards_match_the_unsharded_partition(self):
+        for pages_per_shard in (1, 2, 3):
+            shards = [partition(self.file_path, start, end)
+                      for start, end in split_page_ranges(len(DOCUMENT), pages_per_shard)]
+            self.assertEqual(snapshot(merge_shards(shards)), self.expected, pages_per_shard)
+
+    def test_cached_pages_merge_like_the_unsharded_partition(self):
+        # The page cache drops page breaks and cross-page parents; merging must restore both
+        pages = split_pages(partition(self.file_path), 1, len(DOCUMENT))
+        shards = [load_page(pages[1], self.file_path, 1), partition(self.file_path, 2, 3),
+                  load_page(pages[4], self.file_path, 4)]
+        merged = merge_shards(shards)
+
+        self.assertEqual(snapshot(merged), self.expected)
+        page_breaks = [element for element in merged if element.category == 'PageBreak']
+        self.assertEqual(len(page_breaks), len(DOCUMENT))
+        self.assertEqual(page_breaks[0].metadata.filetype, 'application/pdf')
+        self.assertIsNone(page_breaks[0].metadata.page_number)
+
+    def test_parents_follow_the_hierarchy_within_a_page(self):
+        merged = merge_shards([partition(self.file_path, start, start) for start in range(1, len(DOCUMENT) + 1)])
+        by_text = {(element.text, element.metadata.page_number): element for element in merged}
+        self.assertEqual(by_text[("Initial fees", 1)].metadata.parent_id, by_text[("Item 5", 1)].id)
+        self.assertEqual(by_text[("Royalty", 2)].metadata.parent_id, by_text[("Other fees", 2)].id)
+        self.assertEqual(by_text[("Figure 1", 3)].metadata.parent_id, by_text[("", 3)].id)
+        self.assertNotEqual(by_text[("Initial fees", 1)].id, by_text[("Initial fees", 4)].id)
+
+
+if __name__ == '__main__':
+    unittest.main()
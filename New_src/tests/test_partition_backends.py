@@ -0,0 +1,92 @@
+import json
+import re
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from New_src import pdf_processor
+from New_src.Config import load_config
+from New_src.api_stub import StubPartitionServer, page_elements
+from New_src.benchmarks import synthetic_corpus
+from New_src.partition_backends import PARTITION_BACKENDS, PartitionBackend, create_backend
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.yaml'
+
+
+class TestPartitionBackend(unittest.TestCase):
+
+    def test_backend_without_partition_cannot_be_created(self):
+        class IncompleteBackend(PartitionBackend):
+            name = 'incomplete'
+
+        with self.assertRaisesRegex(TypeError, "partition"):
+            IncompleteBackend({})
+
+    def test_every_backend_can_be_created(self):
+        config = load_config(str(CONFIG_PATH))
+        for name in PARTITION_BACKENDS:
+            with self.subTest(name=name):
+                self.assertEqual(create_backend({**config, 'partition_backend': name}).name, name)
+
+
+class TestPageRangeParity(unittest.TestCase):
+    """Documents partitioned as page ranges come out as when partitioned whole."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.input_dir = self.root / 'input'
+        self.input_dir.mkdir()
+        synthetic_corpus(self.input_dir, 1, 7)
+        self.config = {**load_config(str(CONFIG_PATH)), 'input_dir': self.input_dir, 'partition_backend': 'stub',
+                       'parallel_processing': False, 'deduplicate_inputs': False, 'checkpoints': False}
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def outputs(self, name: str, **config) -> dict:
+        """The document's outputs, with element ids replaced by their position in the document."""
+        output_dir = self.root / name
+        pdf_processor.PDFProcessor({**self.config, 'output_dir': output_dir, **config}).process_pdfs()
+        output_folder = output_dir / 'Entity0_2023'
+        elements = json.loads((output_folder / 'raw_elements.json').read_text())
+        ids = [element['element_id'] for element in elements]
+        self.assertEqual(len(ids), len(set(ids)), f"{name}: element ids repeat")
+        for element in elements:
+            if element['metadata'].get('parent_id') is not None:
+                self.assertIn(element['metadata']['parent_id'], ids)
+        positions = {element_id: f"element{index}" for index, element_id in enumerate(ids)}
+        pattern = re.compile(r'\b(' + '|'.join(sorted(map(re.escape, ids), key=len, reverse=True)) + r')\b')
+        return {path.name: pattern.sub(lambda match: positions[match.group()],
+                                       re.sub(r' at 0x[0-9a-f]+', '', path.read_text()))
+                for path in sorted(output_folder.iterdir()) if path.is_file() and path.suffix != '.pdf'}
+
+    def assertSameOutputs(self, whole, ranges):
+        self.assertEqual(sorted(ranges), sorted(whole))
+        for name in whole:
+            self.assertEqual(ranges[name], whole[name], name)
+
+    def test_stub_backend_page_ranges(self):
+        whole = self.outputs('whole')
+        self.assertIn('Entity0_2023_Virginia.pdf', whole['raw_elements.json'])
+        for name, config in (('checkpoints', {'checkpoints': True, 'checkpoint_pages': 3}),
+                             ('streaming', {'streaming_output': True, 'streaming_pages': 2}),
+                             ('sharded', {'parallel_processing': True, 'num_workers': 2, 'page_sharding': True,
+                                          'page_sharding_min_pages': 1, 'pages_per_shard': 3})):
+            with self.subTest(name=name):
+                self.assertSameOutputs(whole, self.outputs(name, **config))
+
+    def test_api_backend_page_ranges(self):
+        api_client = sys.modules[pdf_processor.create_backend.__module__].get_api_client.__module__
+        with StubPartitionServer(page_elements) as server, \
+                mock.patch.object(sys.modules[api_client], '_client', None):
+            config = {'partition_backend': 'api', 'api_url': server.url, 'api_split_pages': 0}
+            whole = self.outputs('whole', **config)
+            checkpointed = self.outputs('checkpoints', checkpoints=True, checkpoint_pages=3, **config)
+        self.assertEqual(server.requests, 1 + 3)
+        self.assertSameOutputs(whole, checkpointed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import pandas as pd
+from New_src import pdf_processor
+from New_src.Config import load_config
+from New_src.benchmarks import synthetic_corpus
+from New_src.scheduler import (PAGES_PER_MB_FALLBACK, SECONDS_PER_MB, SECONDS_PER_PAGE, CostEstimate, ScheduledTask,
+                               estimate_cost, estimate_page_range_cost, run_longest_first)
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.yaml'
+
+
+def task(key, seconds, fn, *args):
+    return ScheduledTask(key, CostEstimate(1, 0.0, seconds), fn, args)
+
+
+class TestEstimateCost(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_cost_grows_with_pages_and_size(self):
+        synthetic_corpus(self.root, 1, 12)
+        file_path = self.root / 'Entity0_2023_Virginia.pdf'
+        estimate = estimate_cost(file_path)
+
+        size_mb = file_path.stat().st_size / 1024 ** 2
+        self.assertEqual(estimate.page_count, 12)
+        self.assertAlmostEqual(estimate.seconds, 12 * SECONDS_PER_PAGE + size_mb * SECONDS_PER_MB)
+        self.assertGreater(estimate_cost(file_path, page_count=40).seconds, estimate.seconds)
+
+    def test_unreadable_pdf_is_estimated_from_its_size(self):
+        file_path = self.root / 'Broken_2023_Ohio.pdf'
+        file_path.write_bytes(b'not a pdf' * (300 * 1024))
+        estimate = estimate_cost(file_path)
+        self.assertEqual(estimate.page_count, round(estimate.size_mb * PAGES_PER_MB_FALLBACK))
+        self.assertGreater(estimate.page_count, 0)
+
+    def test_page_range_gets_its_share(self):
+        estimate = CostEstimate(100, 8.0, 204.0)
+        shard = estimate_page_range_cost(estimate, 26, 50)
+        self.assertEqual(shard.page_count, 25)
+        self.assertAlmostEqual(shard.size_mb, 2.0)
+        self.assertAlmostEqual(shard.seconds, 51.0)
+
+
+class TestRunLongestFirst(unittest.TestCase):
+
+    def test_tasks_start_longest_first(self):
+        started = []
+        tasks = [task(name, seconds, started.append, name)
+                 for name, seconds in (('small', 1.0), ('large', 30.0), ('medium', 5.0), ('tiny', 0.1))]
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            finished = [task.key for task, _, _ in run_longest_first(executor, tasks, max_in_flight=1)]
+        self.assertEqual(started, ['large', 'medium', 'small', 'tiny'])
+        self.assertEqual(finished, started)
+
+    def test_free_workers_pick_up_the_next_task(self):
+        lock = threading.Lock()
+        running = []
+        peak = []
+
+        def work(name, seconds):
+            with lock:
+                running.append(name)
+                peak.append(len(running))
+            time.sleep(seconds)
+            with lock:
+                running.remove(name)
+            return name
+
+        # One long file and many short ones: the short ones all run beside the long one
+        tasks = [task('long', 100.0, work, 'long', 0.5)]
+        tasks += [task(f"short{i}", 1.0, work, f"short{i}", 0.02) for i in range(8)]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(run_longest_first(executor, tasks, max_in_flight=2))
+
+        order = [task.key for task, _, _ in results]
+        self.assertEqual(order[-1], 'long')
+        self.assertEqual(sorted(order[:-1]), sorted(f"short{i}" for i in range(8)))
+        self.assertLessEqual(max(peak), 2)
+        for scheduled, future, seconds in results:
+            self.assertEqual(future.result(), scheduled.key)
+        long_seconds = results[-1][2]
+        self.assertGreaterEqual(long_seconds, 0.5)
+        self.assertLess(long_seconds, 1.0)
+
+    def test_failed_task_is_yielded_with_its_exception(self):
+        tasks = [task('bad', 2.0, int, 'x'), task('good', 1.0, int, '3')]
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = {task.key: future for task, future, _ in run_longest_first(executor, tasks, max_in_flight=2)}
+        self.assertIsInstance(results['bad'].exception(), ValueError)
+        self.assertEqual(results['good'].result(), 3)
+
+
+class TestCostLog(unittest.TestCase):
+
+    def test_parallel_run_writes_estimated_and_actual_costs(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_dir, output_dir = Path(tmp_dir) / 'input', Path(tmp_dir) / 'output'
+            input_dir.mkdir()
+            synthetic_corpus(input_dir, 3, 2)
+            config = {**load_config(str(CONFIG_PATH)), 'input_dir': input_dir, 'output_dir': output_dir,
+                      'partition_backend': 'stub', 'parallel_processing': True, 'num_workers': 2,
+                      'page_sharding': False}
+            pdf_processor.PDFProcessor(config).process_pdfs()
+
+            cost_log = pd.read_csv(output_dir / 'cost_estimates.csv')
+            self.assertEqual(list(cost_log.columns),
+                             ['file', 'shard', 'pages', 'size_mb', 'estimated_seconds', 'actual_seconds'])
+            self.assertEqual(sorted(Path(f).name for f in cost_log['file']),
+                             [f"Entity{i}_2023_Virginia.pdf" for i in range(3)])
+            self.assertEqual(cost_log['pages'].tolist(), [2, 2, 2])
+            self.assertTrue((cost_log['estimated_seconds'] >= 2 * SECONDS_PER_PAGE).all())
+            self.assertTrue((cost_log['actual_seconds'] >= 0).all())
+            report = (output_dir / 'summary_report.txt').read_text()
+            self.assertIn("Successfully processed: 3", report)
+            self.assertIn("Estimated partition time (s):", report)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import multiprocessing.util
+import os
+import time
+import unittest
+from New_src.supervisor import SupervisedPool, WorkerKilled
+
+_initialized = []
+
+
+def initialize(value):
+    _initialized.append(value)
+
+
+def report(value, delay=0.0):
+    time.sleep(delay)
+    return value, os.getpid(), list(_initialized)
+
+
+def exit_slowly(seconds):
+    # Runs when the worker process exits, as a write-behind drain does
+    multiprocessing.util.Finalize(None, time.sleep, args=(seconds,), exitpriority=10)
+
+
+def fail(message):
+    raise ValueError(message)
+
+
+def crash():
+    os._exit(3)
+
+
+def allocate(mb):
+    block = bytearray(mb * 1024 * 1024)
+    time.sleep(10)
+    return len(block)
+
+
+class TestSupervisedPool(unittest.TestCase):
+
+    def test_results_and_errors_are_returned(self):
+        with SupervisedPool(2, initializer=initialize, initargs=('ready',)) as pool:
+            futures = [pool.submit(report, i) for i in range(6)]
+            error = pool.submit(fail, 'bad page tree')
+        self.assertEqual([f.result()[0] for f in futures], list(range(6)))
+        self.assertTrue(all(f.result()[2] == ['ready'] for f in futures))
+        self.assertLessEqual(len({f.result()[1] for f in futures}), 2)
+        self.assertIsInstance(error.exception(), ValueError)
+
+    def test_hung_task_is_killed_and_the_queue_keeps_flowing(self):
+        with SupervisedPool(1, task_timeout=0.5, poll_interval=0.05) as pool:
+            hung = pool.submit(report, 'hung', delay=30)
+            rest = [pool.submit(report, i) for i in range(3)]
+        self.assertIsInstance(hung.exception(), WorkerKilled)
+        self.assertEqual(hung.exception().reason, 'timeout')
+        self.assertEqual([f.result()[0] for f in rest], [0, 1, 2])
+        self.assertEqual(pool.get_stats()['tasks_killed_timeout'], 1)
+
+    def test_crashed_worker_fails_only_its_task(self):
+        with SupervisedPool(2, poll_interval=0.05) as pool:
+            crashed = pool.submit(crash)
+            rest = [pool.submit(report, i) for i in range(4)]
+        self.assertEqual(crashed.exception().reason, 'crash')
+        self.assertIn('exit code 3', str(crashed.exception()))
+        self.assertEqual([f.result()[0] for f in rest], [0, 1, 2, 3])
+
+    def test_memory_ceiling(self):
+        with SupervisedPool(1, max_rss_mb=200, poll_interval=0.05) as pool:
+            bloated = pool.submit(allocate, 400)
+            after = pool.submit(report, 'next')
+        self.assertEqual(bloated.exception().reason, 'memory')
+        self.assertEqual(after.result()[0], 'next')
+
+    def test_workers_are_recycled(self):
+        with SupervisedPool(1, max_tasks_per_worker=2) as pool:
+            futures = [pool.submit(report, i) for i in range(5)]
+        pids = [f.result()[1] for f in futures]
+        self.assertEqual(len(set(pids)), 3)
+        self.assertEqual(pids[0], pids[1])
+        self.assertNotEqual(pids[1], pids[2])
+        self.assertEqual(pool.get_stats()['workers_recycled'], 2)
+
+    def test_retiring_worker_does_not_hold_up_the_others(self):
+        finished = {}
+        started = time.monotonic()
+        with SupervisedPool(2, initializer=exit_slowly, initargs=(1.5,), max_tasks_per_worker=1,
+                            poll_interval=0.05) as pool:
+            futures = {'quick': pool.submit(report, 'quick'), 'slow': pool.submit(report, 'slow', delay=0.3)}
+            for name, future in futures.items():
+                future.add_done_callback(lambda _, name=name: finished.setdefault(name, time.monotonic() - started))
+            futures['slow'].result()
+        # The quick task's worker is still exiting when the slow task's result is collected
+        self.assertLess(finished['slow'], 1.2)
+        # Shutdown waits for every worker to finish exiting
+        self.assertGreaterEqual(time.monotonic() - started, 1.5)
+        self.assertEqual(pool._retiring, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
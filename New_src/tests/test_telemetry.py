@@ -0,0 +1,134 @@
+import json
+import subprocess
+import sys
+import tempfile
+import time
+import types
+import unittest
+from pathlib import Path
+from unittest import mock
+from New_src import telemetry
+from New_src.telemetry import DocumentTelemetry, activate, install_stage_hooks, load_records, stage, summarize
+
+
+def make_fake_pipeline():
+    """A stand-in for the layout module, whose functions call each other through module attributes."""
+    layout = types.ModuleType('fake_layout')
+
+    def convert_pdf_to_image(filename):
+        block = bytearray(64 * 1024 * 1024)
+        block[::4096] = b'x' * len(block[::4096])  # touch every page so it counts towards RSS
+        time.sleep(0.1)
+        return [filename]
+
+    def process_file_with_model(filename):
+        images = layout.convert_pdf_to_image(filename)
+        time.sleep(0.05)
+        return images
+
+    layout.convert_pdf_to_image = convert_pdf_to_image
+    layout.process_file_with_model = process_file_with_model
+    return layout
+
+
+class TestStageTelemetry(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.log_path = Path(self.tmp_dir.name) / telemetry.TELEMETRY_FILE
+        self.layout = make_fake_pipeline()
+        sys.modules['fake_layout'] = self.layout
+        hooks = (('open_rasterize', 'fake_layout', 'convert_pdf_to_image'),
+                 ('layout', 'fake_layout', 'process_file_with_model'),
+                 ('ocr', 'fake_missing_module', 'process_file_with_ocr'))
+        patcher = mock.patch.object(telemetry, 'STAGE_HOOKS', hooks)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        del sys.modules['fake_layout']
+        self.tmp_dir.cleanup()
+
+    def test_nested_stages_record_their_own_time(self):
+        install_stage_hooks()
+        install_stage_hooks()
+        document = DocumentTelemetry(self.log_path, 'run-1', Path('Acme_2023_Virginia.pdf'), pages=4)
+        with activate(document):
+            self.layout.process_file_with_model('Acme_2023_Virginia.pdf')
+            with stage('sink:csv'):
+                pass
+        document.finish()
+
+        record = json.loads(self.log_path.read_text())
+        stages = record['stages']
+        self.assertEqual(set(stages), {'open_rasterize', 'layout', 'sink:csv'})
+        self.assertEqual(stages['open_rasterize']['calls'], 1)
+        self.assertGreaterEqual(stages['open_rasterize']['wall_seconds'], 0.1)
+        self.assertGreaterEqual(stages['layout']['wall_seconds'], 0.05)
+        self.assertLess(stages['layout']['wall_seconds'], 0.1)
+        self.assertGreaterEqual(record['wall_seconds'], 0.15)
+        if telemetry._can_reset_peak_rss():
+            # The renderer's allocation is gone before the sink runs
+            self.assertGreater(stages['open_rasterize']['peak_rss_mb'], stages['sink:csv']['peak_rss_mb'] + 50)
+            self.assertGreaterEqual(stages['layout']['peak_rss_mb'], stages['open_rasterize']['peak_rss_mb'])
+
+    def test_nothing_is_recorded_without_an_active_document(self):
+        install_stage_hooks()
+        self.assertEqual(self.layout.process_file_with_model('a.pdf'), ['a.pdf'])
+        self.assertFalse(self.log_path.exists())
+
+    def test_peak_rss_is_not_reset_until_telemetry_is_used(self):
+        # Importing the pipeline's modules must not touch the RSS high-water mark
+        script = ("import builtins; opened = []; real_open = builtins.open\n"
+                  "builtins.open = lambda file, *args, **kwargs: (opened.append(str(file)), "
+                  "real_open(file, *args, **kwargs))[1]\n"
+                  "import telemetry, file_handler\n"
+                  "print('/proc/self/clear_refs' in opened)")
+        result = subprocess.run([sys.executable, '-c', script], cwd=Path(telemetry.__file__).parent,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), 'False')
+
+        telemetry._can_reset_peak_rss.cache_clear()
+        self.addCleanup(telemetry._can_reset_peak_rss.cache_clear)
+        with mock.patch.object(telemetry, 'open', create=True, wraps=open) as opened:
+            with stage('sink:csv'):
+                pass
+            self.assertNotIn('/proc/self/clear_refs', [call.args[0] for call in opened.call_args_list])
+            DocumentTelemetry(self.log_path, 'run', Path('Acme_2023_Virginia.pdf'), 1).finish()
+        if sys.platform.startswith('linux'):
+            self.assertIn('/proc/self/clear_refs', [call.args[0] for call in opened.call_args_list])
+
+
+class TestReport(unittest.TestCase):
+
+    def test_summary_of_the_latest_run(self):
+        def record(run, kind, pages, stages):
+            return {'run': run, 'kind': kind, 'pages': pages, 'status': 'ok', 'wall_seconds': sum(stages.values()),
+                    'stages': {name: {'wall_seconds': wall, 'cpu_seconds': wall, 'peak_rss_mb': 500.0, 'calls': 1}
+                               for name, wall in stages.items()}}
+
+        records = [
+            record('2026-01-01T09:00:00', 'document', 10, {'layout': 100.0}),
+            record('2026-01-02T09:00:00', 'document', 10, {'layout': 4.0, 'ocr': 4.0, 'sink:csv': 2.0}),
+            record('2026-01-02T09:00:00', 'shard', 20, {'layout': 8.0, 'ocr': 12.0}),
+            record('2026-01-02T09:00:00', 'outputs', 20, {'sink:csv': 2.0}),
+        ]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / telemetry.TELEMETRY_FILE
+            path.write_text(''.join(json.dumps(r) + '\n' for r in records))
+            latest = load_records(Path(tmp_dir))
+            self.assertEqual(len(latest), 3)
+            self.assertEqual(len(load_records(path, run=None)), 4)
+
+        summary = summarize(latest)
+        self.assertEqual(summary['pages'], 30)
+        self.assertEqual(summary['wall_seconds'], 32.0)
+        self.assertEqual(list(summary['stages']), ['ocr', 'layout', 'sink:csv'])
+        self.assertEqual(summary['stages']['ocr']['pages_per_second'], round(30 / 16, 2))
+        self.assertEqual(summary['stages']['layout']['wall_share'], 0.375)
+        self.assertEqual(summary['stages']['sink:csv']['wall_p50'], 2.0)
+        self.assertEqual(summary['document_pages_per_second'], 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
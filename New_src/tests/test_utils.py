@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from New_src.utils import COPY_MODES, copy_pdf_to_output, get_copy_stats
+
+
+class TestCopyPdfToOutput(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.pdf_path = self.root / 'Acme_2023_Virginia.pdf'
+        # Larger than one streaming chunk so the copy loops
+        self.content = b'%PDF-1.4 ' + os.urandom(3 * 1024 * 1024 + 17)
+        self.pdf_path.write_bytes(self.content)
+        self.output_folder = self.root / 'output'
+        self.output_folder.mkdir()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_every_mode_copies_the_bytes(self):
+        for mode in COPY_MODES:
+            with self.subTest(mode=mode):
+                # A stale copy from an earlier run is replaced
+                destination = self.output_folder / self.pdf_path.name
+                destination.unlink(missing_ok=True)
+                destination.write_bytes(b'stale')
+                method = copy_pdf_to_output(self.pdf_path, self.output_folder, mode)
+                self.assertEqual((self.output_folder / self.pdf_path.name).read_bytes(), self.content)
+                if mode == 'stream':
+                    self.assertEqual(method, 'stream')
+                elif mode == 'kernel':
+                    self.assertNotEqual(method, 'hardlink')
+
+    def test_copy_over_earlier_hardlink_keeps_source(self):
+        copy_pdf_to_output(self.pdf_path, self.output_folder, 'hardlink')
+        copy_pdf_to_output(self.pdf_path, self.output_folder, 'stream')
+        self.assertEqual(self.pdf_path.read_bytes(), self.content)
+        self.assertFalse(os.path.samefile(self.pdf_path, self.output_folder / self.pdf_path.name))
+
+    def test_hardlink_on_same_filesystem(self):
+        method = copy_pdf_to_output(self.pdf_path, self.output_folder, 'hardlink')
+        self.assertEqual(method, 'hardlink')
+        self.assertTrue(os.path.samefile(self.pdf_path, self.output_folder / self.pdf_path.name))
+
+    def test_stats_accumulate(self):
+        before = get_copy_stats()
+        copy_pdf_to_output(self.pdf_path, self.output_folder, 'stream')
+        after = get_copy_stats()
+        self.assertEqual(after['copy_bytes'] - before['copy_bytes'], len(self.content))
+        self.assertEqual(after['copy_methods']['stream'], before['copy_methods'].get('stream', 0) + 1)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            copy_pdf_to_output(self.pdf_path, self.output_folder, 'rsync')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import multiprocessing
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+from New_src import pdf_processor, write_behind
+from New_src.Config import load_config
+from New_src.benchmarks import synthetic_corpus
+from New_src.write_behind import WriteBehindQueue, drain_write_behind, get_write_behind, get_write_behind_stats
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.yaml'
+
+
+def write_marker_behind(path: str):
+    """Queue a slow write and return at once, leaving the exit finalizer to finish it."""
+    get_write_behind(1).submit(lambda: (time.sleep(0.2), Path(path).write_text('written')))
+
+
+class TestWriteBehindQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.queue = WriteBehindQueue(depth=1)
+
+    def tearDown(self):
+        self.queue.close()
+
+    def test_jobs_run_in_order_and_drain_waits_for_them(self):
+        done = []
+        for index in range(5):
+            self.queue.submit(lambda index: (time.sleep(0.01), done.append(index)), index)
+        self.queue.drain()
+        self.assertEqual(done, list(range(5)))
+        self.assertEqual(self.queue.submitted, 5)
+
+    def test_submit_blocks_beyond_depth(self):
+        release = threading.Event()
+        self.queue.submit(release.wait)
+        # The running job has left the queue; the next one fills it
+        self.queue.submit(lambda: None)
+        submitted = threading.Event()
+        submitter = threading.Thread(target=lambda: (self.queue.submit(lambda: None), submitted.set()))
+        submitter.start()
+        self.assertFalse(submitted.wait(0.2))
+
+        release.set()
+        self.assertTrue(submitted.wait(5))
+        submitter.join()
+        self.queue.drain()
+        self.assertGreater(self.queue.wait_seconds, 0.1)
+
+    def test_failed_job_does_not_stop_the_queue(self):
+        done = []
+        with self.assertLogs('pdf_processor', level='ERROR') as logs:
+            self.queue.submit(int, 'not a number')
+            self.queue.submit(done.append, 'after')
+            self.queue.drain()
+        self.assertEqual(done, ['after'])
+        self.assertIn("Write-behind job failed", logs.output[0])
+
+    def test_close_runs_queued_jobs_then_stops_the_thread(self):
+        done = []
+        self.queue.submit(time.sleep, 0.1)
+        self.queue.submit(done.append, 'queued')
+        self.queue.close()
+        self.assertEqual(done, ['queued'])
+        self.assertFalse(self.queue.thread.is_alive())
+
+
+class TestProcessQueue(unittest.TestCase):
+
+    def test_queue_is_rebuilt_after_fork(self):
+        parent_queue = get_write_behind(1)
+        with mock.patch.object(write_behind.os, 'getpid', return_value=-1):
+            child_queue = get_write_behind(1)
+            self.assertEqual(get_write_behind_stats()['write_behind_jobs'], 0)
+        child_queue.close()
+        self.assertIsNot(child_queue, parent_queue)
+
+    def test_exiting_process_drains_its_queue(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            marker = Path(tmp_dir) / 'marker.txt'
+            # A worker process exits through multiprocessing, which runs the Finalize hook
+            process = multiprocessing.get_context('fork').Process(target=write_marker_behind, args=(str(marker),))
+            process.start()
+            process.join(10)
+            self.assertEqual(process.exitcode, 0)
+            self.assertEqual(marker.read_text(), 'written')
+
+    def test_drain_ignores_a_queue_from_another_process(self):
+        queue = get_write_behind(1)
+        release = threading.Event()
+        queue.submit(release.wait)
+        try:
+            with mock.patch.object(write_behind.os, 'getpid', return_value=-1):
+                drain_write_behind()
+            self.assertEqual(queue.jobs.unfinished_tasks, 1)
+        finally:
+            release.set()
+            drain_write_behind()
+
+
+class TestFinishWriteBehind(unittest.TestCase):
+
+    def test_file_whose_outputs_failed_is_reported_failed(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_dir, output_dir = Path(tmp_dir) / 'input', Path(tmp_dir) / 'output'
+            input_dir.mkdir()
+            synthetic_corpus(input_dir, 3, 2)
+            config = {**load_config(str(CONFIG_PATH)), 'input_dir': input_dir, 'output_dir': output_dir,
+                      'partition_backend': 'stub', 'parallel_processing': False, 'write_behind': True}
+            processor = pdf_processor.PDFProcessor(config)
+            write_outputs = processor._write_outputs
+
+            def fail_one(file_path, *args, **kwargs):
+                if file_path.name == 'Entity1_2023_Virginia.pdf':
+                    raise OSError("disk full")
+                return write_outputs(file_path, *args, **kwargs)
+
+            with mock.patch.object(processor, '_write_outputs', side_effect=fail_one):
+                processor.process_pdfs()
+
+            report = (output_dir / 'summary_report.txt').read_text()
+            self.assertIn("Successfully processed: 2", report)
+            self.assertIn("Failed to process: 1", report)
+            self.assertIn("Entity1_2023_Virginia.pdf", report.split("Failed files:")[1])
+            # The failed file is left unrecorded, so the next run partitions it again
+            self.assertFalse(processor._pdf_exists_in_output(input_dir / 'Entity1_2023_Virginia.pdf'))
+            self.assertTrue(processor._pdf_exists_in_output(input_dir / 'Entity0_2023_Virginia.pdf'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
 import re
 from pathlib import Path
 import os
+import shutil
+import time
 
 def extract_year_from_filename(filename: str) -> str:
     match = re.search(r'_(\d{4})_', filename)
@@ -46,6 +48,83 @@ def rename_output_folder_if_exists(file_path: Path, base_output_dir: Path) -> Pa
 def is_already_processed(output_folder: Path) -> bool:
     return output_folder.exists() and (output_folder / "elements_data.csv").exists()
 
-def copy_pdf_to_output(source_path: Path, destination_folder: Path):
+COPY_MODES = ('auto', 'hardlink', 'kernel', 'stream')
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Per-process copy totals, reported back to the main process with the worker stats
+_copy_stats = {'copy_bytes': 0, 'copy_seconds': 0.0, 'copy_methods': {}}
+
+def _kernel_copy(source, destination, size: int) -> str:
+    """Copy without passing the data through Python: copy_file_range (which reflinks on
+    filesystems that support it), then sendfile. Raises OSError if neither applies."""
+    for method in ('copy_file_range', 'sendfile'):
+        copy = getattr(os, method, None)
+        if copy is None:
+            continue
+        offset = 0
+        try:
+            while offset < size:
+                if method == 'copy_file_range':
+                    sent = copy(source.fileno(), destination.fileno(), size - offset, offset, offset)
+                else:
+                    sent = copy(destination.fileno(), source.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+        except OSError:
+            # Not supported for this pair of files
+            offset = -1
+        if offset == size:
+            return method
+        destination.seek(0)
+        destination.truncate()
+    raise OSError("No in-kernel copy available")
+
+def copy_pdf_to_output(source_path: Path, destination_folder: Path, mode: str = 'auto') -> str:
+    """Copy a PDF into its output folder without reading it into memory; returns the method used.
+
+    'auto' and 'hardlink' link the file when source and output share a filesystem, 'auto'
+    and 'kernel' try an in-kernel copy, and every mode falls back to streaming in chunks.
+    """
+    if mode not in COPY_MODES:
+        raise ValueError(f"Unknown PDF copy mode: {mode}")
     destination_path = destination_folder / source_path.name
-    destination_path.write_bytes(source_path.read_bytes())
\ No newline at end of file
+    started = time.perf_counter()
+    size = source_path.stat().st_size
+    method = None
+    # Never write through an existing file: it may be a hardlink to the source from an earlier run
+    if destination_path.exists():
+        destination_path.unlink()
+    if mode in ('auto', 'hardlink'):
+        try:
+            os.link(source_path, destination_path)
+            method = 'hardlink'
+        except OSError:
+            pass
+    if method is None:
+        with open(source_path, 'rb') as source, open(destination_path, 'wb') as destination:
+            if mode in ('auto', 'kernel'):
+                try:
+                    method = _kernel_copy(source, destination, size)
+                except OSError:
+                    pass
+            if method is None:
+                shutil.copyfileobj(source, destination, COPY_CHUNK_SIZE)
+                method = 'stream'
+    _copy_stats['copy_bytes'] += size
+    _copy_stats['copy_seconds'] += time.perf_counter() - started
+    _copy_stats['copy_methods'][method] = _copy_stats['copy_methods'].get(method, 0) + 1
+    return method
+
+def get_copy_stats() -> dict:
+    return {'pid': os.getpid(), 'copy_bytes': _copy_stats['copy_bytes'],
+            'copy_seconds': _copy_stats['copy_seconds'], 'copy_methods': dict(_copy_stats['copy_methods'])}
+
+def link_or_copy(source_path: Path, destination_path: Path):
+    # Hardlink when source and destination share a filesystem, otherwise fall back to a copy
+    if destination_path.exists():
+        destination_path.unlink()
+    try:
+        os.link(source_path, destination_path)
+    except OSError:
+        shutil.copy2(source_path, destination_path)
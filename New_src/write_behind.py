@@ -0,0 +1,84 @@
+import logging
+import os
+import queue
+import threading
+import time
+from multiprocessing.util import Finalize
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger('pdf_processor')
+
+
+class WriteBehindQueue:
+    """Run per-document output jobs on a background thread while the caller moves on.
+
+    At most `depth` jobs wait in the queue; submit() blocks beyond that, which bounds
+    how many partitioned documents a process holds in memory. Jobs are responsible for
+    recording their own completion, so a job that fails or never runs leaves no trace.
+    """
+
+    def __init__(self, depth: int):
+        self.jobs = queue.Queue(maxsize=depth)
+        self.submitted = 0
+        self.wait_seconds = 0.0
+        # Queued documents are written out by close(), registered as an exit finalizer
+        self.thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self.thread.start()
+
+    def submit(self, fn: Callable[..., Any], *args: Any):
+        started = time.perf_counter()
+        self.jobs.put((fn, args))
+        self.wait_seconds += time.perf_counter() - started
+        self.submitted += 1
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is None:
+                    return
+                fn, args = job
+                try:
+                    fn(*args)
+                except Exception as e:
+                    logger.error(f"Write-behind job failed: {str(e)}", exc_info=True)
+            finally:
+                self.jobs.task_done()
+
+    def drain(self):
+        """Block until every submitted job has finished."""
+        self.jobs.join()
+
+    def close(self):
+        if self.thread.is_alive():
+            self.jobs.put(None)
+            self.thread.join()
+
+
+_write_behind: Optional[WriteBehindQueue] = None
+_write_behind_pid: Optional[int] = None
+
+
+def get_write_behind(depth: int) -> WriteBehindQueue:
+    """The process's write-behind queue, started on first use and drained at process exit."""
+    global _write_behind, _write_behind_pid
+    if _write_behind is None or _write_behind_pid != os.getpid():
+        _write_behind = WriteBehindQueue(depth)
+        _write_behind_pid = os.getpid()
+        # Pool workers exit through multiprocessing, which runs these finalizers but not atexit
+        Finalize(_write_behind, _write_behind.close, exitpriority=10)
+    return _write_behind
+
+
+def drain_write_behind():
+    if _write_behind is not None and _write_behind_pid == os.getpid():
+        _write_behind.drain()
+
+
+def get_write_behind_stats() -> Dict[str, Any]:
+    active = _write_behind if _write_behind_pid == os.getpid() else None
+    return {
+        'pid': os.getpid(),
+        'write_behind_jobs': active.submitted if active else 0,
+        'write_behind_wait_seconds': active.wait_seconds if active else 0.0,
+    }